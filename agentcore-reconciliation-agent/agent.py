@@ -2,18 +2,48 @@
 
 import json
 import logging
+import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from strands import tool
-from bedrock_agentcore.runtime import BedrockAgentCoreApp
+from typing import List, Dict, Any, Iterator, Optional
+from bedrock_agentcore.runtime import BedrockAgentCoreApp, PingStatus
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, Response
+from compression import CompressionMiddleware, compression_metadata
+from batch_extraction import batch_extract, iter_batch_extract
+from document_refs import DocumentReferenceError, document_cache, is_reference, load_documents, resolve_documents
+from metrics import install_metrics_route, record_work, register_cache, register_collector, response_status, track_request, work_queue_lines
+from result_cache import RESULT_CACHE_ENABLED, result_cache, result_key
+from tracing import configure_local_exporter, stage_span
+from work_queue import ServerBusy, estimate_records_bytes, get_work_queue
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = BedrockAgentCoreApp()
+# Compressed (gzip/zstd) request bodies are decoded and JSON responses compressed on request
+app = BedrockAgentCoreApp(middleware=[Middleware(CompressionMiddleware)])
+
+# OTEL_LOCAL_EXPORTER=console|file exports stage spans for offline runs
+configure_local_exporter()
+
+# Prometheus text-format metrics at GET /metrics
+install_metrics_route(app)
+register_collector("work_queue", lambda: work_queue_lines(get_work_queue().stats()))
+register_cache("result", lambda: (result_cache.hits + result_cache.coalesced, result_cache.misses))
+register_cache("document", lambda: (document_cache.hits, document_cache.misses))
+
+# The matching engine (NumPy/pandas) is imported by the operations that use it,
+# so a cold container answers /ping before it loads - see test_startup.py for the budget
+OPERATIONS = ("reconcile", "extract_and_reconcile", "reconcile_batch", "reconcile_chain", "submit", "status", "result", "batch_extract")
+
+@app.ping
+def ping_status():
+    """
+    Report HealthyBusy while every reconciliation worker is occupied. Otherwise the automatic status
+    applies - HealthyBusy while a submitted job, registered as an async task, is unfinished
+    """
+    return PingStatus.HEALTHY_BUSY if get_work_queue().is_saturated else None
 
-@tool
 def reconcile_financial_documents(
     left_document: List[Dict[str, Any]],
     right_document: List[Dict[str, Any]],
@@ -49,6 +79,39 @@ def reconcile_financial_documents(
             }
         }
     
+    logger.info("🔍 Starting transaction matching between left and right documents")
+    from schema_inference import reconcile_documents
+
+    # Column roles are inferred per header signature, so any customer layout can be matched.
+    # Scoring runs on the bounded worker pool; ServerBusy is raised when it is full.
+    work_queue = get_work_queue()
+    started = time.perf_counter()
+    reconciliation_results, left_columns, right_columns = work_queue.run(
+        reconcile_documents, left_document, right_document,
+        weight=estimate_records_bytes(left_document) + estimate_records_bytes(right_document)
+    )
+    record_work(
+        "reconcile", len(left_document) + len(right_document), time.perf_counter() - started,
+        pairs=len(left_document) * len(right_document)
+    )
+    
+    return reconciliation_response(
+        left_document, right_document, profile_context, reconciliation_results, left_columns, right_columns,
+        workQueue=work_queue.stats()
+    )
+
+def reconciliation_response(
+    left_document: List[Dict[str, Any]],
+    right_document: List[Dict[str, Any]],
+    profile_context: Optional[Dict[str, Any]],
+    reconciliation_results: List[Dict[str, Any]],
+    left_columns: Dict[str, Optional[str]],
+    right_columns: Dict[str, Optional[str]],
+    **metadata
+) -> Dict[str, Any]:
+    """
+    Side-by-side reconciliation response for matched results - shared by the synchronous and job paths
+    """
     # Create simple analysis text
     analysis_text = f"""
     # Financial Reconciliation Analysis
@@ -67,262 +130,6 @@ def reconcile_financial_documents(
     - Verify reference IDs and amounts for discrepancies
     """
     
-    logger.info("✅ Analysis completed - creating structured reconciliation results")
-    
-    # Create structured reconciliation results by actually matching transactions
-    reconciliation_results = []
-    matched_right_indices = set()
-    
-    logger.info("🔍 Starting transaction matching between left and right documents")
-    
-    # First pass: Try to match left transactions with right transactions
-    for left_idx, left_record in enumerate(left_document):
-        left_transaction = {
-            "id": f"left-{left_idx}",
-            **left_record
-        }
-        
-        left_amount = float(left_record.get('Amount', 0)) if left_record.get('Amount') else 0
-        left_month = left_record.get('Month', '')
-        left_rest_id = str(left_record.get('Rest ID', '')).strip()
-        
-        best_match = None
-        best_confidence = 0.0
-        best_match_idx = -1
-        
-        # Try to find matching right transaction
-        for right_idx, right_record in enumerate(right_document):
-            # Allow multiple matches - don't skip already matched transactions
-            # This enables many-to-many matching for complex reconciliation scenarios
-            
-            right_amount = float(right_record.get('Amount', 0)) if right_record.get('Amount') else 0
-            right_description = right_record.get('Description', '')
-            right_date = right_record.get('Date', '')
-            
-            # Calculate match confidence based on multiple factors
-            match_confidence = 0.0
-            match_factors = []
-            discrepancies = []
-            
-            # PERFECT MATCH: Amount + Rest ID (100% confidence)
-            # Check if Rest ID matches - handle both direct field comparison and description parsing
-            rest_id_in_description = False
-            right_rest_id = str(right_record.get('Rest ID', '')).strip()
-            
-            if left_rest_id and right_rest_id:
-                # Direct Rest ID field comparison (for data like test20)
-                rest_id_in_description = str(left_rest_id) == str(right_rest_id)
-                logger.info(f"🎯 REST ID comparison: '{left_rest_id}' vs '{right_rest_id}', match: {rest_id_in_description}")
-                if rest_id_in_description:
-                    logger.info(f"🎯 DIRECT REST ID MATCH: {left_rest_id} = {right_rest_id}")
-            elif left_rest_id and right_description:
-                # Extract store number from description (for data like test16)
-                import re
-                store_match = re.search(r'#(\d+)', right_description)
-                if store_match:
-                    store_number = store_match.group(1)
-                    rest_id_in_description = str(left_rest_id) == store_number
-                    if rest_id_in_description:
-                        logger.info(f"🎯 DESCRIPTION REST ID MATCH: {left_rest_id} matches store #{store_number} in '{right_description}'")
-                else:
-                    # Fallback: check if Rest ID appears directly in description
-                    rest_id_in_description = str(left_rest_id) in right_description
-            
-            # Calculate match confidence based on multiple factors
-            match_confidence = 0.0
-            
-            # Check for exact amount match
-            amount_exact_match = False
-            if left_amount > 0 and right_amount > 0:
-                amount_diff = abs(float(left_amount) - float(right_amount))
-                amount_exact_match = amount_diff <= 0.01
-            
-            # Check for Rest ID match (direct field comparison)
-            rest_id_exact_match = False
-            if left_rest_id and right_rest_id:
-                rest_id_exact_match = str(left_rest_id).strip() == str(right_rest_id).strip()
-            
-            # PERFECT MATCH: Exact amount + Exact Rest ID = 100% confidence
-            if amount_exact_match and rest_id_exact_match:
-                match_confidence = 100.0
-                match_factors.append(f"PERFECT MATCH: Exact amount ${left_amount} + Rest ID {left_rest_id} = {right_rest_id}")
-                logger.info(f"🎯 PERFECT MATCH FOUND: Left {left_idx} with Right {right_idx} - Amount: ${left_amount}, Rest ID: {left_rest_id}")
-            
-            # HIGH CONFIDENCE: Exact Rest ID + close amount = 90% confidence  
-            elif rest_id_exact_match and left_amount > 0 and right_amount > 0:
-                amount_diff = abs(float(left_amount) - float(right_amount))
-                amount_ratio = amount_diff / max(float(left_amount), float(right_amount))
-                if amount_ratio <= 0.05:  # Within 5%
-                    match_confidence = 90.0
-                    match_factors.append(f"HIGH CONFIDENCE: Rest ID {left_rest_id} = {right_rest_id} + close amount ${left_amount} ≈ ${right_amount}")
-                else:
-                    match_confidence = 75.0
-                    match_factors.append(f"GOOD MATCH: Rest ID {left_rest_id} = {right_rest_id} + different amount ${left_amount} vs ${right_amount}")
-                    discrepancies.append(f"Amount difference: ${amount_diff:.2f} ({amount_ratio:.1%})")
-            
-            # GOOD CONFIDENCE: Exact amount only = 70% confidence
-            elif amount_exact_match:
-                match_confidence = 70.0
-                match_factors.append(f"GOOD MATCH: Exact amount ${left_amount}")
-            
-            else:
-                # Regular amount matching for non-perfect matches
-                if left_amount > 0 and right_amount > 0:
-                    amount_diff = abs(float(left_amount) - float(right_amount))
-                    amount_ratio = amount_diff / max(float(left_amount), float(right_amount))
-                    
-                    if amount_ratio <= 0.05:  # Within 5%
-                        match_confidence += 30.0
-                        match_factors.append(f"Close amount match: ${left_amount} ≈ ${right_amount}")
-                    elif amount_ratio <= 0.15:  # Within 15%
-                        match_confidence += 15.0
-                        match_factors.append(f"Similar amounts: ${left_amount} vs ${right_amount}")
-                        discrepancies.append(f"Amount difference: ${amount_diff:.2f}")
-                    else:
-                        discrepancies.append(f"Significant amount difference: ${amount_diff:.2f}")
-                
-                # Rest ID matching for description-based data (like test16)
-                if rest_id_in_description and not rest_id_exact_match:
-                    # Rest IDs are unique identifiers, so give significant confidence boost
-                    if left_amount > 0 and right_amount > 0:
-                        amount_diff = abs(left_amount - right_amount)
-                        amount_ratio = amount_diff / max(left_amount, right_amount)
-                        
-                        if amount_ratio <= 0.15:  # Within 15% - very high confidence
-                            match_confidence += 50.0  # Very high boost for Rest ID + close amount
-                            import re
-                            store_match = re.search(r'#(\d+)', right_description)
-                            if store_match:
-                                store_number = store_match.group(1)
-                                match_factors.append(f"🎯 STRONG MATCH: Rest ID {left_rest_id} = Store #{store_number} + similar amount")
-                            else:
-                                match_factors.append(f"🎯 STRONG MATCH: Rest ID {left_rest_id} found + similar amount")
-                        elif amount_ratio <= 0.50:  # Within 50% - still good confidence for unique ID
-                            match_confidence += 35.0  # Good boost for Rest ID even with amount difference
-                            import re
-                            store_match = re.search(r'#(\d+)', right_description)
-                            if store_match:
-                                store_number = store_match.group(1)
-                                match_factors.append(f"🎯 Rest ID {left_rest_id} matches Store #{store_number} (unique identifier)")
-                                discrepancies.append(f"Amount difference: ${amount_diff:.2f} ({amount_ratio:.1%})")
-                            else:
-                                match_factors.append(f"🎯 Rest ID {left_rest_id} found (unique identifier)")
-                                discrepancies.append(f"Amount difference: ${amount_diff:.2f}")
-                        else:
-                            match_confidence += 25.0  # Standard boost for Rest ID match
-                            import re
-                            store_match = re.search(r'#(\d+)', right_description)
-                            if store_match:
-                                store_number = store_match.group(1)
-                                match_factors.append(f"Rest ID {left_rest_id} matches Store #{store_number}")
-                                discrepancies.append(f"Large amount difference: ${amount_diff:.2f} ({amount_ratio:.1%})")
-                            else:
-                                match_factors.append(f"Rest ID {left_rest_id} found in payment description")
-                    else:
-                        match_confidence += 25.0
-                        match_factors.append(f"Rest ID {left_rest_id} found in payment description")
-            
-            # Date/temporal matching
-            if left_month and right_date:
-                if left_month.lower() in right_date.lower():
-                    match_confidence += 20.0
-                    match_factors.append(f"Month match: {left_month} found in {right_date}")
-                else:
-                    discrepancies.append(f"Date mismatch: {left_month} vs {right_date}")
-            
-            # Description analysis for delivery indicators
-            if right_description:
-                delivery_keywords = ['uber', 'doordash', 'grubhub', 'delivery', 'eats', 'restaurant']
-                if any(keyword in right_description.lower() for keyword in delivery_keywords):
-                    match_confidence += 15.0
-                    match_factors.append("Delivery transaction identified")
-                
-                # Check for restaurant names
-                restaurant_keywords = ['starbucks', 'mcdonald', 'pizza', 'cafe', 'restaurant']
-                if any(keyword in right_description.lower() for keyword in restaurant_keywords):
-                    match_confidence += 10.0
-                    match_factors.append("Restaurant transaction identified")
-            
-            # Transaction type bonus
-            if right_record.get('Type', '').lower() == '3rd party delivery':
-                match_confidence += 10.0
-                match_factors.append("3rd party delivery type match")
-            
-            if match_confidence > best_confidence:
-                best_confidence = match_confidence
-                best_match = {
-                    'right_record': right_record,
-                    'right_idx': right_idx,
-                    'factors': match_factors,
-                    'discrepancies': discrepancies
-                }
-                best_match_idx = right_idx
-        
-        # Create reconciliation result
-        if best_match and best_confidence >= 30.0:  # Minimum threshold for matching
-            # Don't add to matched_right_indices to allow many-to-many matching
-            right_transaction = {
-                "id": f"right-{best_match_idx}",
-                **best_match['right_record']
-            }
-            
-            is_reconciled = best_confidence >= 50.0
-            
-            if best_confidence >= 100.0:
-                reasoning = f"🎯 PERFECT MATCH (100%): Sales record {left_idx+1} PERFECTLY matched with payment record {best_match_idx+1}. EXACT amount match + Rest ID found in payment description: {', '.join(best_match['factors'])}. This is a confirmed transaction pair with absolute certainty."
-            elif best_confidence >= 70.0:
-                reasoning = f"🟢 HIGH CONFIDENCE MATCH ({best_confidence:.0f}%): Sales record {left_idx+1} successfully matched with payment record {best_match_idx+1}. Strong correlation found: {', '.join(best_match['factors'])}. This appears to be a confirmed transaction pair with reliable matching indicators."
-            elif best_confidence >= 50.0:
-                reasoning = f"🟡 MODERATE CONFIDENCE MATCH ({best_confidence:.0f}%): Sales record {left_idx+1} shows potential match with payment record {best_match_idx+1}. Matching factors: {', '.join(best_match['factors'])}. Some discrepancies noted: {', '.join(best_match['discrepancies'])}. Recommend manual verification."
-            else:
-                reasoning = f"🔴 LOW CONFIDENCE MATCH ({best_confidence:.0f}%): Sales record {left_idx+1} has weak correlation with payment record {best_match_idx+1}. Limited matching factors: {', '.join(best_match['factors'])}. Significant issues: {', '.join(best_match['discrepancies'])}. Manual investigation required."
-            
-            reconciliation_results.append({
-                "leftTransaction": left_transaction,
-                "rightTransaction": right_transaction,
-                "isReconciled": is_reconciled,
-                "matchedFields": best_match['factors'],
-                "confidence": best_confidence,
-                "aiReasoning": reasoning,
-                "discrepancies": best_match['discrepancies']
-            })
-        else:
-            # No match found for this left transaction
-            reasoning = f"🔴 NO MATCH FOUND (0%): Sales record {left_idx+1} (${left_amount}, {left_month}) could not be matched with any payment records. This transaction may be missing from the bank statement, processed in a different period, or require manual investigation to locate the corresponding payment."
-            
-            reconciliation_results.append({
-                "leftTransaction": left_transaction,
-                "rightTransaction": None,
-                "isReconciled": False,
-                "matchedFields": [],
-                "confidence": 0.0,
-                "aiReasoning": reasoning,
-                "discrepancies": ["No matching payment record found"]
-            })
-    
-    # Second pass: Add unmatched right transactions
-    for right_idx, right_record in enumerate(right_document):
-        if right_idx not in matched_right_indices:
-            right_transaction = {
-                "id": f"right-{right_idx}",
-                **right_record
-            }
-            
-            right_amount = right_record.get('Amount', 0)
-            right_description = right_record.get('Description', '')
-            
-            reasoning = f"🔴 UNMATCHED PAYMENT (0%): Payment record {right_idx+1} (${right_amount}) could not be matched with any sales records. Description: '{right_description}'. This payment may correspond to sales from a different period, different restaurant, or require manual investigation to locate the corresponding sales transaction."
-            
-            reconciliation_results.append({
-                "leftTransaction": None,
-                "rightTransaction": right_transaction,
-                "isReconciled": False,
-                "matchedFields": [],
-                "confidence": 0.0,
-                "aiReasoning": reasoning,
-                "discrepancies": ["No matching sales record found"]
-            })
-    
     # Calculate reconciliation counts
     reconciled_count = sum(1 for r in reconciliation_results if r["isReconciled"])
     total_count = len(reconciliation_results)
@@ -349,10 +156,70 @@ def reconcile_financial_documents(
             "processedBy": "Confidence Demo Engine",
             "timestamp": datetime.utcnow().isoformat(),
             "profileContext": profile_context,
-            "processingMethod": "Direct JSON Data Processing with Confidence Variation"
+            "processingMethod": "Direct JSON Data Processing with Confidence Variation",
+            "columnRoles": {"left": left_columns, "right": right_columns},
+            **metadata
         }
     }
 
+# Built by the first job operation - the job store runs the matching engine
+jobs = None
+
+def get_jobs():
+    global jobs
+    if jobs is None:
+        from reconciliation_jobs import JobStore
+
+        jobs = JobStore(respond=reconciliation_response, tasks=app)
+    return jobs
+
+def cached_reconciliation(left_document: List[Dict[str, Any]], right_document: List[Dict[str, Any]],
+                          profile_context: Dict[str, Any], matching_rules: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    reconcile_financial_documents behind the result cache - identical concurrent requests are computed once
+    """
+    from matching_engine import ENGINE_VERSION
+
+    rules = matching_rules if matching_rules is not None else profile_context.get("matchingRules", [])
+    if not RESULT_CACHE_ENABLED or not profile_context.get("resultCache", True):
+        result = reconcile_financial_documents(left_document, right_document, profile_context)
+        result["metadata"]["resultCache"] = {"enabled": False}
+        return result
+
+    key = result_key(left_document, right_document, rules, ENGINE_VERSION)
+    cached, info = result_cache.get_or_compute(
+        key, lambda: reconcile_financial_documents(left_document, right_document, profile_context)
+    )
+    if info["hit"] or info["coalesced"]:
+        logger.info(f"♻️ Reusing reconciliation result {key[:12]} (hit={info['hit']}, coalesced={info['coalesced']})")
+    # Cached responses are shared - callers get their own top-level and metadata dicts to annotate
+    result = {**cached, "metadata": {**cached["metadata"], "profileContext": profile_context}}
+    result["metadata"]["resultCache"] = {"enabled": True, "key": key, **info, **result_cache.stats()}
+    return result
+
+
+def busy_response(error: ServerBusy) -> JSONResponse:
+    """
+    Fast 503 with a Retry-After hint, instead of queueing behind work already in flight
+    """
+    return JSONResponse(
+        {
+            "success": False,
+            "status": "busy",
+            "message": str(error),
+            "retryAfterSeconds": error.retry_after,
+            "metadata": {"workQueue": get_work_queue().stats(), "timestamp": datetime.utcnow().isoformat()}
+        },
+        status_code=503,
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def reference_error_response(error: DocumentReferenceError) -> JSONResponse:
+    return JSONResponse(
+        {"success": False, "message": str(error), "metadata": {"timestamp": datetime.utcnow().isoformat()}},
+        status_code=error.status_code
+    )
+
 @app.entrypoint
 def clofast_reconciliation_agent(payload):
     """
@@ -361,15 +228,200 @@ def clofast_reconciliation_agent(payload):
     operation = payload.get("operation", "reconcile")
     logger.info(f"Processing {operation} request")
     
-    if operation == "reconcile":
+    if operation == "batch_extract" and payload.get("stream", True):
+        # Streamed responses are measured over the whole stream, not just until it starts
+        return tracked_stream(operation, payload)
+    
+    with track_request(operation if operation in OPERATIONS else "unknown") as request_metrics:
+        response = handle_operation(operation, payload)
+        if isinstance(response, dict):
+            response = serialized_response(response)
+        request_metrics.status = response_status(response)
+    return response
+
+def tracked_stream(operation: str, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Run a streaming operation inside track_request, counting the records it yields
+    """
+    with track_request(operation):
+        started = time.perf_counter()
+        records = 0
+        for item in handle_operation(operation, payload):
+            records += len(item.get("extractedData", []))
+            yield item
+        record_work(operation, records, time.perf_counter() - started)
+
+def serialized_response(result: Dict[str, Any]):
+    """
+    Encode a result as the app would, inside its own span - values json cannot encode are left to the app
+    """
+    with stage_span("response.serialize", rows=len(result.get("reconciliationResults", []))) as span:
+        try:
+            body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        except (TypeError, ValueError):
+            return result
+        span.set(bytes=len(body))
+    return Response(body, media_type="application/json")
+
+def handle_operation(operation: str, payload: Dict[str, Any]):
+    """
+    Dispatch one invocation by its operation
+    """
+    if operation in ("reconcile", "extract_and_reconcile"):
+        profile_context = payload.get("profileContext", {})
+        left_document, right_document = payload.get("leftDocument", []), payload.get("rightDocument", [])
+        
+        # extract_and_reconcile takes two /extract-style requests and never returns the extracted rows to the caller
+        if operation == "extract_and_reconcile" and not (is_reference(left_document) and is_reference(right_document)):
+            return reference_error_response(DocumentReferenceError("extract_and_reconcile needs a document reference for both sides"))
+        
+        try:
+            # Either document may be a file://, http(s):// or s3:// reference instead of an inline array
+            started = time.perf_counter()
+            left_document, right_document, sources = resolve_documents(left_document, right_document)
+            extracted = time.perf_counter()
+            logger.info(f"📊 Received data: {len(left_document)} left, {len(right_document)} right records")
+            result = cached_reconciliation(left_document, right_document, profile_context, payload.get("matchingRules"))
+        except ServerBusy as e:
+            return busy_response(e)
+        except DocumentReferenceError as e:
+            return reference_error_response(e)
+        result["metadata"]["documentSources"] = sources
+        result["metadata"]["compression"] = compression_metadata()
+        if operation == "extract_and_reconcile":
+            result["metadata"]["pipeline"] = {
+                "extractSeconds": round(extracted - started, 3),
+                "reconcileSeconds": round(time.perf_counter() - extracted, 3),
+                "leftRecords": len(left_document),
+                "rightRecords": len(right_document)
+            }
+            if payload.get("includeExtractedData", False):
+                result["extractedData"] = {"left": list(left_document), "right": list(right_document)}
+        return result
+    
+    if operation == "reconcile_batch":
+        profile_context = payload.get("profileContext", {})
+        documents = payload.get("documents", {})
+        
+        # All documentPairs of a matching rule in one call - each distinct document is loaded and prepared once
+        from batch_reconciliation import parse_pairs, reconcile_document_pairs
+
+        try:
+            pairs = parse_pairs(payload.get("documentPairs"), list(documents) if isinstance(documents, dict) else [])
+            used = {document_id: documents[document_id] for pair in pairs for document_id in pair}
+            records, sources = load_documents(used)
+            logger.info(f"📊 Received batch: {len(pairs)} pairs over {len(records)} documents")
+            pair_results, batch_stats = reconcile_document_pairs(records, pairs, get_work_queue())
+            record_work(
+                operation, sum(len(records[left_id]) + len(records[right_id]) for left_id, right_id in pairs),
+                batch_stats["prepareSeconds"] + batch_stats["reconcileSeconds"],
+                pairs=sum(len(records[left_id]) * len(records[right_id]) for left_id, right_id in pairs)
+            )
+        except ServerBusy as e:
+            return busy_response(e)
+        except DocumentReferenceError as e:
+            return reference_error_response(e)
+        
+        responses = []
+        for pair in pair_results:
+            response = reconciliation_response(
+                records[pair["leftDocumentId"]], records[pair["rightDocumentId"]], profile_context,
+                pair["results"], pair["leftColumns"], pair["rightColumns"], pairSeconds=pair["seconds"]
+            )
+            responses.append({"leftDocumentId": pair["leftDocumentId"], "rightDocumentId": pair["rightDocumentId"], **response})
+        return {
+            "success": True,
+            "pairs": responses,
+            "summary": {
+                "pairs": len(responses),
+                "totalTransactions": sum(r["summary"]["totalTransactions"] for r in responses),
+                "reconciledCount": sum(r["summary"]["reconciledCount"] for r in responses),
+                "unreconciledCount": sum(r["summary"]["unreconciledCount"] for r in responses)
+            },
+            "metadata": {
+                "timestamp": datetime.utcnow().isoformat(),
+                "profileContext": profile_context,
+                "batch": batch_stats,
+                "documentSources": sources,
+                "workQueue": get_work_queue().stats(),
+                "compression": compression_metadata()
+            }
+        }
+    
+    if operation == "reconcile_chain":
+        profile_context = payload.get("profileContext", {})
+        
+        # N-way: sources in flow order (POS -> gateway -> bank), linked into chains hop by hop
+        from chain_reconciliation import parse_sources, reconcile_chain
+
+        try:
+            sources = parse_sources(payload.get("sources"))
+            records, document_sources = load_documents(dict(sources))
+            logger.info(f"📊 Received chain: {', '.join(f'{name} ({len(records[name])})' for name in records)}")
+            chain = reconcile_chain(records, get_work_queue())
+            sizes = [len(source) for source in records.values()]
+            record_work(
+                operation, sum(sizes), sum(chain["timings"].values()),
+                pairs=sum(upstream * downstream for upstream, downstream in zip(sizes, sizes[1:]))
+            )
+        except ServerBusy as e:
+            return busy_response(e)
+        except DocumentReferenceError as e:
+            return reference_error_response(e)
+        
+        return {
+            "success": True,
+            "chains": chain["chains"],
+            "hops": chain["hops"],
+            "summary": chain["summary"],
+            "metadata": {
+                "processedBy": "Confidence Demo Engine",
+                "timestamp": datetime.utcnow().isoformat(),
+                "profileContext": profile_context,
+                "columnRoles": chain["columnRoles"],
+                "timings": chain["timings"],
+                "documentSources": document_sources,
+                "workQueue": get_work_queue().stats(),
+                "compression": compression_metadata()
+            }
+        }
+    
+    if operation == "submit":
         left_document = payload.get("leftDocument", [])
         right_document = payload.get("rightDocument", [])
+        
+        # Long reconciliations run in the background - poll "status", then page through "result"
+        try:
+            return get_jobs().submit(left_document, right_document, payload.get("profileContext", {}))
+        except ServerBusy as e:
+            return busy_response(e)
+    
+    if operation in ("status", "result"):
+        job_id = payload.get("jobId", "")
+        if operation == "status":
+            response = get_jobs().status(job_id)
+        else:
+            from reconciliation_jobs import DEFAULT_PAGE_SIZE
+
+            try:
+                page, page_size = int(payload.get("page", 1)), int(payload.get("pageSize", DEFAULT_PAGE_SIZE))
+            except (TypeError, ValueError):
+                return JSONResponse({"success": False, "jobId": job_id, "message": "page and pageSize must be integers"}, status_code=400)
+            response = get_jobs().result(job_id, page, page_size)
+        if response is None:
+            return JSONResponse({"success": False, "jobId": job_id, "message": "Unknown or expired job"}, status_code=404)
+        return response
+    
+    if operation == "batch_extract":
+        documents = payload.get("documents", [])
         profile_context = payload.get("profileContext", {})
         
-        logger.info(f"📊 Received data: {len(left_document)} left, {len(right_document)} right records")
+        logger.info(f"📦 Received batch extraction for {len(documents)} documents")
         
-        result = reconcile_financial_documents(left_document, right_document, profile_context)
-        return result
+        # Streaming (default) returns each document's result as soon as it completes
+        if payload.get("stream", True):
+            return iter_batch_extract(documents, profile_context)
+        return batch_extract(documents, profile_context)
     
     return f"Unknown operation: {operation}"
 
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Managed Bedrock agent clients.
+
+The boto3 session, the bedrock-runtime client (with its HTTP connection pool)
+and the Strands model are built once per process, lazily and thread-safely,
+and shared by every agent. Agents themselves stay per call because a Strands
+agent handles one invocation at a time. The /ping path can pre-warm the
+clients in the background so the first request skips client and credential
+setup.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from llm_instrumentation import instrument_client
+
+logger = logging.getLogger(__name__)
+
+BEDROCK_MODEL_ID = os.environ.get("BEDROCK_MODEL_ID")
+BEDROCK_REGION = os.environ.get("BEDROCK_REGION", os.environ.get("AWS_REGION"))
+LLM_MAX_POOL_CONNECTIONS = int(os.environ.get("LLM_MAX_POOL_CONNECTIONS", "20"))
+LLM_MAX_ATTEMPTS = int(os.environ.get("LLM_MAX_ATTEMPTS", "4"))
+LLM_PREWARM_ON_PING = os.environ.get("LLM_PREWARM_ON_PING", "true").lower() not in ("0", "false", "no", "off")
+
+
+class AgentClientFactory:
+    """
+    Builds the shared Bedrock session, client and model once, and fresh agents on top of them
+    """
+
+    def __init__(
+        self,
+        model_id: Optional[str] = BEDROCK_MODEL_ID,
+        system_prompt: Optional[str] = None,
+        region_name: Optional[str] = BEDROCK_REGION,
+        max_pool_connections: int = LLM_MAX_POOL_CONNECTIONS
+    ):
+        self._model_id = model_id
+        self.system_prompt = system_prompt
+        self.region_name = region_name
+        self.max_pool_connections = max_pool_connections
+        self._lock = threading.Lock()
+        self._session = None
+        self._model = None
+        self._prewarm_thread: Optional[threading.Thread] = None
+        self.warmup_seconds: Optional[float] = None
+
+    @property
+    def model_id(self) -> str:
+        if self._model_id is None:
+            from strands.models.bedrock import DEFAULT_BEDROCK_MODEL_ID
+            self._model_id = DEFAULT_BEDROCK_MODEL_ID
+        return self._model_id
+
+    @property
+    def is_warm(self) -> bool:
+        return self._model is not None
+
+    def boto_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import boto3
+                    self._session = boto3.Session(region_name=self.region_name)
+        return self._session
+
+    def model(self):
+        """
+        The shared Strands Bedrock model - its boto3 client is thread-safe and pools connections
+        """
+        if self._model is None:
+            session = self.boto_session()
+            with self._lock:
+                if self._model is None:
+                    from botocore.config import Config
+                    from strands.models.bedrock import BedrockModel
+
+                    started = time.perf_counter()
+                    self._model = BedrockModel(
+                        model_id=self.model_id,
+                        boto_session=session,
+                        boto_client_config=Config(
+                            max_pool_connections=self.max_pool_connections,
+                            retries={"mode": "adaptive", "max_attempts": LLM_MAX_ATTEMPTS}
+                        )
+                    )
+                    instrument_client(self._model.client)
+                    logger.info(f"🔌 Bedrock client for {self.model_id} created in {time.perf_counter() - started:.2f}s")
+        return self._model
+
+    @property
+    def client(self):
+        return self.model().client
+
+    def create_agent(self):
+        """
+        A fresh agent for one invocation, sharing the process-wide model and client
+        """
+        from strands import Agent
+
+        return Agent(model=self.model(), system_prompt=self.system_prompt, callback_handler=None)
+
+    def prewarm(self) -> bool:
+        """
+        Build the client and resolve credentials now instead of on the first request
+        """
+        started = time.perf_counter()
+        try:
+            self.model()
+            credentials = self.boto_session().get_credentials()
+            if credentials is not None:
+                credentials.get_frozen_credentials()
+        except Exception as e:
+            logger.warning(f"⚠️ Agent client pre-warm failed: {str(e)}")
+            return False
+        self.warmup_seconds = round(time.perf_counter() - started, 3)
+        logger.info(f"🔥 Agent clients pre-warmed in {self.warmup_seconds}s")
+        return True
+
+    def prewarm_in_background(self) -> None:
+        """
+        Start pre-warming once, without blocking the caller
+        """
+        if self.is_warm or self._prewarm_thread is not None:
+            return
+        with self._lock:
+            if self._prewarm_thread is None:
+                self._prewarm_thread = threading.Thread(target=self.prewarm, name="agent-prewarm", daemon=True)
+                self._prewarm_thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"modelId": self.model_id, "warm": self.is_warm, "warmupSeconds": self.warmup_seconds}
@@ -1,16 +1,89 @@
 #!/usr/bin/env python3
 
-import json
 import logging
+import os
+import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from bedrock_agentcore import tool, app
+from bedrock_agentcore.runtime import BedrockAgentCoreApp
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse
+from agent_clients import LLM_PREWARM_ON_PING, AgentClientFactory
+from batch_extraction import concurrency_setting
+from compression import CompressionMiddleware, compression_metadata
+from document_refs import DocumentReferenceError, resolve_documents
+from llm_cache import get_response_cache
+from llm_instrumentation import LlmMetrics
+from metrics import install_metrics_route, record_work, register_cache, track_request
+from prompt_encoding import DEFAULT_PROMPT_ENCODING, ENCODINGS
+from stub_model import StubModel
+from tracing import configure_local_exporter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@tool
+app = BedrockAgentCoreApp(middleware=[Middleware(CompressionMiddleware)])
+configure_local_exporter()
+install_metrics_route(app)
+
+# "stub" answers locally without Bedrock - for throughput testing
+LLM_BACKEND = os.environ.get("RECONCILIATION_LLM", "bedrock")
+# "hybrid" sends only the matcher's residue to the LLM, "llm" sends every record
+RECONCILIATION_MODE = os.environ.get("RECONCILIATION_MODE", "hybrid")
+SYSTEM_PROMPT = "You are a financial reconciliation analyst matching restaurant sales records to payment records."
+
+# Session, Bedrock client and model are built once per process and shared by every agent
+agent_clients = AgentClientFactory(system_prompt=SYSTEM_PROMPT)
+_stub_model = StubModel()
+
+if get_response_cache() is not None:
+    register_cache("llm", lambda: (get_response_cache().hits, get_response_cache().misses))
+
+# The matching engine (NumPy/pandas, via the hybrid and chunked pipelines) is imported by the first
+# reconciliation and strands by agent_clients, so a cold container answers /ping before they load
+
+
+def create_agent():
+    """
+    A model for one LLM call - a Strands agent handles one invocation at a time
+    """
+    if LLM_BACKEND == "stub":
+        return _stub_model
+    return agent_clients.create_agent()
+
+
+def model_id() -> str:
+    return StubModel.model_id if LLM_BACKEND == "stub" else agent_clients.model_id
+
+
+@app.ping
+def ping_status():
+    """
+    Report the automatic status, warming the agent clients on the first ping
+    """
+    if LLM_PREWARM_ON_PING and LLM_BACKEND != "stub":
+        agent_clients.prewarm_in_background()
+    return None
+
+def llm_settings(profile_context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The per-request LLM overrides in profileContext, clamped to their limits - ValueError for an invalid one
+    """
+    from chunked_prompting import DEFAULT_MAX_CONCURRENCY, DEFAULT_TOKEN_BUDGET, MAX_CONCURRENCY_LIMIT, MIN_TOKEN_BUDGET, TOKEN_BUDGET_LIMIT
+    from hybrid_reconciliation import DEFAULT_TOP_K, TOP_K_LIMIT
+
+    encoding = profile_context.get("promptEncoding", DEFAULT_PROMPT_ENCODING)
+    if encoding not in ENCODINGS:
+        raise ValueError(f"promptEncoding must be one of {', '.join(ENCODINGS)}")
+    token_budget = concurrency_setting(profile_context.get("chunkTokenBudget"), DEFAULT_TOKEN_BUDGET, TOKEN_BUDGET_LIMIT, "chunkTokenBudget")
+    return {
+        "token_budget": max(token_budget, MIN_TOKEN_BUDGET),
+        "max_concurrency": concurrency_setting(profile_context.get("maxConcurrency"), DEFAULT_MAX_CONCURRENCY, MAX_CONCURRENCY_LIMIT, "maxConcurrency"),
+        "top_k": concurrency_setting(profile_context.get("topK"), DEFAULT_TOP_K, TOP_K_LIMIT, "topK"),
+        "encoding": encoding
+    }
+
 def reconcile_financial_documents(
     left_document: List[Dict[str, Any]],
     right_document: List[Dict[str, Any]],
@@ -19,82 +92,81 @@ def reconcile_financial_documents(
     """
     Reconcile financial documents - NO FALLBACKS, STRICT PROCESSING ONLY
     """
+    from chunked_prompting import analyze_in_chunks
+    from hybrid_reconciliation import hybrid_reconcile
+
     logger.info(f"🔍 Starting reconciliation: {len(left_document)} left, {len(right_document)} right records")
     
-    # Convert provided data to JSON and send to LLM for analysis
-    logger.info("📊 Converting data to JSON for LLM analysis")
-    
-    comprehensive_prompt = f"""
-    SALES AND PAYMENT RECONCILIATION - JSON DATA ANALYSIS:
-    
-    LEFT DOCUMENT DATA:
-    Records: {len(left_document)}
-    JSON Data: {json.dumps(left_document, indent=2, default=str)}
-    
-    RIGHT DOCUMENT DATA:
-    Records: {len(right_document)}
-    JSON Data: {json.dumps(right_document, indent=2, default=str)}
-    
-    TASK: Perform comprehensive reconciliation analysis on this JSON data.
-    
-    Please analyze these datasets and provide:
-    1. Document type identification and data structure analysis
-    2. Transaction matching and reconciliation results
-    3. Detailed business insights and explanations
-    4. Unmatched records with specific reasons
-    5. Confidence scores and recommendations
-    
-    Create a comprehensive business analysis explaining the relationship between these datasets.
-    """
-    
-    # Call the agent with provided data
-    logger.info("🤖 Calling LLM agent with JSON data for comprehensive analysis")
-    response = agent(comprehensive_prompt)
-    
-    # Extract the response content
-    if hasattr(response, 'message') and 'content' in response.message:
-        analysis_text = response.message['content'][0]['text']
+    profile_context = profile_context or {}
+    mode = profile_context.get("reconciliationMode", RECONCILIATION_MODE)
+    settings = llm_settings(profile_context)
+    token_budget, max_concurrency, encoding = settings["token_budget"], settings["max_concurrency"], settings["encoding"]
+    
+    # Identical prompts to the same model are answered from the persistent response cache
+    response_cache = get_response_cache()
+    cache = response_cache.session(model_id(), SYSTEM_PROMPT) if response_cache and profile_context.get("llmCache", True) else None
+    llm_metrics = LlmMetrics(model_id())
+    
+    if mode == "hybrid":
+        # Deterministic matcher first - only the ambiguous/unmatched residue goes to the LLM
+        logger.info("⚖️ Hybrid reconciliation: deterministic matching, LLM adjudication of the residue")
+        reconciliation_results, hybrid = hybrid_reconcile(
+            left_document, right_document, create_agent, token_budget, max_concurrency,
+            settings["top_k"], encoding, cache, llm_metrics
+        )
+        analysis_text = (
+            f"Deterministic matcher settled {hybrid['resolvedByMatcher']} of {len(left_document)} sales records. "
+            f"{hybrid['residue']} ambiguous or unmatched records were sent to the LLM with their top {hybrid['topK']} candidates "
+            f"in {hybrid['llmCalls']} prompts; {hybrid['adjudicatedByLlm']} were adjudicated by the LLM."
+        )
+        processing = {"processingMethod": "Hybrid Matching with LLM Adjudication", "hybrid": hybrid}
     else:
-        analysis_text = str(response)
-    
-    logger.info("✅ LLM analysis completed - creating structured reconciliation results")
-    
-    # Create structured reconciliation results for frontend tables
-    reconciliation_results = []
-    
-    # Process ALL left document records
-    for i, record in enumerate(left_document):
-        left_transaction = {
-            "id": f"left-{i}",
-            **record
-        }
+        # Records are sent in token-budgeted chunks, grouped by store so candidate matches share a chunk
+        logger.info("🤖 Calling LLM agent with chunked JSON data for reconciliation analysis")
+        analysis_text, chunking = analyze_in_chunks(
+            left_document, right_document, create_agent, token_budget, max_concurrency, encoding, cache, llm_metrics
+        )
+    
+        logger.info("✅ LLM analysis completed - creating structured reconciliation results")
+    
+        # Create structured reconciliation results for frontend tables
+        reconciliation_results = []
+    
+        # Process ALL left document records
+        for i, record in enumerate(left_document):
+            left_transaction = {
+                "id": f"left-{i}",
+                **record
+            }
         
-        reconciliation_results.append({
-            "leftTransaction": left_transaction,
-            "rightTransaction": None,
-            "isReconciled": False,
-            "matchedFields": [],
-            "confidence": 25.0,
-            "aiReasoning": f"Left document record {i+1}: See comprehensive LLM analysis above for detailed reconciliation insights.",
-            "discrepancies": ["See LLM analysis above for detailed reconciliation results"]
-        })
-    
-    # Process ALL right document records
-    for i, record in enumerate(right_document):
-        right_transaction = {
-            "id": f"right-{i}",
-            **record
-        }
+            reconciliation_results.append({
+                "leftTransaction": left_transaction,
+                "rightTransaction": None,
+                "isReconciled": False,
+                "matchedFields": [],
+                "confidence": 25.0,
+                "aiReasoning": f"Left document record {i+1}: See comprehensive LLM analysis above for detailed reconciliation insights.",
+                "discrepancies": ["See LLM analysis above for detailed reconciliation results"]
+            })
+    
+        # Process ALL right document records
+        for i, record in enumerate(right_document):
+            right_transaction = {
+                "id": f"right-{i}",
+                **record
+            }
+        
+            reconciliation_results.append({
+                "leftTransaction": None,
+                "rightTransaction": right_transaction,
+                "isReconciled": False,
+                "matchedFields": [],
+                "confidence": 25.0,
+                "aiReasoning": f"Right document record {i+1}: See comprehensive LLM analysis above for detailed reconciliation insights.",
+                "discrepancies": ["See LLM analysis above for detailed reconciliation results"]
+            })
         
-        reconciliation_results.append({
-            "leftTransaction": None,
-            "rightTransaction": right_transaction,
-            "isReconciled": False,
-            "matchedFields": [],
-            "confidence": 25.0,
-            "aiReasoning": f"Right document record {i+1}: See comprehensive LLM analysis above for detailed reconciliation insights.",
-            "discrepancies": ["See LLM analysis above for detailed reconciliation results"]
-        })
+        processing = {"processingMethod": "Chunked JSON Data Processing", "chunking": chunking}
     
     # Calculate reconciliation counts
     reconciled_count = sum(1 for r in reconciliation_results if r["isReconciled"])
@@ -121,7 +193,9 @@ def reconcile_financial_documents(
             "processedBy": "Side-by-Side Reconciliation Engine",
             "timestamp": datetime.utcnow().isoformat(),
             "profileContext": profile_context,
-            "processingMethod": "Direct JSON Data Processing"
+            **processing,
+            "llmCache": cache.stats() if cache else {"enabled": False},
+            "llm": llm_metrics.summary()
         }
     }
 
@@ -134,10 +208,35 @@ def clofast_reconciliation_agent(payload):
     logger.info(f"Processing {operation} request")
     
     if operation == "reconcile":
-        left_document = payload.get("leftDocument", [])
-        right_document = payload.get("rightDocument", [])
-        profile_context = payload.get("profileContext", {})
-        
-        return reconcile_financial_documents(left_document, right_document, profile_context)
-    
-    return f"Unknown operation: {operation}"
\ No newline at end of file
+        with track_request(operation) as request_metrics:
+            profile_context = payload.get("profileContext", {})
+            
+            try:
+                llm_settings(profile_context)
+            except ValueError as e:
+                request_metrics.status = 400
+                return JSONResponse(
+                    {"success": False, "message": str(e), "metadata": {"timestamp": datetime.utcnow().isoformat()}},
+                    status_code=400
+                )
+            try:
+                left_document, right_document, sources = resolve_documents(
+                    payload.get("leftDocument", []), payload.get("rightDocument", [])
+                )
+            except DocumentReferenceError as e:
+                request_metrics.status = e.status_code
+                return JSONResponse(
+                    {"success": False, "message": str(e), "metadata": {"timestamp": datetime.utcnow().isoformat()}},
+                    status_code=e.status_code
+                )
+            started = time.perf_counter()
+            result = reconcile_financial_documents(left_document, right_document, profile_context)
+            record_work(operation, len(left_document) + len(right_document), time.perf_counter() - started)
+            result["metadata"]["documentSources"] = sources
+            result["metadata"]["compression"] = compression_metadata()
+            return result
+    
+    return f"Unknown operation: {operation}"
+
+if __name__ == "__main__":
+    app.run()
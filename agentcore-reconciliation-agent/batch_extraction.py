@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Batch document extraction - downloads overlap on a bounded thread pool while
+PDF/spreadsheet parsing runs on the shared work queue's workers. Results are
+yielded as each document completes and a failing document never affects the
+others.
+"""
+
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from excel_extraction import SPREADSHEET_EXTENSIONS, extract_from_excel, extract_spreadsheet
+from tracing import stage_span
+from work_queue import WorkQueue, get_work_queue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DOWNLOADS = int(os.environ.get("EXTRACT_MAX_DOWNLOADS", "4"))
+DEFAULT_MAX_WORKERS = int(os.environ.get("EXTRACT_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Ceilings for the per-request max_downloads / max_workers overrides
+MAX_DOWNLOADS_LIMIT = int(os.environ.get("EXTRACT_MAX_DOWNLOADS_LIMIT", str(max(DEFAULT_MAX_DOWNLOADS, 16))))
+MAX_WORKERS_LIMIT = int(os.environ.get("EXTRACT_MAX_WORKERS_LIMIT", str(max(DEFAULT_MAX_WORKERS, os.cpu_count() or 1))))
+DOWNLOAD_TIMEOUT = 30
+
+
+def concurrency_setting(value: Any, default: int, limit: int, name: str) -> int:
+    """
+    A per-request concurrency override clamped to limit - ValueError unless it is a positive integer
+    """
+    if value is None:
+        return min(default, limit)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return min(value, limit)
+
+
+def download_document(document_url: str, timeout: int = DOWNLOAD_TIMEOUT, allow_redirects: bool = True, session=None) -> bytes:
+    """
+    Download a document and return its raw bytes, through session when one is given
+    """
+    import requests
+
+    with stage_span("extract.download") as span:
+        response = (session or requests).get(document_url, timeout=timeout, allow_redirects=allow_redirects)
+        response.raise_for_status()
+        if response.is_redirect:
+            raise requests.HTTPError(f"{response.status_code} redirect not followed", response=response)
+        span.set(bytes=len(response.content), status_code=response.status_code)
+        return response.content
+
+
+def fetch_document(document_url: str, timeout: int = DOWNLOAD_TIMEOUT) -> bytes:
+    """
+    Download a caller-supplied URL with the checks document references get - file root, public hosts, no redirects
+    """
+    from document_refs import fetch_bytes, parse_reference
+
+    return fetch_bytes(parse_reference(document_url), timeout)
+
+
+def extract_document(
+    file_content: bytes,
+    document_url: Optional[str],
+    document_name: str,
+    extraction_rules: List[Dict],
+    profile_context: Dict,
+    full_scan: bool = False,
+    compact: bool = False
+) -> Dict[str, Any]:
+    """
+    Route a downloaded document to the PDF or spreadsheet extractor by file extension.
+
+    With compact, spreadsheet rows stay SpreadsheetRecords instead of a list of dicts.
+    """
+    file_extension = document_name.lower().split('.')[-1] if '.' in document_name else 'unknown'
+    logger.info(f"📄 Document type: {file_extension}")
+
+    if file_extension == 'pdf' or file_extension in SPREADSHEET_EXTENSIONS:
+        with stage_span("extract.document", document_type=file_extension, bytes=len(file_content)) as span:
+            if file_extension == 'pdf':
+                # Imported on the first PDF - the pattern parser pulls in pandas
+                from pdf_extraction import extract_from_pdf_text
+
+                result = extract_from_pdf_text(file_content, document_url, document_name, extraction_rules, profile_context, full_scan)
+            else:
+                extract = extract_spreadsheet if compact else extract_from_excel
+                result = extract(file_content, document_name, extraction_rules, profile_context, document_url)
+            span.set(rows=len(result.get("extractedData", [])), success=bool(result.get("success")))
+            return result
+
+    return {
+        "success": False,
+        "message": f"Unsupported file type: {file_extension}. Only PDF, Excel and CSV are supported.",
+        "extractedData": [],
+        "metadata": {}
+    }
+
+
+def normalize_document_request(document: Dict[str, Any], profile_context: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    Accept both the snake_case (/extract) and camelCase (AgentCore) document fields
+    """
+    return {
+        "document_url": document.get("document_url", document.get("documentUrl")),
+        "document_name": document.get("document_name", document.get("documentName", "Unknown Document")),
+        "extraction_rules": document.get("extraction_rules", document.get("extractionRules", [])) or [],
+        "profile_context": document.get("profile_context", document.get("profileContext", profile_context)) or {},
+        "full_scan": bool(document.get("full_scan", document.get("fullScan", False)))
+    }
+
+
+def _failed_result(document: Dict[str, Any], message: str) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "message": message,
+        "extractedData": [],
+        "metadata": {
+            "documentUrl": document["document_url"],
+            "documentName": document["document_name"],
+            "timestamp": datetime.utcnow().isoformat(),
+            "error": message
+        }
+    }
+
+
+def _batch_item(index: int, document: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    # Workers send spreadsheet rows back as compact tuples; record dicts are built only for the response
+    records = result.get("extractedData")
+    if hasattr(records, "to_records"):
+        result = {**result, "extractedData": records.to_records()}
+    return {"index": index, "documentName": document["document_name"], **result}
+
+
+def iter_batch_extract(
+    documents: List[Dict[str, Any]],
+    profile_context: Optional[Dict] = None,
+    max_downloads: int = DEFAULT_MAX_DOWNLOADS,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    downloader=fetch_document,
+    queue: Optional[WorkQueue] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Extract many documents concurrently, yielding each result as soon as it is ready.
+
+    Every yielded item carries the document's position in the request as "index". At most
+    max_workers documents of the request are parsed at once, each admitted to the work queue.
+    """
+    max_downloads = min(max(1, max_downloads), MAX_DOWNLOADS_LIMIT)
+    max_workers = min(max(1, max_workers), MAX_WORKERS_LIMIT)
+    requests_ = [normalize_document_request(document, profile_context) for document in documents]
+    logger.info(f"📦 Batch extraction of {len(requests_)} documents ({max_downloads} downloads, {max_workers} workers)")
+
+    queue = queue or get_work_queue()
+    download_executor = ThreadPoolExecutor(max_workers=max_downloads, thread_name_prefix="extract-download")
+    # These threads only wait on the work queue, which does the parsing
+    parse_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extract-parse")
+    downloads = {}
+    parses = {}
+
+    try:
+        for index, document in enumerate(requests_):
+            if not document["document_url"]:
+                yield _batch_item(index, document, _failed_result(document, "No document URL provided"))
+                continue
+            downloads[download_executor.submit(downloader, document["document_url"])] = index
+
+        pending = set(downloads)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in downloads:
+                    index = downloads.pop(future)
+                    document = requests_[index]
+                    try:
+                        file_content = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ Download failed for {document['document_name']}: {str(e)}")
+                        yield _batch_item(index, document, _failed_result(document, f"Download failed: {str(e)}"))
+                        continue
+
+                    parse_future = parse_executor.submit(
+                        queue.run,
+                        extract_document,
+                        file_content,
+                        document["document_url"],
+                        document["document_name"],
+                        document["extraction_rules"],
+                        document["profile_context"],
+                        document["full_scan"],
+                        True,
+                        weight=len(file_content)
+                    )
+                    parses[parse_future] = index
+                    pending.add(parse_future)
+                else:
+                    index = parses.pop(future)
+                    document = requests_[index]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ Extraction failed for {document['document_name']}: {str(e)}")
+                        result = _failed_result(document, f"Extraction failed: {str(e)}")
+                    logger.info(f"✅ Batch item {index} ({document['document_name']}) completed: success={result.get('success')}")
+                    yield _batch_item(index, document, result)
+    finally:
+        download_executor.shutdown(wait=False, cancel_futures=True)
+        parse_executor.shutdown(wait=True, cancel_futures=True)
+
+
+def batch_extract(documents: List[Dict[str, Any]], profile_context: Optional[Dict] = None, **kwargs) -> Dict[str, Any]:
+    """
+    Run a batch extraction to completion and return all results in request order
+    """
+    results = sorted(iter_batch_extract(documents, profile_context, **kwargs), key=lambda item: item["index"])
+    succeeded = sum(1 for item in results if item.get("success"))
+    return {
+        "success": succeeded == len(results),
+        "message": f"Extracted {succeeded} of {len(results)} documents",
+        "results": results,
+        "metadata": {
+            "documentsRequested": len(documents),
+            "documentsSucceeded": succeeded,
+            "documentsFailed": len(results) - succeeded,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    }
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+N-way reconciliation - POS, payment gateway and bank in one pass.
+
+Sources are given in flow order. Each source is normalized into a
+PreparedDocument once, and every hop between neighbouring sources (POS to
+gateway, gateway to bank) is matched on the work queue in parallel with the
+same scorer as a two-sided reconciliation. The hop links are then followed
+from source to source into transaction chains. A chain breaks where a hop
+finds no match, and every hop reports its own breaks: records with no match
+downstream, and records that nothing upstream matched.
+"""
+
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from batch_reconciliation import prepare_documents
+from document_refs import DocumentReferenceError
+from matching_engine import MATCH_THRESHOLD, RECONCILED_THRESHOLD, PreparedDocument, describe_pair, score_all
+from work_queue import WorkQueue, estimate_records_bytes, get_work_queue
+
+logger = logging.getLogger(__name__)
+
+
+def parse_sources(sources: Any) -> List[Tuple[str, Any]]:
+    """
+    Validate [{name, document}, ...] - at least two sources, with unique names
+    """
+    if not isinstance(sources, list) or len(sources) < 2:
+        raise DocumentReferenceError("sources must list at least two {name, document} entries in flow order")
+    parsed = []
+    for index, source in enumerate(sources):
+        if not isinstance(source, dict) or "document" not in source:
+            raise DocumentReferenceError(f"Source {index} needs a document")
+        parsed.append((str(source.get("name") or f"source{index + 1}"), source["document"]))
+    names = [name for name, _ in parsed]
+    if len(set(names)) != len(names):
+        raise DocumentReferenceError(f"Source names must be unique: {', '.join(names)}")
+    return parsed
+
+
+def match_hop(upstream: PreparedDocument, downstream: PreparedDocument) -> List[Optional[Dict[str, Any]]]:
+    """
+    Best downstream match for every upstream record (None below MATCH_THRESHOLD) - one picklable unit of work
+    """
+    links = []
+    for upstream_idx, (downstream_idx, confidence) in enumerate(score_all(upstream, downstream)):
+        if downstream_idx < 0 or confidence < MATCH_THRESHOLD:
+            links.append(None)
+            continue
+        factors, discrepancies = describe_pair(upstream, upstream_idx, downstream, downstream_idx)
+        links.append({
+            "to": downstream_idx,
+            "confidence": confidence,
+            "isReconciled": confidence >= RECONCILED_THRESHOLD,
+            "matchedFields": factors,
+            "discrepancies": discrepancies
+        })
+    return links
+
+
+def _transaction(name: str, prepared: PreparedDocument, idx: int) -> Dict[str, Any]:
+    return {"id": f"{name}-{idx}", **prepared.records[idx]}
+
+
+def build_chains(
+    names: List[str],
+    prepared: List[PreparedDocument],
+    hop_links: List[List[Optional[Dict[str, Any]]]]
+) -> List[Dict[str, Any]]:
+    """
+    Follow the hop links into chains - one per record that no upstream record matched
+    """
+    reached = [set()] + [{link["to"] for link in links if link} for links in hop_links]
+    chains = []
+    for start, name in enumerate(names):
+        for start_idx in range(len(prepared[start])):
+            if start_idx in reached[start]:
+                continue
+            transactions = [{"source": name, "transaction": _transaction(name, prepared[start], start_idx)}]
+            hops = []
+            broken_at = f"{names[start - 1]}->{name}" if start > 0 else None
+            position, idx = start, start_idx
+            while position < len(names) - 1:
+                hop = f"{names[position]}->{names[position + 1]}"
+                link = hop_links[position][idx]
+                if link is None:
+                    hops.append({"hop": hop, "confidence": 0.0, "isReconciled": False, "matchedFields": [],
+                                 "discrepancies": [f"No matching {names[position + 1]} record found"]})
+                    broken_at = broken_at or hop
+                    break
+                hops.append({"hop": hop, **{key: value for key, value in link.items() if key != "to"}})
+                if not link["isReconciled"]:
+                    broken_at = broken_at or hop
+                position, idx = position + 1, link["to"]
+                transactions.append({"source": names[position], "transaction": _transaction(names[position], prepared[position], idx)})
+            chains.append({
+                "chainId": f"chain-{len(chains)}",
+                "startsAt": name,
+                "transactions": transactions,
+                "hops": hops,
+                "isComplete": broken_at is None and len(transactions) == len(names),
+                "brokenAt": broken_at,
+                "confidence": min((hop["confidence"] for hop in hops), default=0.0)
+            })
+    return chains
+
+
+def hop_breaks(names: List[str], prepared: List[PreparedDocument], hop_links: List[List[Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """
+    Per-hop figures and breaks in both directions
+    """
+    breaks = []
+    for position, links in enumerate(hop_links):
+        upstream, downstream = names[position], names[position + 1]
+        matched_to = {link["to"] for link in links if link}
+        breaks.append({
+            "hop": f"{upstream}->{downstream}",
+            "matched": sum(1 for link in links if link),
+            "reconciled": sum(1 for link in links if link and link["isReconciled"]),
+            "unmatchedUpstream": [f"{upstream}-{idx}" for idx, link in enumerate(links) if link is None],
+            "unmatchedDownstream": [f"{downstream}-{idx}" for idx in range(len(prepared[position + 1])) if idx not in matched_to]
+        })
+    return breaks
+
+
+def reconcile_chain(
+    documents: Dict[str, Sequence[Dict[str, Any]]],
+    work_queue: Optional[WorkQueue] = None
+) -> Dict[str, Any]:
+    """
+    Reconcile sources in flow order (dict order) into chains, hop breaks and a summary
+    """
+    work_queue = work_queue or get_work_queue()
+    names = list(documents)
+    weights = {name: estimate_records_bytes(records) for name, records in documents.items()}
+
+    started = time.perf_counter()
+    prepared_by_name, columns = prepare_documents(documents, work_queue, weights)
+    prepared = [prepared_by_name[name] for name in names]
+    prepared_at = time.perf_counter()
+
+    # Hops only read the prepared sources, so they run side by side
+    hop_count = len(names) - 1
+    with ThreadPoolExecutor(max_workers=max(1, min(work_queue.max_workers, hop_count)), thread_name_prefix="chain-hop") as executor:
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run, work_queue.run, match_hop, prepared[i], prepared[i + 1],
+                weight=weights[names[i]] + weights[names[i + 1]]
+            )
+            for i in range(hop_count)
+        ]
+        hop_links = [future.result() for future in futures]
+    matched_at = time.perf_counter()
+
+    chains = build_chains(names, prepared, hop_links)
+    complete = sum(1 for chain in chains if chain["isComplete"])
+    logger.info(f"🔗 Built {len(chains)} chains over {' -> '.join(names)}: {complete} complete")
+    return {
+        "chains": chains,
+        "hops": hop_breaks(names, prepared, hop_links),
+        "summary": {
+            "sources": names,
+            "records": {name: len(records) for name, records in zip(names, prepared)},
+            "totalChains": len(chains),
+            "completeChains": complete,
+            "brokenChains": len(chains) - complete
+        },
+        "columnRoles": columns,
+        "timings": {
+            "prepareSeconds": round(prepared_at - started, 3),
+            "matchSeconds": round(matched_at - prepared_at, 3),
+            "chainSeconds": round(time.perf_counter() - matched_at, 3)
+        }
+    }
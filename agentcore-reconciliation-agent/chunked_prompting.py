@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Token-budgeted chunked prompting for LLM reconciliation analysis.
+
+Records of both documents are grouped by a blocking key (store / Rest ID,
+falling back to the month) so rows that may match share a chunk, groups are
+packed into prompts under a token budget, and the prompts are sent to the
+model concurrently with a bounded number of calls in flight. The per-chunk
+analyses are merged into one report.
+"""
+
+import contextvars
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from llm_cache import CacheSession
+from llm_instrumentation import LlmMetrics
+from normalization import column_values, normalize_ids, normalize_text
+from prompt_encoding import DEFAULT_PROMPT_ENCODING, ENCODING_LABELS, encode_rows, encoding_report, estimate_tokens, row_tokens
+from schema_inference import infer_columns
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("LLM_CHUNK_TOKEN_BUDGET", "6000"))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+# Bounds for the per-request chunkTokenBudget / maxConcurrency overrides - a tiny budget means a call per row
+MIN_TOKEN_BUDGET = 500
+TOKEN_BUDGET_LIMIT = int(os.environ.get("LLM_CHUNK_TOKEN_BUDGET_LIMIT", str(max(DEFAULT_TOKEN_BUDGET, 50000))))
+MAX_CONCURRENCY_LIMIT = int(os.environ.get("LLM_MAX_CONCURRENCY_LIMIT", str(max(DEFAULT_MAX_CONCURRENCY, 16))))
+
+PROMPT_TEMPLATE = """
+SALES AND PAYMENT RECONCILIATION - DATA ANALYSIS (CHUNK {chunk_number} OF {chunk_count}):
+
+Records are grouped by store / Rest ID so candidate matches appear in the same chunk.
+Refer to records by their id.
+
+LEFT DOCUMENT DATA:
+Records: {left_count} of {left_total}
+{encoding_label}:
+{left_rows}
+
+RIGHT DOCUMENT DATA:
+Records: {right_count} of {right_total}
+{encoding_label}:
+{right_rows}
+
+TASK: Perform reconciliation analysis on this chunk of the data.
+
+Please analyze these records and provide:
+1. Transaction matching and reconciliation results
+2. Unmatched records with specific reasons
+3. Confidence scores and recommendations
+"""
+
+
+class PromptChunk(NamedTuple):
+    left_indices: List[int]
+    right_indices: List[int]
+    keys: List[str]
+    estimated_tokens: int
+
+
+def blocking_keys(records: List[Dict[str, Any]], columns: Optional[Dict[str, Optional[str]]] = None) -> List[str]:
+    """
+    Blocking key per record: the store / Rest ID, a "#1234" store number in the
+    description, otherwise the month ("" when nothing identifies the record)
+    """
+    if not records:
+        return []
+    columns = columns or infer_columns(records)
+    ids = normalize_ids(column_values(records, columns.get("id")))
+    store_numbers = normalize_text(column_values(records, columns.get("description"))).str.extract(r'#(\d+)', expand=False)
+    months = normalize_text(column_values(records, columns.get("month"))).str.lower()
+
+    keys = ids.where(ids != "", store_numbers.fillna(""))
+    keys = pd.Series("id:", index=keys.index) + keys
+    keys = keys.where(keys != "id:", ("month:" + months).where(months != "", ""))
+    return keys.tolist()
+
+
+def plan_chunks(
+    left_document: List[Dict[str, Any]],
+    right_document: List[Dict[str, Any]],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    left_columns: Optional[Dict[str, Optional[str]]] = None,
+    right_columns: Optional[Dict[str, Optional[str]]] = None,
+    encoding: str = DEFAULT_PROMPT_ENCODING
+) -> List[PromptChunk]:
+    """
+    Pack the records of both documents into chunks whose rows fit the token budget.
+
+    Rows sharing a blocking key are kept together; a group larger than the
+    budget is split across consecutive chunks. Rows without a key fill the
+    remaining space.
+    """
+    groups: "OrderedDict[str, Tuple[List[int], List[int]]]" = OrderedDict()
+    unkeyed: List[Tuple[str, int]] = []
+    for side, document, columns in (("left", left_document, left_columns), ("right", right_document, right_columns)):
+        for index, key in enumerate(blocking_keys(document, columns)):
+            if key:
+                group = groups.setdefault(key, ([], []))
+                group[0 if side == "left" else 1].append(index)
+            else:
+                unkeyed.append((side, index))
+
+    tokens_per_row = {
+        "left": [row_tokens(f"left-{i}", record, encoding) for i, record in enumerate(left_document)],
+        "right": [row_tokens(f"right-{i}", record, encoding) for i, record in enumerate(right_document)]
+    }
+
+    units: List[Tuple[str, List[Tuple[str, int]]]] = [
+        (key, [("left", i) for i in left] + [("right", i) for i in right]) for key, (left, right) in groups.items()
+    ]
+    units.extend(("", [row]) for row in unkeyed)
+
+    chunks: List[PromptChunk] = []
+    current: List[Tuple[str, int]] = []
+    current_keys: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_keys, current_tokens
+        if current:
+            chunks.append(PromptChunk(
+                [i for side, i in current if side == "left"],
+                [i for side, i in current if side == "right"],
+                current_keys,
+                current_tokens
+            ))
+        current, current_keys, current_tokens = [], [], 0
+
+    for key, rows in units:
+        tokens = sum(tokens_per_row[side][i] for side, i in rows)
+        if current and current_tokens + tokens > token_budget:
+            flush()
+        for side, i in rows:
+            # Only an oversized group is split
+            if current and current_tokens + tokens_per_row[side][i] > token_budget:
+                flush()
+            if key and key not in current_keys:
+                current_keys.append(key)
+            current.append((side, i))
+            current_tokens += tokens_per_row[side][i]
+    flush()
+
+    logger.info(f"🧩 Planned {len(chunks)} chunks for {len(left_document)} left, {len(right_document)} right records (budget {token_budget} tokens)")
+    return chunks
+
+
+def build_chunk_prompt(
+    chunk: PromptChunk,
+    chunk_number: int,
+    chunk_count: int,
+    left_document: List[Dict[str, Any]],
+    right_document: List[Dict[str, Any]],
+    encoding: str = DEFAULT_PROMPT_ENCODING
+) -> str:
+    left_rows = [(f"left-{i}", left_document[i]) for i in chunk.left_indices]
+    right_rows = [(f"right-{i}", right_document[i]) for i in chunk.right_indices]
+    return PROMPT_TEMPLATE.format(
+        chunk_number=chunk_number,
+        chunk_count=chunk_count,
+        encoding_label=ENCODING_LABELS[encoding],
+        left_count=len(left_rows),
+        left_total=len(left_document),
+        left_rows=encode_rows(left_rows, encoding) if left_rows else "(none)",
+        right_count=len(right_rows),
+        right_total=len(right_document),
+        right_rows=encode_rows(right_rows, encoding) if right_rows else "(none)"
+    )
+
+
+def response_text(response: Any) -> str:
+    """
+    Text of an agent response (Strands AgentResult or a plain string)
+    """
+    message = getattr(response, 'message', None)
+    if isinstance(message, dict) and message.get('content'):
+        return message['content'][0].get('text', '')
+    return str(response)
+
+
+def run_chunk_prompts(
+    prompts: Sequence[str],
+    model_factory: Callable[[], Callable[[str], Any]],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    cache: Optional[CacheSession] = None,
+    metrics: Optional[LlmMetrics] = None,
+    chunk_rows: Optional[Sequence[int]] = None
+) -> List[str]:
+    """
+    Send the prompts with at most max_concurrency calls in flight, returning texts in prompt order.
+
+    Each call gets its own model from the factory - an agent handles one invocation at a time.
+    Prompts answered before are served from the response cache without a model call.
+    Every call is measured into metrics when given (chunk_rows is the record count per prompt).
+    """
+    metrics = metrics or LlmMetrics("")
+    chunk_rows = list(chunk_rows) if chunk_rows is not None else [0] * len(prompts)
+
+    def call(prompt: str, rows: int) -> str:
+        with metrics.call(prompt, rows) as call_metrics:
+            if cache is not None:
+                cached = cache.lookup(prompt)
+                if cached is not None:
+                    call_metrics.cached = True
+                    return cached
+            response = model_factory()(prompt)
+            text = response_text(response)
+            call_metrics.record_usage(response, text)
+        logger.info(
+            f"🤖 Chunk analysed in {call_metrics.wall_seconds:.2f}s ({call_metrics.input_tokens} in / "
+            f"{call_metrics.output_tokens} out tokens, {call_metrics.retries} retries)"
+        )
+        if cache is not None:
+            cache.store(prompt, text)
+        return text
+
+    if len(prompts) <= 1 or max_concurrency <= 1:
+        return [call(prompt, rows) for prompt, rows in zip(prompts, chunk_rows)]
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(prompts)), thread_name_prefix="llm-chunk") as executor:
+        # Each call runs in a copy of the caller's context so its span joins the request trace
+        futures = [
+            executor.submit(contextvars.copy_context().run, call, prompt, rows)
+            for prompt, rows in zip(prompts, chunk_rows)
+        ]
+        return [future.result() for future in futures]
+
+
+def merge_analyses(chunks: Sequence[PromptChunk], analyses: Sequence[str]) -> str:
+    """
+    Merge per-chunk analyses into one report
+    """
+    if len(analyses) == 1:
+        return analyses[0]
+
+    sections = [f"# Reconciliation Analysis ({len(analyses)} chunks)"]
+    for number, (chunk, analysis) in enumerate(zip(chunks, analyses), start=1):
+        sections.append(
+            f"## Chunk {number}: {len(chunk.left_indices)} left, {len(chunk.right_indices)} right records\n\n{analysis.strip()}"
+        )
+    return "\n\n".join(sections)
+
+
+def analyze_in_chunks(
+    left_document: List[Dict[str, Any]],
+    right_document: List[Dict[str, Any]],
+    model_factory: Callable[[], Callable[[str], Any]],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    encoding: str = DEFAULT_PROMPT_ENCODING,
+    cache: Optional[CacheSession] = None,
+    metrics: Optional[LlmMetrics] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Plan, send and merge a chunked analysis - returns the merged text and chunking statistics
+    """
+    started = time.perf_counter()
+    chunks = plan_chunks(left_document, right_document, token_budget, encoding=encoding)
+    prompts = [
+        build_chunk_prompt(chunk, number, len(chunks), left_document, right_document, encoding)
+        for number, chunk in enumerate(chunks, start=1)
+    ]
+    chunk_rows = [len(chunk.left_indices) + len(chunk.right_indices) for chunk in chunks]
+    analyses = run_chunk_prompts(prompts, model_factory, max_concurrency, cache, metrics, chunk_rows)
+
+    stats = {
+        "chunks": len(chunks),
+        "tokenBudget": token_budget,
+        "maxConcurrency": max_concurrency,
+        "estimatedPromptTokens": sum(estimate_tokens(prompt) for prompt in prompts),
+        "largestChunkTokens": max((chunk.estimated_tokens for chunk in chunks), default=0),
+        "promptEncoding": encoding,
+        "tokensByEncoding": encoding_report(
+            [(f"left-{i}", record) for i, record in enumerate(left_document)]
+            + [(f"right-{i}", record) for i, record in enumerate(right_document)]
+        ),
+        "elapsedSeconds": round(time.perf_counter() - started, 3)
+    }
+    return merge_analyses(chunks, analyses), stats
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Columnar reconciliation documents (Arrow IPC and Parquet).
+
+A decoded Arrow table is wrapped in a RecordTable, a read-only sequence of
+records that also hands whole columns to the normalization stage. The
+matcher reads its columns straight from Arrow memory (numeric columns
+without nulls convert to NumPy without a copy), and Python record dicts are
+only built for rows that are actually read, such as rows placed in results.
+pyarrow and pandas are imported on first use, so JSON-only deployments never
+load pyarrow and importing this module stays cheap.
+"""
+
+import io
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+COLUMNAR_FORMATS = ("arrow", "parquet")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Arrow IPC and Parquet documents need the pyarrow package") from e
+    return pyarrow
+
+
+def read_table(content: bytes, file_format: str):
+    """
+    An Arrow table from Arrow IPC (file or stream) or Parquet bytes
+    """
+    pa = _pyarrow()
+    if file_format == "parquet":
+        return pa.parquet.read_table(pa.BufferReader(content))
+    if content[:6] == b"ARROW1":
+        return pa.ipc.open_file(pa.BufferReader(content)).read_all()
+    return pa.ipc.open_stream(pa.BufferReader(content)).read_all()
+
+
+def write_table(records: List[Dict[str, Any]], file_format: str) -> bytes:
+    """
+    Encode records as Arrow IPC (stream) or Parquet - the inverse of read_table
+    """
+    pa = _pyarrow()
+    table = pa.Table.from_pylist(records)
+    sink = io.BytesIO()
+    if file_format == "parquet":
+        pa.parquet.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+
+class RecordTable(Sequence):
+    """
+    Read-only list of record dicts backed by an Arrow table
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._rows: Optional[Dict[str, List[Any]]] = None
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self.table.column_names)
+
+    def _row_values(self) -> Dict[str, List[Any]]:
+        # Built once, on the first row access - JSON-friendly values per column
+        if self._rows is None:
+            pa = _pyarrow()
+            rows = {}
+            for name, column in zip(self.table.column_names, self.table.columns):
+                column_type = column.type
+                if pa.types.is_temporal(column_type):
+                    column = column.cast(pa.string())
+                elif pa.types.is_decimal(column_type):
+                    column = column.cast(pa.float64())
+                rows[name] = column.to_pylist()
+            self._rows = rows
+        return self._rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return RecordTable(self.table.slice(start, max(stop - start, 0)))
+            return RecordTable(self.table.take(list(range(start, stop, step))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("RecordTable index out of range")
+        return {name: values[index] for name, values in self._row_values().items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        values = self._row_values()
+        names = list(values)
+        for row in zip(*values.values()):
+            yield dict(zip(names, row))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RecordTable):
+            return self.table.equals(other.table)
+        return isinstance(other, list) and list(self) == other
+
+    def __getstate__(self):
+        # Tables pickle as Arrow buffers; the row cache is rebuilt when needed
+        return {"table": self.table}
+
+    def __setstate__(self, state):
+        self.table = state["table"]
+        self._rows = None
+
+    def column_series(self, column: Optional[str]) -> "pd.Series":
+        """
+        One column as a pandas Series, without building records
+        """
+        import pandas as pd
+
+        if not column or column not in self.table.column_names:
+            return pd.Series([None] * len(self), dtype=object)
+        pa = _pyarrow()
+        values = self.table.column(column)
+        if pa.types.is_decimal(values.type):
+            values = values.cast(pa.float64())
+        elif pa.types.is_date(values.type):
+            values = values.cast(pa.timestamp("s"))
+        return values.to_pandas()
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+
+def decode_columnar(content: bytes, file_format: str) -> RecordTable:
+    return RecordTable(read_table(content, file_format))
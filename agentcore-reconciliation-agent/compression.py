@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Transparent gzip/zstd compression of invocation bodies.
+
+Compressed request bodies are recognized by their Content-Encoding header or
+by their magic bytes and decoded before the JSON is parsed. Non-streaming
+JSON responses are compressed when the caller's Accept-Encoding allows it;
+zstd is preferred and used only when the zstandard package is installed.
+The same logic serves the AgentCore app (ASGI middleware) and the local
+Flask agent (WSGI middleware). Request-side figures are available to
+handlers for metadata; response-side figures go in X-Compression-* headers,
+since they are only known once the body is encoded.
+"""
+
+import contextvars
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", "3"))
+MAX_DECODED_BYTES = int(os.environ.get("COMPRESSION_MAX_DECODED_BYTES", str(512 * 1024 * 1024)))
+
+MAGIC_BYTES = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+COMPRESSIBLE_TYPES = ("application/json", "text/plain")
+
+
+class UnsupportedEncoding(Exception):
+    """
+    A request body in an encoding this process cannot decode
+    """
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def supported_encodings() -> List[str]:
+    """
+    Encodings in order of preference
+    """
+    return ["zstd", "gzip"] if _zstd() is not None else ["gzip"]
+
+
+def detect_encoding(body: bytes, content_encoding: Optional[str] = None) -> Optional[str]:
+    """
+    The encoding of a request body from its header, otherwise from its magic bytes
+    """
+    declared = (content_encoding or "").strip().lower()
+    if declared in ("gzip", "x-gzip"):
+        return "gzip"
+    if declared in ("zstd", "br", "deflate"):
+        return declared
+    for magic, encoding in MAGIC_BYTES.items():
+        if body.startswith(magic):
+            return encoding
+    return None
+
+
+def decompress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        with gzip.GzipFile(fileobj=io.BytesIO(body)) as f:
+            decoded = f.read(MAX_DECODED_BYTES + 1)
+    elif encoding == "zstd" and _zstd() is not None:
+        with _zstd().ZstdDecompressor().stream_reader(io.BytesIO(body)) as reader:
+            decoded = reader.read(MAX_DECODED_BYTES + 1)
+    else:
+        raise UnsupportedEncoding(f"Unsupported Content-Encoding: {encoding}")
+    if len(decoded) > MAX_DECODED_BYTES:
+        raise UnsupportedEncoding(f"Decoded body exceeds {MAX_DECODED_BYTES} bytes")
+    return decoded
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    The preferred supported encoding the caller accepts (q=0 excludes an encoding)
+    """
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def decode_request_body(body: bytes, content_encoding: Optional[str]) -> Tuple[bytes, Optional[Dict[str, Any]]]:
+    """
+    The decoded body and its compression figures (None when the body was not compressed)
+    """
+    encoding = detect_encoding(body, content_encoding)
+    if encoding is None:
+        return body, None
+    started = time.perf_counter()
+    decoded = decompress(body, encoding)
+    stats = {
+        "encoding": encoding,
+        "compressedBytes": len(body),
+        "bytes": len(decoded),
+        "ratio": round(len(decoded) / len(body), 2) if body else 0.0,
+        "seconds": round(time.perf_counter() - started, 4)
+    }
+    logger.info(f"🗜️ Decoded {encoding} request: {len(body)} -> {len(decoded)} bytes in {stats['seconds']}s")
+    return decoded, stats
+
+
+def encode_response_body(body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str], Dict[str, str]]:
+    """
+    The response body, its Content-Encoding (None when left as is) and X-Compression-* headers
+    """
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None or len(body) < COMPRESSION_MIN_BYTES:
+        return body, None, {}
+    started = time.perf_counter()
+    encoded = compress(body, encoding)
+    headers = {
+        "X-Uncompressed-Length": str(len(body)),
+        "X-Compression-Ratio": f"{len(body) / len(encoded):.2f}",
+        "X-Compression-Time-Ms": f"{(time.perf_counter() - started) * 1000:.1f}"
+    }
+    return encoded, encoding, headers
+
+
+_request_compression: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("request_compression", default=None)
+
+
+def compression_metadata() -> Dict[str, Any]:
+    """
+    Compression figures of the current request, for response metadata
+    """
+    return {"request": _request_compression.get(), "supportedEncodings": supported_encodings()}
+
+
+def _error_body(error: Exception) -> bytes:
+    return json.dumps({"error": "Unsupported or corrupt request encoding", "details": str(error)}).encode("utf-8")
+
+
+def _is_compressible(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware: decodes compressed request bodies and compresses buffered JSON responses.
+
+    Streaming responses (SSE, NDJSON) pass through untouched so items still arrive as they are produced.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        receive = await self._decoded_receive(scope, receive, headers, send)
+        if receive is None:
+            return
+
+        accept_encoding = headers.get("accept-encoding")
+        if not choose_encoding(accept_encoding):
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks: List[bytes] = []
+
+        async def buffered_send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                response_headers = {key.decode("latin-1").lower(): value for key, value in message.get("headers", [])}
+                content_type = response_headers.get("content-type", b"").decode("latin-1")
+                if "content-encoding" in response_headers or not _is_compressible(content_type):
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body, encoding, extra_headers = encode_response_body(b"".join(chunks), accept_encoding)
+            response_headers = [(key, value) for key, value in start_message.get("headers", []) if key.lower() != b"content-length"]
+            response_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            response_headers.append((b"vary", b"Accept-Encoding"))
+            if encoding is not None:
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+                response_headers.extend((key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in extra_headers.items())
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _decoded_receive(self, scope, receive, headers: Dict[str, str], send):
+        """
+        A receive callable yielding the decoded body - None when an error response was sent instead
+        """
+        if scope.get("method") not in ("POST", "PUT", "PATCH"):
+            return receive
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                return receive
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+
+        try:
+            body, stats = decode_request_body(b"".join(chunks), headers.get("content-encoding"))
+        except (UnsupportedEncoding, OSError, EOFError, ValueError) as e:
+            logger.warning(f"⚠️ Rejected compressed request: {str(e)}")
+            payload = _error_body(e)
+            await send({"type": "http.response.start", "status": 415, "headers": [
+                (b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode("latin-1"))
+            ]})
+            await send({"type": "http.response.body", "body": payload})
+            return None
+
+        _request_compression.set(stats)
+        delivered = False
+
+        async def decoded_receive():
+            nonlocal delivered
+            if delivered:
+                return await receive()
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return decoded_receive
+
+
+class WsgiCompressionMiddleware:
+    """
+    WSGI middleware with the same behaviour, for the local Flask agent.
+
+    Request figures are stored in the WSGI environ under "clofast.compression".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        if environ.get("REQUEST_METHOD") in ("POST", "PUT", "PATCH"):
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+            body = environ["wsgi.input"].read(length) if length else environ["wsgi.input"].read()
+            try:
+                body, stats = decode_request_body(body, environ.get("HTTP_CONTENT_ENCODING"))
+            except (UnsupportedEncoding, OSError, EOFError, ValueError) as e:
+                payload = _error_body(e)
+                start_response("415 Unsupported Media Type", [("Content-Type", "application/json"), ("Content-Length", str(len(payload)))])
+                return [payload]
+            environ["wsgi.input"] = io.BytesIO(body)
+            environ["CONTENT_LENGTH"] = str(len(body))
+            environ.pop("HTTP_CONTENT_ENCODING", None)
+            environ["clofast.compression"] = stats
+
+        accept_encoding = environ.get("HTTP_ACCEPT_ENCODING")
+        if not choose_encoding(accept_encoding):
+            return self.app(environ, start_response)
+
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured["status"], captured["headers"], captured["exc_info"] = status, headers, exc_info
+            names = {name.lower(): value for name, value in headers}
+            captured["compress"] = "content-encoding" not in names and _is_compressible(names.get("content-type", ""))
+            if not captured["compress"]:
+                return start_response(status, headers, exc_info)
+            return lambda data: captured.setdefault("written", []).append(data)
+
+        result = self.app(environ, capture_start_response)
+        if not captured.get("compress"):
+            return result
+        try:
+            body = b"".join(captured.get("written", [])) + b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+        body, encoding, extra_headers = encode_response_body(body, accept_encoding)
+        headers = [(name, value) for name, value in captured["headers"] if name.lower() != "content-length"]
+        headers.append(("Content-Length", str(len(body))))
+        headers.append(("Vary", "Accept-Encoding"))
+        if encoding is not None:
+            headers.append(("Content-Encoding", encoding))
+            headers.extend(extra_headers.items())
+        start_response(captured["status"], headers, captured["exc_info"])
+        return [body]
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Reconciliation documents passed by reference.
+
+Instead of an inline array of records, leftDocument / rightDocument may be a
+URI (file://, presigned http(s):// or s3://), an object such as
+{"uri": ..., "format": "csv", "extractionRules": [...]}, or base64 file
+content as {"data": ..., "format": "parquet"}. The agent fetches both
+references concurrently and decodes them - JSON / JSON lines directly, Arrow
+IPC and Parquet into columnar RecordTables, spreadsheets and PDFs through the
+extraction pipeline. Decoded documents are
+kept in a small LRU cache keyed by content hash, so the same file is not
+extracted twice.
+"""
+
+import base64
+import binascii
+import contextvars
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlsplit
+
+from batch_extraction import download_document, extract_document
+from columnar import COLUMNAR_FORMATS, decode_columnar
+from tracing import stage_span
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_FETCH_TIMEOUT = int(os.environ.get("DOCUMENT_FETCH_TIMEOUT", "60"))
+DOCUMENT_CACHE_SIZE = int(os.environ.get("DOCUMENT_CACHE_SIZE", "16"))
+DOCUMENT_FETCH_CONCURRENCY = int(os.environ.get("DOCUMENT_FETCH_CONCURRENCY", "8"))
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # e.g. a local S3 stand-in
+# file:// references are read only below this directory - unset, they are refused
+DOCUMENT_FILE_ROOT = os.environ.get("DOCUMENT_FILE_ROOT", "")
+# Comma-separated http(s) hosts to fetch from; unset, any host resolving to a public address
+DOCUMENT_ALLOWED_HOSTS = frozenset(host.strip().lower() for host in os.environ.get("DOCUMENT_ALLOWED_HOSTS", "").split(",") if host.strip())
+
+SCHEMES = ("file", "http", "https", "s3")
+FORMAT_ALIASES = {"ndjson": "jsonl", "ipc": "arrow", "arrows": "arrow", "feather": "arrow", "pq": "parquet"}
+
+
+class DocumentReferenceError(Exception):
+    """
+    A document reference that is invalid (400), could not be decoded (422) or fetched (502)
+    """
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# /extract-style requests ({documentUrl, documentName, extractionRules}) are references too
+URI_FIELDS = ("uri", "documentUrl", "document_url")
+
+
+def is_reference(document: Any) -> bool:
+    return isinstance(document, str) or (isinstance(document, dict) and (any(field in document for field in URI_FIELDS) or "data" in document))
+
+
+def parse_reference(document: Any) -> Dict[str, Any]:
+    """
+    Normalize a URI string or reference object into {uri, scheme, format, documentName, extractionRules}
+    """
+    reference = {"uri": document} if isinstance(document, str) else dict(document)
+    reference["uri"] = next((reference[field] for field in URI_FIELDS if reference.get(field)), "")
+    reference["documentName"] = reference.get("documentName") or reference.get("document_name")
+    reference["extractionRules"] = reference.get("extractionRules") or reference.get("extraction_rules")
+    full_scan = bool(reference.get("fullScan", reference.get("full_scan", False)))
+    if "data" in reference:
+        file_format = (reference.get("format") or "").lower()
+        if not file_format:
+            raise DocumentReferenceError("Inline document data needs a format")
+        file_format = FORMAT_ALIASES.get(file_format, file_format)
+        return {
+            "uri": "inline:base64",
+            "scheme": "inline",
+            "data": reference["data"],
+            "format": file_format,
+            "documentName": reference.get("documentName") or f"inline.{file_format}",
+            "extractionRules": reference.get("extractionRules") or [],
+            "fullScan": full_scan
+        }
+
+    uri = reference["uri"]
+    parts = urlsplit(uri)
+    if parts.scheme not in SCHEMES:
+        raise DocumentReferenceError(f"Unsupported document reference: {redact(uri) or 'empty URI'}")
+
+    name = reference.get("documentName") or os.path.basename(unquote(parts.path)) or "document"
+    extension = name.lower().rsplit(".", 1)[-1] if "." in name else ""
+    file_format = (reference.get("format") or extension or "json").lower()
+    return {
+        "uri": uri,
+        "scheme": parts.scheme,
+        "format": FORMAT_ALIASES.get(file_format, file_format),
+        "documentName": name if "." in name else f"{name}.{file_format}",
+        "extractionRules": reference.get("extractionRules") or [],
+        "fullScan": full_scan
+    }
+
+
+def redact(uri: str) -> str:
+    """
+    The URI without its query string - presigned URLs carry credentials there
+    """
+    parts = urlsplit(uri)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}" if parts.scheme not in ("", "inline") else uri
+
+
+_s3 = None
+_s3_lock = threading.Lock()
+
+
+def _s3_client():
+    global _s3
+    with _s3_lock:
+        if _s3 is None:
+            import boto3
+            _s3 = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL)
+        return _s3
+
+
+def file_path(uri: str) -> str:
+    """
+    The real path of a file:// URI, which must lie inside DOCUMENT_FILE_ROOT
+    """
+    parts = urlsplit(uri)
+    if parts.netloc not in ("", "localhost"):
+        raise DocumentReferenceError(f"Remote file URIs are not supported: {uri}")
+    if not DOCUMENT_FILE_ROOT:
+        raise DocumentReferenceError("file:// references are disabled - set DOCUMENT_FILE_ROOT to enable them")
+    root = os.path.realpath(DOCUMENT_FILE_ROOT)
+    path = os.path.realpath(unquote(parts.path))
+    if os.path.commonpath([root, path]) != root:
+        raise DocumentReferenceError(f"{uri} is outside DOCUMENT_FILE_ROOT")
+    return path
+
+
+def is_public_address(address: str) -> bool:
+    return ipaddress.ip_address(address.split("%", 1)[0]).is_global
+
+
+def check_host(uri: str) -> None:
+    """
+    Refuse http(s) hosts off the allowlist, or without one, hosts resolving to non-public addresses
+    (loopback, private, link-local such as the 169.254.169.254 metadata service)
+    """
+    parts = urlsplit(uri)
+    host = (parts.hostname or "").lower()
+    if not host:
+        raise DocumentReferenceError(f"Document URL has no host: {redact(uri)}")
+    if DOCUMENT_ALLOWED_HOSTS:
+        if host not in DOCUMENT_ALLOWED_HOSTS:
+            raise DocumentReferenceError(f"Host {host} is not in DOCUMENT_ALLOWED_HOSTS")
+        return
+    for *_, address in socket.getaddrinfo(host, parts.port or None, proto=socket.IPPROTO_TCP):
+        if not is_public_address(address[0]):
+            raise DocumentReferenceError(f"Host {host} resolves to non-public address {address[0]}")
+
+
+def fetch_bytes(reference: Dict[str, Any], timeout: int = DOCUMENT_FETCH_TIMEOUT) -> bytes:
+    if reference["scheme"] == "inline":
+        try:
+            return base64.b64decode(reference["data"], validate=True)
+        except (binascii.Error, TypeError) as e:
+            raise DocumentReferenceError(f"Inline document data is not valid base64: {str(e)}")
+    parts = urlsplit(reference["uri"])
+    if parts.scheme == "file":
+        with open(file_path(reference["uri"]), "rb") as f:
+            return f.read()
+    if parts.scheme == "s3":
+        response = _s3_client().get_object(Bucket=parts.netloc, Key=unquote(parts.path.lstrip("/")))
+        return response["Body"].read()
+    check_host(reference["uri"])
+    # A redirect would skip the host check; without an allowlist the connected address is checked again
+    if DOCUMENT_ALLOWED_HOSTS:
+        return download_document(reference["uri"], timeout, allow_redirects=False)
+    from public_http import public_session
+
+    return download_document(reference["uri"], timeout, allow_redirects=False, session=public_session())
+
+
+def decode_document(content: bytes, reference: Dict[str, Any]) -> Sequence[Dict[str, Any]]:
+    """
+    Records of a fetched document, by format
+    """
+    file_format = reference["format"]
+    if file_format in COLUMNAR_FORMATS:
+        return decode_columnar(content, file_format)
+    if file_format == "json":
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get("extractedData", data.get("records", []))
+        if not isinstance(data, list):
+            raise DocumentReferenceError(f"{reference['documentName']} is not a JSON array of records")
+        return data
+    if file_format == "jsonl":
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    # Spreadsheets and PDFs go through the same extraction as /extract
+    result = extract_document(
+        content, redact(reference["uri"]), reference["documentName"], reference["extractionRules"], {}, reference.get("fullScan", False),
+        True  # spreadsheets stay compact SpreadsheetRecords
+    )
+    if not result.get("success"):
+        raise DocumentReferenceError(result.get("message", f"Extraction of {reference['documentName']} failed"), 422)
+    return result["extractedData"]
+
+
+class DocumentCache:
+    """
+    LRU cache of decoded documents keyed by content hash, format and extraction rules
+    """
+
+    def __init__(self, max_entries: int = DOCUMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content: bytes, reference: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(content)
+        digest.update(reference["format"].encode("utf-8"))
+        digest.update(json.dumps(reference["extractionRules"], sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"full" if reference.get("fullScan") else b"classified")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            records = self._entries.get(key)
+            if records is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return records
+
+    def put(self, key: str, records: List[Dict[str, Any]]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = records
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+document_cache = DocumentCache()
+
+
+def load_document(document: Any, cache: Optional[DocumentCache] = document_cache) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Records of an inline or referenced document, with a description of where they came from
+    """
+    if not is_reference(document):
+        return document or [], {"source": "inline", "records": len(document or [])}
+
+    reference = parse_reference(document)
+    started = time.perf_counter()
+    with stage_span("document.fetch", scheme=reference["scheme"], source=redact(reference["uri"])) as span:
+        try:
+            content = fetch_bytes(reference)
+        except DocumentReferenceError:
+            raise
+        except Exception as e:
+            message = str(e).replace(reference["uri"], redact(reference["uri"]))
+            raise DocumentReferenceError(f"Fetching {redact(reference['uri'])} failed: {message}", 502)
+        span.set(bytes=len(content))
+    fetch_seconds = time.perf_counter() - started
+
+    key = DocumentCache.key(content, reference) if cache is not None else None
+    records = cache.get(key) if cache is not None else None
+    cached = records is not None
+    if records is None:
+        with stage_span("document.decode", format=reference["format"], bytes=len(content)) as span:
+            try:
+                records = decode_document(content, reference)
+            except DocumentReferenceError:
+                raise
+            except Exception as e:
+                raise DocumentReferenceError(f"Decoding {reference['documentName']} as {reference['format']} failed: {str(e)}", 422)
+            span.set(rows=len(records))
+        if cache is not None:
+            # Cached lists are shared - callers must not modify them
+            cache.put(key, records)
+
+    logger.info(f"📥 Loaded {len(records)} records from {redact(reference['uri'])} ({len(content)} bytes, cached={cached})")
+    return records, {
+        "source": redact(reference["uri"]),
+        "format": reference["format"],
+        "bytes": len(content),
+        "records": len(records),
+        "fetchSeconds": round(fetch_seconds, 3),
+        "decodeSeconds": round(time.perf_counter() - started - fetch_seconds, 3),
+        "cached": cached
+    }
+
+
+def resolve_documents(left_document: Any, right_document: Any) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Load both documents, fetching two references concurrently
+    """
+    if is_reference(left_document) and is_reference(right_document):
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="document-fetch") as executor:
+            left_future = executor.submit(contextvars.copy_context().run, load_document, left_document)
+            right_future = executor.submit(contextvars.copy_context().run, load_document, right_document)
+            (left, left_info), (right, right_info) = left_future.result(), right_future.result()
+    else:
+        left, left_info = load_document(left_document)
+        right, right_info = load_document(right_document)
+    return left, right, {"left": left_info, "right": right_info}
+
+
+def load_documents(documents: Dict[str, Any]) -> Tuple[Dict[str, Sequence[Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
+    """
+    Load a set of documents keyed by ID, fetching up to DOCUMENT_FETCH_CONCURRENCY references at once
+    """
+    references = [document_id for document_id, document in documents.items() if is_reference(document)]
+    loaded = {}
+    if references:
+        workers = max(1, min(DOCUMENT_FETCH_CONCURRENCY, len(references)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="document-fetch") as executor:
+            futures = {
+                document_id: executor.submit(contextvars.copy_context().run, load_document, documents[document_id])
+                for document_id in references
+            }
+            loaded = {document_id: future.result() for document_id, future in futures.items()}
+    for document_id, document in documents.items():
+        if document_id not in loaded:
+            loaded[document_id] = load_document(document)
+    records = {document_id: loaded[document_id][0] for document_id in documents}
+    return records, {document_id: loaded[document_id][1] for document_id in documents}
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Streaming Excel/CSV extraction engine - rows are read lazily and projected
+to the extraction-rule columns at read time, so large workbooks are never
+materialised into a single DataFrame. iter_row_chunks streams them chunk by
+chunk; extract_spreadsheet, behind the API paths, collects every projected row
+before it returns, as SpreadsheetRecords: one value tuple per row rather than
+one dict per record.
+"""
+
+import bisect
+import csv
+import io
+import logging
+from datetime import datetime, date, time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from projection import RuleProjection, compile_projection
+
+logger = logging.getLogger(__name__)
+
+SPREADSHEET_EXTENSIONS = ('xlsx', 'xlsm', 'xls', 'csv')
+
+# Records are yielded in chunks of at most this many rows
+DEFAULT_CHUNK_SIZE = 5000
+# Leading non-empty rows searched for a header naming a rule column (title and banner rows come first)
+HEADER_SCAN_ROWS = 10
+
+
+def _file_extension(document_name: str) -> str:
+    return document_name.lower().split('.')[-1] if '.' in document_name else 'unknown'
+
+
+def _cell_value(value: Any) -> Any:
+    """
+    Convert a raw cell into a JSON-friendly value (empty cells become "")
+    """
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        if value.time() == time(0, 0):
+            return value.date().isoformat()
+        return value.isoformat()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _iter_xlsx_sheets(file_content: bytes) -> Iterator[Tuple[str, Iterator[tuple]]]:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            yield worksheet.title, worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_xls_sheets(file_content: bytes) -> Iterator[Tuple[str, Iterator[tuple]]]:
+    import xlrd
+
+    workbook = xlrd.open_workbook(file_contents=file_content, on_demand=True)
+
+    def rows(sheet):
+        for row_idx in range(sheet.nrows):
+            values = []
+            for cell in sheet.row(row_idx):
+                if cell.ctype == xlrd.XL_CELL_DATE:
+                    values.append(xlrd.xldate_as_datetime(cell.value, workbook.datemode))
+                elif cell.ctype == xlrd.XL_CELL_NUMBER and float(cell.value).is_integer():
+                    values.append(int(cell.value))
+                else:
+                    values.append(cell.value)
+            yield tuple(values)
+
+    try:
+        for sheet_idx in range(workbook.nsheets):
+            sheet = workbook.sheet_by_index(sheet_idx)
+            yield sheet.name, rows(sheet)
+            workbook.unload_sheet(sheet_idx)
+    finally:
+        workbook.release_resources()
+
+
+def _iter_csv_sheets(file_content: bytes) -> Iterator[Tuple[str, Iterator[tuple]]]:
+    try:
+        text = file_content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = file_content.decode('latin-1')
+
+    sample = text[:4096]
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+    except csv.Error:
+        dialect = csv.excel
+
+    yield 'CSV', (tuple(row) for row in csv.reader(io.StringIO(text), dialect))
+
+
+def iter_sheet_rows(file_content: bytes, document_name: str) -> Iterator[Tuple[str, Iterator[tuple]]]:
+    """
+    Yield (sheet name, lazy row iterator) for every sheet of a spreadsheet
+    """
+    file_extension = _file_extension(document_name)
+    if file_extension in ('xlsx', 'xlsm'):
+        return _iter_xlsx_sheets(file_content)
+    if file_extension == 'xls':
+        return _iter_xls_sheets(file_content)
+    if file_extension == 'csv':
+        return _iter_csv_sheets(file_content)
+    raise ValueError(f"Unsupported spreadsheet type: {file_extension}")
+
+
+def _find_header(rows: Iterator[tuple], projection: Optional[RuleProjection]) -> Tuple[Optional[List[str]], List[Tuple[str, int]]]:
+    """
+    Consume rows up to the header and return it with its (name, index) columns.
+
+    Without a projection the first non-empty row is the header. With one, the header is the first
+    of the leading HEADER_SCAN_ROWS non-empty rows that names a rule column, so title or banner rows
+    above the table are skipped.
+    """
+    scanned = 0
+    for row in rows:
+        if not any(cell not in (None, "") for cell in row):
+            continue
+        header = [str(cell).strip() if cell is not None else "" for cell in row]
+        if not projection:
+            return header, [(name, idx) for idx, name in enumerate(header) if name]
+        columns = projection.resolve_columns(header)
+        if columns:
+            return header, columns
+        scanned += 1
+        if scanned >= HEADER_SCAN_ROWS:
+            break
+    return None, []
+
+
+def iter_row_chunks(
+    file_content: bytes,
+    document_name: str,
+    projection: Optional[RuleProjection] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    sheet_stats: Optional[List[Dict[str, Any]]] = None
+) -> Iterator[Tuple[Tuple[str, ...], List[tuple]]]:
+    """
+    Stream (column names, row value tuples) chunks of at most chunk_size rows, sheet by sheet.
+
+    When a projection is given only the matching columns are read; sheets whose header
+    has none of the terms are skipped. Per-sheet counts are appended to sheet_stats when
+    a list is supplied: rows kept, and sourceRows, the non-empty rows below the header
+    before projection.
+    """
+    for sheet_name, rows in iter_sheet_rows(file_content, document_name):
+        stats = {"sheet": sheet_name, "rows": 0, "sourceRows": 0, "columns": [], "skipped": False}
+        _, columns = _find_header(rows, projection)
+        stats["columns"] = [name for name, _ in columns]
+        stats["skipped"] = not columns
+
+        if columns:
+            names = tuple(name for name, _ in columns)
+            indexes = [idx for _, idx in columns]
+            chunk = []
+            for row in rows:
+                row_len = len(row)
+                values = tuple(_cell_value(row[idx]) if idx < row_len else "" for idx in indexes)
+                if all(value == "" for value in values):
+                    # Still a source row when it has values outside the projected columns
+                    if any(cell not in (None, "") for cell in row):
+                        stats["sourceRows"] += 1
+                    continue
+                stats["sourceRows"] += 1
+                chunk.append(values)
+                stats["rows"] += 1
+                if len(chunk) >= chunk_size:
+                    yield names, chunk
+                    chunk = []
+            if chunk:
+                yield names, chunk
+
+        if sheet_stats is not None:
+            sheet_stats.append(stats)
+        logger.info(f"📊 Sheet '{sheet_name}': {stats['rows']} rows, columns {stats['columns']}")
+
+
+def iter_spreadsheet_records(
+    file_content: bytes,
+    document_name: str,
+    projection: Optional[RuleProjection] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    sheet_stats: Optional[List[Dict[str, Any]]] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream the records of every sheet in chunks of at most chunk_size rows
+    """
+    for names, rows in iter_row_chunks(file_content, document_name, projection, chunk_size, sheet_stats):
+        yield [dict(zip(names, row)) for row in rows]
+
+
+class SpreadsheetRecords(Sequence):
+    """
+    Read-only list of extracted records kept as one value tuple per row.
+
+    Column names are stored once per sheet, and record dicts are only built for
+    rows that are read. The matcher takes whole columns through column_series().
+    """
+
+    def __init__(self):
+        self._segments: List[Tuple[Tuple[str, ...], List[tuple]]] = []
+        self._starts: List[int] = []
+        self._length = 0
+
+    def extend(self, names: Tuple[str, ...], rows: List[tuple]) -> None:
+        if self._segments and self._segments[-1][0] == names:
+            self._segments[-1][1].extend(rows)
+        else:
+            self._starts.append(self._length)
+            self._segments.append((names, list(rows)))
+        self._length += len(rows)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SpreadsheetRecords index out of range")
+        segment = bisect.bisect_right(self._starts, index) - 1
+        names, rows = self._segments[segment]
+        return dict(zip(names, rows[index - self._starts[segment]]))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for names, rows in self._segments:
+            for row in rows:
+                yield dict(zip(names, row))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, (list, SpreadsheetRecords)) and list(self) == list(other)
+
+    def column_series(self, column: Optional[str]):
+        """
+        One column as a pandas Series, without building records
+        """
+        import pandas as pd
+
+        values = []
+        for names, rows in self._segments:
+            if column and column in names:
+                position = names.index(column)
+                values.extend(row[position] for row in rows)
+            else:
+                values.extend([None] * len(rows))
+        return pd.Series(values, dtype=object)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+
+def read_spreadsheet(
+    file_content: bytes,
+    document_name: str,
+    projection: Optional[RuleProjection] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    sheet_stats: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[SpreadsheetRecords, int]:
+    """
+    Consume the row chunks into SpreadsheetRecords - returns the records and the number of chunks read
+    """
+    records = SpreadsheetRecords()
+    chunks = 0
+    for names, rows in iter_row_chunks(file_content, document_name, projection, chunk_size, sheet_stats):
+        records.extend(names, rows)
+        chunks += 1
+    return records, chunks
+
+
+def extract_spreadsheet(
+    file_content: bytes,
+    document_name: str,
+    extraction_rules: List[Dict],
+    profile_context: Optional[Dict] = None,
+    document_url: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Extract records from an Excel/CSV document using streaming row iteration.
+
+    extractedData is a SpreadsheetRecords - use extract_from_excel for a JSON-ready list.
+    """
+    logger.info(f"📊 Extracting spreadsheet data from {document_name}...")
+    file_extension = _file_extension(document_name)
+    projection = compile_projection(extraction_rules)
+
+    try:
+        sheet_stats = []
+        extracted_data, chunks = read_spreadsheet(file_content, document_name, projection, chunk_size, sheet_stats)
+
+        projection_applied = bool(projection)
+        if projection and not extracted_data:
+            # None of the rule terms matched any sheet header - keep all columns, like the PDF path
+            logger.warning("⚠️ No sheet header matched the extraction rule terms - returning all columns")
+            sheet_stats = []
+            extracted_data, chunks = read_spreadsheet(file_content, document_name, None, chunk_size, sheet_stats)
+            projection_applied = False
+
+        processed_sheets = [s for s in sheet_stats if not s["skipped"]]
+        extraction_confidence = 95.0 if extracted_data else 0.0
+
+        logger.info(f"✅ Spreadsheet extraction completed: {len(extracted_data)} records from {len(processed_sheets)} sheet(s)")
+
+        return {
+            "success": True,
+            "message": f"Successfully extracted {len(extracted_data)} records from {document_name}",
+            "extractedData": extracted_data,
+            "metadata": {
+                "documentUrl": document_url,
+                "documentName": document_name,
+                "extractionMethod": f"Streaming {'CSV' if file_extension == 'csv' else 'Excel'} Extraction",
+                "extractionConfidence": extraction_confidence,
+                "recordsExtracted": len(extracted_data),
+                "timestamp": datetime.utcnow().isoformat(),
+                "profileContext": profile_context,
+                "rulesApplied": len(extraction_rules or []),
+                "columnProjection": projection_applied,
+                "originalRows": sum(s["sourceRows"] for s in sheet_stats),
+                "processedRows": len(extracted_data),
+                "activeSheet": processed_sheets[0]["sheet"] if processed_sheets else None,
+                "sheets": sheet_stats,
+                "chunkSize": chunk_size,
+                "chunksRead": chunks
+            }
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Error in spreadsheet extraction: {str(e)}")
+        return {
+            "success": False,
+            "message": f"Spreadsheet extraction failed: {str(e)}",
+            "extractedData": [],
+            "metadata": {
+                "documentUrl": document_url,
+                "documentName": document_name,
+                "extractionMethod": "Streaming Spreadsheet Extraction (Failed)",
+                "extractionConfidence": 0,
+                "recordsExtracted": 0,
+                "timestamp": datetime.utcnow().isoformat(),
+                "profileContext": profile_context,
+                "rulesApplied": len(extraction_rules or []),
+                "error": str(e)
+            }
+        }
+
+
+def extract_from_excel(
+    file_content: bytes,
+    document_name: str,
+    extraction_rules: List[Dict],
+    profile_context: Optional[Dict] = None,
+    document_url: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    extract_spreadsheet with extractedData as a list of record dicts, for JSON responses
+    """
+    result = extract_spreadsheet(file_content, document_name, extraction_rules, profile_context, document_url, chunk_size)
+    if isinstance(result["extractedData"], SpreadsheetRecords):
+        result["extractedData"] = result["extractedData"].to_records()
+    return result
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Hybrid reconciliation - the deterministic matcher settles every record it is
+confident about, and only the ambiguous or unmatched residue is sent to the
+LLM together with its top-k candidate pairs. The LLM's decisions are merged
+back into the structured results.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from chunked_prompting import DEFAULT_MAX_CONCURRENCY, DEFAULT_TOKEN_BUDGET, run_chunk_prompts
+from llm_cache import CacheSession
+from llm_instrumentation import LlmMetrics
+from matching_engine import (
+    RECONCILED_THRESHOLD,
+    PreparedDocument,
+    describe_pair,
+    match_left_record,
+    top_candidates,
+    unmatched_right_record
+)
+from prompt_encoding import (
+    DEFAULT_PROMPT_ENCODING,
+    ENCODING_LABELS,
+    encode_rows,
+    encoding_report,
+    estimate_tokens,
+    row_tokens
+)
+from schema_inference import infer_columns
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = int(os.environ.get("HYBRID_TOP_K", "3"))
+# Ceiling for the per-request topK override
+TOP_K_LIMIT = int(os.environ.get("HYBRID_TOP_K_LIMIT", str(max(DEFAULT_TOP_K, 10))))
+
+# A match is settled without the LLM when it is at least HIGH CONFIDENCE and
+# clearly ahead of the runner-up candidate
+CONFIDENT_THRESHOLD = 70.0
+AMBIGUITY_MARGIN = 10.0
+
+ADJUDICATION_PROMPT = """
+SALES AND PAYMENT RECONCILIATION - ADJUDICATION ({item_count} sales records):
+
+A deterministic matcher could not settle the sales records below. Each one is
+listed with its best candidate payment records and the matcher's score (0-100+).
+Choose the payment record that corresponds to each sales record, or null when
+none of the candidates does.
+
+SALES RECORDS ({encoding_label}):
+{left_rows}
+
+CANDIDATE PAYMENT RECORDS ({encoding_label}):
+{right_rows}
+
+CANDIDATES PER SALES RECORD (payment id and score):
+{candidate_lines}
+
+Respond with a JSON array only, one object per sales record:
+[{{"left": "left-0", "right": "right-3" or null, "confidence": 0-100, "reason": "short explanation"}}]
+"""
+
+
+class ResidueItem(NamedTuple):
+    left_idx: int
+    candidates: List[Tuple[int, float]]
+
+
+class Decision(NamedTuple):
+    right_idx: Optional[int]
+    confidence: float
+    reason: str
+
+
+def split_residue(
+    left: PreparedDocument,
+    right: PreparedDocument,
+    top_k: int = DEFAULT_TOP_K
+) -> Tuple[Dict[int, Tuple[int, float]], List[ResidueItem]]:
+    """
+    Settle confident matches and collect the residue with its top-k candidates
+    """
+    resolved: Dict[int, Tuple[int, float]] = {}
+    residue: List[ResidueItem] = []
+    for left_idx in range(len(left)):
+        candidates = top_candidates(left, left_idx, right, max(top_k, 2))
+        best_score = candidates[0][1] if candidates else 0.0
+        runner_up = candidates[1][1] if len(candidates) > 1 else 0.0
+        if best_score >= CONFIDENT_THRESHOLD and best_score - runner_up >= AMBIGUITY_MARGIN:
+            resolved[left_idx] = candidates[0]
+        else:
+            residue.append(ResidueItem(left_idx, candidates[:top_k]))
+    return resolved, residue
+
+
+def _candidate_line(item: ResidueItem) -> str:
+    candidates = ", ".join(f"right-{right_idx} ({score:.0f})" for right_idx, score in item.candidates)
+    return f"left-{item.left_idx}: {candidates or 'none'}"
+
+
+def _adjudication_prompt(
+    batch: List[ResidueItem],
+    left: PreparedDocument,
+    right: PreparedDocument,
+    encoding: str
+) -> Tuple[str, List[Tuple[str, Dict[str, Any]]]]:
+    left_rows = [(f"left-{item.left_idx}", left.records[item.left_idx]) for item in batch]
+    right_indices = list(dict.fromkeys(right_idx for item in batch for right_idx, _ in item.candidates))
+    right_rows = [(f"right-{right_idx}", right.records[right_idx]) for right_idx in right_indices]
+    prompt = ADJUDICATION_PROMPT.format(
+        item_count=len(batch),
+        encoding_label=ENCODING_LABELS[encoding],
+        left_rows=encode_rows(left_rows, encoding),
+        right_rows=encode_rows(right_rows, encoding) if right_rows else "(none)",
+        candidate_lines="\n".join(_candidate_line(item) for item in batch)
+    )
+    return prompt, left_rows + right_rows
+
+
+def build_adjudication_prompts(
+    residue: List[ResidueItem],
+    left: PreparedDocument,
+    right: PreparedDocument,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    encoding: str = DEFAULT_PROMPT_ENCODING
+) -> Tuple[List[str], List[List[Tuple[str, Dict[str, Any]]]]]:
+    """
+    Pack residue items into adjudication prompts under the token budget.
+
+    A candidate payment shared by several sales records is listed once per
+    prompt. Also returns the rows of each prompt.
+    """
+    prompts = []
+    prompt_rows: List[List[Tuple[str, Dict[str, Any]]]] = []
+    batch: List[ResidueItem] = []
+    batch_rights = set()
+    batch_tokens = 0
+
+    def item_tokens(item: ResidueItem, new_rights) -> int:
+        return (
+            row_tokens(f"left-{item.left_idx}", left.records[item.left_idx], encoding)
+            + sum(row_tokens(f"right-{right_idx}", right.records[right_idx], encoding) for right_idx in new_rights)
+            + estimate_tokens(_candidate_line(item)) + 1
+        )
+
+    for item in residue:
+        new_rights = {right_idx for right_idx, _ in item.candidates} - batch_rights
+        tokens = item_tokens(item, new_rights)
+        if batch and batch_tokens + tokens > token_budget:
+            prompt, rows = _adjudication_prompt(batch, left, right, encoding)
+            prompts.append(prompt)
+            prompt_rows.append(rows)
+            batch, batch_rights, batch_tokens = [], set(), 0
+            new_rights = {right_idx for right_idx, _ in item.candidates}
+            tokens = item_tokens(item, new_rights)
+        batch.append(item)
+        batch_rights |= new_rights
+        batch_tokens += tokens
+    if batch:
+        prompt, rows = _adjudication_prompt(batch, left, right, encoding)
+        prompts.append(prompt)
+        prompt_rows.append(rows)
+    return prompts, prompt_rows
+
+
+def _record_index(value: Any, side: str) -> Optional[int]:
+    match = re.fullmatch(rf'{side}-(\d+)', str(value).strip()) if value is not None else None
+    return int(match.group(1)) if match else None
+
+
+def parse_decisions(text: str) -> Dict[int, Decision]:
+    """
+    Read the JSON decisions of one adjudication response - malformed entries are ignored
+    """
+    match = re.search(r'\[.*\]', text, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        entries = json.loads(match.group(0))
+    except ValueError:
+        logger.warning("⚠️ LLM adjudication response is not valid JSON")
+        return {}
+
+    decisions = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        left_idx = _record_index(entry.get("left"), "left")
+        if left_idx is None:
+            continue
+        try:
+            confidence = max(0.0, min(100.0, float(entry.get("confidence", 0))))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        decisions[left_idx] = Decision(
+            _record_index(entry.get("right"), "right"),
+            confidence,
+            str(entry.get("reason", "")).strip()
+        )
+    return decisions
+
+
+def adjudicated_record(
+    left: PreparedDocument,
+    right: PreparedDocument,
+    item: ResidueItem,
+    decision: Decision
+) -> Dict[str, Any]:
+    """
+    Build the reconciliation result row for an LLM decision
+    """
+    left_idx = item.left_idx
+    right_idx = decision.right_idx
+    if right_idx is None:
+        result = match_left_record(left, left_idx, right, (-1, 0.0))
+        result["aiReasoning"] = f"🤖 LLM ADJUDICATED - NO MATCH (0%): Sales record {left_idx+1} has no corresponding payment record among its candidates. {decision.reason}".strip()
+        return result
+
+    factors, discrepancies = describe_pair(left, left_idx, right, right_idx)
+    return {
+        "leftTransaction": {"id": f"left-{left_idx}", **left.records[left_idx]},
+        "rightTransaction": {"id": f"right-{right_idx}", **right.records[right_idx]},
+        "isReconciled": decision.confidence >= RECONCILED_THRESHOLD,
+        "matchedFields": factors,
+        "confidence": decision.confidence,
+        "aiReasoning": f"🤖 LLM ADJUDICATED MATCH ({decision.confidence:.0f}%): Sales record {left_idx+1} matched with payment record {right_idx+1}. {decision.reason}".strip(),
+        "discrepancies": discrepancies
+    }
+
+
+def hybrid_reconcile(
+    left_document: List[Dict[str, Any]],
+    right_document: List[Dict[str, Any]],
+    model_factory: Callable[[], Callable[[str], Any]],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    top_k: int = DEFAULT_TOP_K,
+    encoding: str = DEFAULT_PROMPT_ENCODING,
+    cache: Optional[CacheSession] = None,
+    metrics: Optional[LlmMetrics] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Reconcile with the deterministic matcher and let the LLM adjudicate the residue.
+
+    Returns the reconciliation results (left rows in order, then every right
+    record, as the side-by-side view expects) and hybrid statistics.
+    """
+    started = time.perf_counter()
+    left = PreparedDocument(left_document, infer_columns(left_document))
+    right = PreparedDocument(right_document, infer_columns(right_document))
+
+    resolved, residue = split_residue(left, right, top_k)
+    logger.info(f"⚖️ Matcher settled {len(resolved)} of {len(left)} records, {len(residue)} sent to the LLM")
+
+    prompts, prompt_rows = build_adjudication_prompts(residue, left, right, token_budget, encoding) if residue else ([], [])
+    rows_sent = [row for rows in prompt_rows for row in rows]
+    decisions: Dict[int, Decision] = {}
+    chunk_rows = [len(rows) for rows in prompt_rows]
+    for text in run_chunk_prompts(prompts, model_factory, max_concurrency, cache, metrics, chunk_rows):
+        decisions.update(parse_decisions(text))
+
+    residue_by_left = {item.left_idx: item for item in residue}
+    reconciliation_results = []
+    adjudicated = 0
+    for left_idx in range(len(left)):
+        item = residue_by_left.get(left_idx)
+        decision = decisions.get(left_idx) if item else None
+        candidate_ids = {right_idx for right_idx, _ in item.candidates} if item else set()
+        if decision and (decision.right_idx is None or decision.right_idx in candidate_ids):
+            result = adjudicated_record(left, right, item, decision)
+            result["resolvedBy"] = "llm"
+            adjudicated += 1
+        else:
+            # Settled records, and residue the LLM left undecided, keep the matcher's best candidate
+            match = resolved.get(left_idx) or (item.candidates[0] if item and item.candidates else (-1, 0.0))
+            result = match_left_record(left, left_idx, right, match)
+            result["resolvedBy"] = "matcher"
+        reconciliation_results.append(result)
+
+    for right_idx in range(len(right)):
+        result = unmatched_right_record(right, right_idx)
+        result["resolvedBy"] = "matcher"
+        reconciliation_results.append(result)
+
+    stats = {
+        "resolvedByMatcher": len(resolved),
+        "residue": len(residue),
+        "adjudicatedByLlm": adjudicated,
+        "undecided": len(residue) - adjudicated,
+        "topK": top_k,
+        "llmCalls": len(prompts),
+        "estimatedPromptTokens": sum(estimate_tokens(prompt) for prompt in prompts),
+        "promptEncoding": encoding,
+        "tokensByEncoding": encoding_report(rows_sent) if rows_sent else {},
+        "elapsedSeconds": round(time.perf_counter() - started, 3)
+    }
+    return reconciliation_results, stats
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+LLM call instrumentation.
+
+Every agent call records its wall time, input/output token counts, HTTP
+retries and throttles, and chunk size. The figures are aggregated per request
+for metadata.llm and set as attributes on a tracing.stage_span per call, so
+the spans go through the same exporter as the other stages.
+
+Retries and throttles are counted by botocore event handlers on the shared
+bedrock-runtime client. The call being made is found through a context
+variable, which Strands carries into the threads it runs the model on.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from prompt_encoding import estimate_tokens
+from tracing import stage_span
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException", "ServiceUnavailableException"}
+
+
+class CallMetrics:
+    """
+    Measurements of one agent call
+    """
+
+    def __init__(self, prompt: str, rows: int = 0):
+        self.prompt_chars = len(prompt)
+        self.estimated_tokens = estimate_tokens(prompt)
+        self.rows = rows
+        self.wall_seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.tokens_estimated = False
+        self.requests = 0
+        self.attempts = 0
+        self.throttles = 0
+        self.cached = False
+        self.error: Optional[str] = None
+
+    @property
+    def retries(self) -> int:
+        return max(self.attempts - self.requests, 0)
+
+    def record_usage(self, response: Any, response_text: str) -> None:
+        """
+        Token usage from a Strands AgentResult, estimated when the model does not report it
+        """
+        usage = getattr(getattr(response, 'metrics', None), 'accumulated_usage', None)
+        if usage and usage.get('inputTokens'):
+            self.input_tokens = int(usage.get('inputTokens', 0))
+            self.output_tokens = int(usage.get('outputTokens', 0))
+        else:
+            self.input_tokens = self.estimated_tokens
+            self.output_tokens = estimate_tokens(response_text)
+            self.tokens_estimated = True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "wallSeconds": round(self.wall_seconds, 3),
+            "inputTokens": self.input_tokens,
+            "outputTokens": self.output_tokens,
+            "tokensEstimated": self.tokens_estimated,
+            "retries": self.retries,
+            "throttles": self.throttles,
+            "chunkRows": self.rows,
+            "chunkChars": self.prompt_chars,
+            "cached": self.cached,
+            **({"error": self.error} if self.error else {})
+        }
+
+    def span_attributes(self, model_id: str) -> Dict[str, Any]:
+        return {
+            "gen_ai.request.model": model_id,
+            "gen_ai.usage.input_tokens": self.input_tokens,
+            "gen_ai.usage.output_tokens": self.output_tokens,
+            "llm.wall_time_ms": round(self.wall_seconds * 1000, 1),
+            "llm.retries": self.retries,
+            "llm.throttles": self.throttles,
+            "llm.cache_hit": self.cached,
+            "llm.chunk.rows": self.rows,
+            "llm.chunk.chars": self.prompt_chars,
+            "llm.chunk.estimated_tokens": self.estimated_tokens
+        }
+
+
+_current_call: contextvars.ContextVar[Optional[CallMetrics]] = contextvars.ContextVar("llm_current_call", default=None)
+
+
+class LlmMetrics:
+    """
+    Agent call measurements of one request
+    """
+
+    def __init__(self, model_id: str):
+        self.model_id = model_id
+        self.calls: List[CallMetrics] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def call(self, prompt: str, rows: int = 0) -> Iterator[CallMetrics]:
+        """
+        Measure one agent call inside an OpenTelemetry span
+        """
+        metrics = CallMetrics(prompt, rows)
+        token = _current_call.set(metrics)
+        started = time.perf_counter()
+        with stage_span("llm.call") as span:
+            try:
+                yield metrics
+            except Exception as e:
+                metrics.error = type(e).__name__
+                raise
+            finally:
+                metrics.wall_seconds = time.perf_counter() - started
+                _current_call.reset(token)
+                with self._lock:
+                    self.calls.append(metrics)
+                span.set_attributes(metrics.span_attributes(self.model_id))
+
+    def summary(self) -> Dict[str, Any]:
+        calls = list(self.calls)
+        model_calls = [call for call in calls if not call.cached]
+        return {
+            "modelId": self.model_id,
+            "calls": len(calls),
+            "modelCalls": len(model_calls),
+            "cachedCalls": len(calls) - len(model_calls),
+            "wallSeconds": round(sum(call.wall_seconds for call in calls), 3),
+            "maxCallSeconds": round(max((call.wall_seconds for call in calls), default=0.0), 3),
+            "inputTokens": sum(call.input_tokens for call in model_calls),
+            "outputTokens": sum(call.output_tokens for call in model_calls),
+            "retries": sum(call.retries for call in calls),
+            "throttles": sum(call.throttles for call in calls),
+            "errors": sum(1 for call in calls if call.error),
+            "perCall": [call.as_dict() for call in calls]
+        }
+
+
+def _on_before_call(**kwargs) -> None:
+    metrics = _current_call.get()
+    if metrics is not None:
+        metrics.requests += 1
+
+
+def _on_before_send(**kwargs) -> None:
+    metrics = _current_call.get()
+    if metrics is not None:
+        metrics.attempts += 1
+
+
+def _on_needs_retry(response=None, **kwargs) -> None:
+    metrics = _current_call.get()
+    if metrics is None or not response:
+        return
+    error_code = response[1].get("Error", {}).get("Code") if isinstance(response[1], dict) else None
+    if error_code in THROTTLE_CODES or getattr(response[0], "status_code", None) == 429:
+        metrics.throttles += 1
+
+
+def instrument_client(client: Any) -> None:
+    """
+    Count requests, attempts and throttles of a boto3 bedrock-runtime client (once per client)
+    """
+    if getattr(client, "_llm_instrumented", False):
+        return
+    events = client.meta.events
+    events.register("before-call.bedrock-runtime.*", _on_before_call)
+    events.register("before-send.bedrock-runtime.*", _on_before_send)
+    events.register("needs-retry.bedrock-runtime.*", _on_needs_retry)
+    client._llm_instrumented = True
@@ -3,291 +3,46 @@
 Local Flask server version of the reconciliation agent for testing
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import json
 import logging
-import requests
-import io
-import re
+import time
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from batch_extraction import (
+    DEFAULT_MAX_DOWNLOADS, DEFAULT_MAX_WORKERS, MAX_DOWNLOADS_LIMIT, MAX_WORKERS_LIMIT,
+    concurrency_setting, download_document, extract_document, iter_batch_extract
+)
+from compression import WsgiCompressionMiddleware, supported_encodings
+from metrics import CONTENT_TYPE, record_work, render, response_status, track_request
+from tracing import configure_local_exporter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# OTEL_LOCAL_EXPORTER=console|file exports stage spans for offline runs
+configure_local_exporter()
+
 app = Flask(__name__)
 CORS(app)
-
-def extract_from_pdf_text(pdf_content: bytes, document_url: str, document_name: str, extraction_rules: List[Dict], profile_context: Dict):
-    """
-    Extract financial data from PDF using REAL text extraction - NO SIMULATION
-    """
-    logger.info("📄 Extracting text from PDF document...")
-    
-    try:
-        # Try to extract text from PDF using PyPDF2
-        logger.info("🔍 Attempting PDF text extraction...")
-        
-        try:
-            import PyPDF2
-            
-            # Create a PDF reader from the content
-            pdf_file = io.BytesIO(pdf_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            logger.info(f"📄 PDF has {len(pdf_reader.pages)} pages")
-            
-            # Extract text from all pages
-            full_text = ""
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    full_text += page_text + "\n"
-                    logger.info(f"📄 Extracted text from page {page_num + 1}: {len(page_text)} characters")
-                except Exception as page_error:
-                    logger.warning(f"⚠️ Could not extract text from page {page_num + 1}: {page_error}")
-            
-            logger.info(f"📄 Total extracted text: {len(full_text)} characters")
-            logger.info(f"📄 Text sample (first 500 chars): {full_text[:500]}")
-            
-            if len(full_text.strip()) == 0:
-                logger.error("❌ No text could be extracted from PDF")
-                return {
-                    "success": False,
-                    "message": f"No text could be extracted from {document_name}. PDF might be image-based and require OCR.",
-                    "extractedData": [],
-                    "metadata": {
-                        "documentUrl": document_url,
-                        "documentName": document_name,
-                        "extractionMethod": "PDF Text Extraction (No Text Found)",
-                        "extractionConfidence": 0,
-                        "recordsExtracted": 0,
-                        "timestamp": datetime.utcnow().isoformat(),
-                        "profileContext": profile_context,
-                        "rulesApplied": len(extraction_rules),
-                        "error": "No extractable text found - PDF may be image-based"
-                    }
-                }
-            
-            # Now try to find financial patterns in the text
-            logger.info("🔍 Analyzing text for financial patterns...")
-            extracted_data = extract_financial_patterns_from_text(full_text, document_name)
-            
-            # Apply extraction rules if provided
-            if extraction_rules and extracted_data:
-                logger.info(f"📋 Applying {len(extraction_rules)} extraction rules")
-                rule_terms = set()
-                for rule in extraction_rules:
-                    rule_terms.update(rule.get('terms', []))
-                
-                if rule_terms:
-                    filtered_data = []
-                    for record in extracted_data:
-                        filtered_record = {}
-                        for term in rule_terms:
-                            # Try exact match first, then case-insensitive
-                            if term in record:
-                                filtered_record[term] = record[term]
-                            else:
-                                for key in record.keys():
-                                    if key.lower() == term.lower():
-                                        filtered_record[term] = record[key]
-                                        break
-                        if filtered_record:
-                            filtered_data.append(filtered_record)
-                    extracted_data = filtered_data if filtered_data else extracted_data
-            
-            extraction_confidence = 75.0 if extracted_data else 0.0
-            
-            logger.info(f"✅ PDF text extraction completed: {len(extracted_data)} records with {extraction_confidence}% confidence")
-            
-            return {
-                "success": True,
-                "message": f"Successfully extracted {len(extracted_data)} records from PDF text analysis",
-                "extractedData": extracted_data,
-                "metadata": {
-                    "documentUrl": document_url,
-                    "documentName": document_name,
-                    "extractionMethod": "PDF Text Extraction + Pattern Recognition",
-                    "extractionConfidence": extraction_confidence,
-                    "recordsExtracted": len(extracted_data),
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "profileContext": profile_context,
-                    "rulesApplied": len(extraction_rules),
-                    "textLength": len(full_text),
-                    "pagesProcessed": len(pdf_reader.pages)
-                }
-            }
-            
-        except ImportError:
-            logger.error("❌ PyPDF2 not available - cannot extract PDF text")
-            return {
-                "success": False,
-                "message": f"PDF text extraction requires PyPDF2 library. Cannot process {document_name}.",
-                "extractedData": [],
-                "metadata": {
-                    "documentUrl": document_url,
-                    "documentName": document_name,
-                    "extractionMethod": "PDF Text Extraction (Library Missing)",
-                    "extractionConfidence": 0,
-                    "recordsExtracted": 0,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "profileContext": profile_context,
-                    "rulesApplied": len(extraction_rules),
-                    "error": "PyPDF2 library not installed"
-                }
-            }
-        
-    except Exception as e:
-        logger.error(f"❌ Error in PDF text extraction: {str(e)}")
-        return {
-            "success": False,
-            "message": f"PDF text extraction failed: {str(e)}",
-            "extractedData": [],
-            "metadata": {}
-        }
-
-def extract_financial_patterns_from_text(text: str, document_name: str) -> List[Dict]:
-    """
-    Extract financial transaction patterns from PDF text using regex
-    """
-    logger.info("🔍 Searching for financial patterns in extracted text...")
-    
-    extracted_data = []
-    
-    # Enhanced financial patterns for different document types
-    # Date patterns: MM/DD/YYYY, DD/MM/YYYY, YYYY-MM-DD
-    date_patterns = [
-        r'\b(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})\b',
-        r'\b(\d{4}[/\-]\d{1,2}[/\-]\d{1,2})\b'
-    ]
-    
-    # Amount patterns: $123.45, 123.45, (123.45)
-    amount_patterns = [
-        r'\$\s*(\d{1,3}(?:,\d{3})*\.\d{2})',  # $1,234.56
-        r'\$\s*(\d+\.\d{2})',                 # $123.45
-        r'(\d{1,3}(?:,\d{3})*\.\d{2})',      # 1,234.56
-        r'\(\s*\$?\s*(\d{1,3}(?:,\d{3})*\.\d{2})\s*\)'  # ($1,234.56)
-    ]
-    
-    # Split text into lines for line-by-line analysis
-    lines = text.split('\n')
-    
-    # Strategy 1: Look for traditional transaction lines (date + amount)
-    for line_num, line in enumerate(lines):
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Look for lines that contain both date and amount patterns
-        dates_found = []
-        amounts_found = []
-        
-        # Find dates
-        for date_pattern in date_patterns:
-            dates_found.extend(re.findall(date_pattern, line))
-        
-        # Find amounts
-        for amount_pattern in amount_patterns:
-            amounts_found.extend(re.findall(amount_pattern, line))
-        
-        # If we found both date and amount, this might be a transaction line
-        if dates_found and amounts_found:
-            try:
-                # Take the first date and amount found
-                date_str = dates_found[0]
-                amount_str = amounts_found[0].replace(',', '').replace('$', '').strip()
-                amount = float(amount_str)
-                
-                # Extract description (everything except date and amount)
-                description = line
-                for date in dates_found:
-                    description = description.replace(date, '').strip()
-                for amount in amounts_found:
-                    description = description.replace(f'${amount}', '').replace(amount, '').strip()
-                
-                # Clean up description
-                description = re.sub(r'\s+', ' ', description).strip()
-                if not description:
-                    description = f"Transaction from {document_name}"
-                
-                extracted_data.append({
-                    "Date": date_str,
-                    "Amount": float(amount_str),
-                    "Description": description,
-                    "LineNumber": line_num + 1,
-                    "SourceLine": line
-                })
-                
-                logger.info(f"📊 Found transaction: {date_str} - ${amount_str} - {description[:50]}...")
-                
-            except (ValueError, IndexError) as e:
-                logger.warning(f"⚠️ Could not parse transaction from line {line_num + 1}: {e}")
-                continue
-    
-    # Strategy 2: Look for summary/aggregate data (if no individual transactions found)
-    if len(extracted_data) == 0:
-        logger.info("🔍 No individual transactions found, looking for summary data...")
-        
-        # Look for summary patterns like "Total payments", "Restaurant sales", etc.
-        summary_patterns = [
-            (r'Total payments.*?\$\s*(\d{1,3}(?:,\d{3})*\.\d{2})', "Total Payments"),
-            (r'Restaurant sales.*?\$\s*(\d{1,3}(?:,\d{3})*\.\d{2})', "Restaurant Sales"),
-            (r'(\d+)\s*Marketplace orders\s+(\d{1,3}(?:,\d{3})*\.\d{2})', "Marketplace Orders"),
-            (r'(\d+)\s*Partner orders\s+(\d{1,3}(?:,\d{3})*\.\d{2})', "Partner Orders"),
-            (r'Balance.*?\$\s*(\d{1,3}(?:,\d{3})*\.\d{2})', "Balance"),
-            (r'(\d+)\s*orders.*?\$\s*(\d{1,3}(?:,\d{3})*\.\d{2})', "Order Summary"),
-            (r'Paid directly.*?(\d{1,3}(?:,\d{3})*\.\d{2})', "Direct Payment"),
-            (r'taxes.*?(\d{1,3}(?:,\d{3})*\.\d{2})', "Tax Amount")
-        ]
-        
-        for line_num, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-                
-            for pattern, description_prefix in summary_patterns:
-                matches = re.findall(pattern, line, re.IGNORECASE)
-                if matches:
-                    try:
-                        if description_prefix in ["Order Summary", "Marketplace Orders", "Partner Orders"] and len(matches[0]) == 2:
-                            # Special case for count + amount patterns
-                            count, amount_str = matches[0]
-                            amount = float(amount_str.replace(',', ''))
-                            description = f"{description_prefix}: {count} orders"
-                        else:
-                            amount_str = matches[0] if isinstance(matches[0], str) else matches[0][0]
-                            amount = float(amount_str.replace(',', ''))
-                            description = f"{description_prefix}"
-                        
-                        # Use current date as placeholder since summary docs don't have transaction dates
-                        current_date = datetime.now().strftime("%m/%d/%Y")
-                        
-                        extracted_data.append({
-                            "Date": current_date,
-                            "Amount": amount,
-                            "Description": description,
-                            "LineNumber": line_num + 1,
-                            "SourceLine": line,
-                            "Type": "Summary"
-                        })
-                        
-                        logger.info(f"📊 Found summary item: {description} - ${amount}")
-                        
-                    except (ValueError, IndexError) as e:
-                        logger.warning(f"⚠️ Could not parse summary from line {line_num + 1}: {e}")
-                        continue
-    
-    logger.info(f"✅ Pattern extraction completed: {len(extracted_data)} items found")
-    return extracted_data
+# Compressed (gzip/zstd) request bodies are decoded and JSON responses compressed on request
+app.wsgi_app = WsgiCompressionMiddleware(app.wsgi_app)
 
 @app.route('/extract', methods=['POST'])
 def extract_endpoint():
     """
     Extract financial data from documents
     """
+    with track_request("extract") as request_metrics:
+        response = extract_document_request()
+        request_metrics.status = response_status(response)
+    return response
+
+def extract_document_request():
+    """
+    Download and extract the document named in the request body
+    """
     try:
         data = request.get_json()
         
@@ -295,6 +50,7 @@ def extract_endpoint():
         document_name = data.get('document_name', 'Unknown Document')
         extraction_rules = data.get('extraction_rules', [])
         profile_context = data.get('profile_context', {})
+        full_scan = bool(data.get('full_scan', False))
         
         logger.info(f"📄 Processing extraction request for: {document_name}")
         logger.info(f"🔗 Document URL: {document_url}")
@@ -308,22 +64,15 @@ def extract_endpoint():
             }), 400
         
         # Download the document
-        response = requests.get(document_url, timeout=30)
-        response.raise_for_status()
-        
-        file_extension = document_name.lower().split('.')[-1] if '.' in document_name else 'unknown'
-        logger.info(f"📄 Document type: {file_extension}")
+        started = time.perf_counter()
+        file_content = download_document(document_url)
         
-        if file_extension == 'pdf':
-            # Process PDF file
-            result = extract_from_pdf_text(response.content, document_url, document_name, extraction_rules, profile_context)
-        else:
-            result = {
-                "success": False,
-                "message": f"Unsupported file type: {file_extension}. Only PDF is supported in this local version.",
-                "extractedData": [],
-                "metadata": {}
-            }
+        result = extract_document(file_content, document_url, document_name, extraction_rules, profile_context, full_scan)
+        record_work("extract", len(result.get("extractedData", [])), time.perf_counter() - started)
+        result.setdefault("metadata", {})["compression"] = {
+            "request": request.environ.get("clofast.compression"),
+            "supportedEncodings": supported_encodings()
+        }
         
         return jsonify(result)
         
@@ -336,6 +85,43 @@ def extract_endpoint():
             "metadata": {}
         }), 500
 
+@app.route('/extract/batch', methods=['POST'])
+def batch_extract_endpoint():
+    """
+    Extract many documents concurrently - streams one NDJSON line per document as it completes
+    """
+    data = request.get_json() or {}
+    documents = data.get('documents', [])
+    profile_context = data.get('profile_context', {})
+    
+    if not documents:
+        return jsonify({
+            "success": False,
+            "message": "No documents provided",
+            "results": [],
+            "metadata": {}
+        }), 400
+    
+    try:
+        max_downloads = concurrency_setting(data.get('max_downloads'), DEFAULT_MAX_DOWNLOADS, MAX_DOWNLOADS_LIMIT, "max_downloads")
+        max_workers = concurrency_setting(data.get('max_workers'), DEFAULT_MAX_WORKERS, MAX_WORKERS_LIMIT, "max_workers")
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e), "results": [], "metadata": {}}), 400
+    
+    logger.info(f"📦 Processing batch extraction request for {len(documents)} documents")
+    
+    def generate():
+        # Measured over the whole stream, not just until the response starts
+        with track_request("extract_batch"):
+            started = time.perf_counter()
+            records = 0
+            for item in iter_batch_extract(documents, profile_context, max_downloads=max_downloads, max_workers=max_workers):
+                records += len(item.get("extractedData", []))
+                yield json.dumps(item, default=str) + "\n"
+            record_work("extract_batch", records, time.perf_counter() - started)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """
@@ -347,6 +133,13 @@ def health_check():
         "timestamp": datetime.utcnow().isoformat()
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Prometheus text-format metrics
+    """
+    return Response(render(), content_type=CONTENT_TYPE)
+
 if __name__ == '__main__':
     logger.info("🚀 Starting Local Reconciliation Agent...")
     logger.info("📍 Server will be available at http://localhost:8000")
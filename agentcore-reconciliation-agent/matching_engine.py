@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Deterministic transaction matching engine.
+
+Each document is normalized once into typed columns (amount cents, canonical
+Rest IDs, store numbers, lowercased text) and every left record is scored
+against all right records with NumPy array operations - no value is parsed
+per pair. Only the winning pair is described in words.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from normalization import column_values, normalize_amounts, normalize_dates, normalize_ids, normalize_text
+from tracing import stage_span
+
+logger = logging.getLogger(__name__)
+
+ENGINE_VERSION = "2"
+
+# Source column for each role the matcher reads
+DEFAULT_COLUMNS = {
+    "amount": "Amount",
+    "date": "Date",
+    "month": "Month",
+    "id": "Rest ID",
+    "description": "Description",
+    "type": "Type"
+}
+
+DELIVERY_KEYWORDS = ['uber', 'doordash', 'grubhub', 'delivery', 'eats', 'restaurant']
+RESTAURANT_KEYWORDS = ['starbucks', 'mcdonald', 'pizza', 'cafe', 'restaurant']
+
+MATCH_THRESHOLD = 30.0       # Minimum confidence to pair two records
+RECONCILED_THRESHOLD = 50.0  # Minimum confidence to mark a pair reconciled
+
+
+def _money(cents: int) -> float:
+    return float(cents) / 100.0
+
+
+class PreparedDocument:
+    """
+    One side of a reconciliation, normalized into typed column arrays
+    """
+
+    def __init__(
+        self,
+        records: List[Dict[str, Any]],
+        columns: Optional[Dict[str, Optional[str]]] = None,
+        offset: int = 0
+    ):
+        self.records = records
+        self.columns = {**DEFAULT_COLUMNS, **(columns or {})}
+        # Position of the first record in the whole document, when records is a slice of it
+        self.offset = offset
+
+        with stage_span("reconcile.normalize", rows=len(records)):
+            self.amount_cents = normalize_amounts(column_values(records, self.columns["amount"])).fillna(0).to_numpy(dtype=np.int64)
+            self.date_ordinals = normalize_dates(column_values(records, self.columns["date"])).fillna(0).to_numpy(dtype=np.int64)
+            self.ids = normalize_ids(column_values(records, self.columns["id"])).to_numpy(dtype=object)
+            self.has_id = self.ids != ""
+            descriptions = normalize_text(column_values(records, self.columns["description"]))
+            dates = normalize_text(column_values(records, self.columns["date"]))
+            self.months = normalize_text(column_values(records, self.columns["month"])).to_numpy(dtype=object)
+            types_lower = normalize_text(column_values(records, self.columns["type"])).str.lower()
+
+        with stage_span("reconcile.index", rows=len(records)) as span:
+            descriptions_lower = descriptions.str.lower()
+            self.descriptions = descriptions.to_numpy(dtype=object)
+            self.store_numbers = descriptions.str.extract(r'#(\d+)', expand=False).fillna('').to_numpy(dtype=object)
+            self.dates = dates.to_numpy(dtype=object)
+            self.dates_lower = dates.str.lower().to_numpy(dtype=object)
+
+            self.delivery = descriptions_lower.str.contains('|'.join(DELIVERY_KEYWORDS), regex=True).to_numpy(dtype=bool)
+            self.restaurant = descriptions_lower.str.contains('|'.join(RESTAURANT_KEYWORDS), regex=True).to_numpy(dtype=bool)
+            self.third_party = (types_lower == '3rd party delivery').to_numpy(dtype=bool)
+
+            # Score contributed by the record alone, whatever it is compared with
+            self.static_bonus = self.delivery * 15.0 + self.restaurant * 10.0 + self.third_party * 10.0
+            span.set(rows_with_id=int(self.has_id.sum()), store_numbers=int((self.store_numbers != "").sum()))
+
+        self._month_matches = {}
+        self._id_in_description = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def month_matches(self, month: str) -> np.ndarray:
+        """
+        Rows whose date text contains the month (cached per month)
+        """
+        month_lower = month.lower()
+        matches = self._month_matches.get(month_lower)
+        if matches is None:
+            matches = np.fromiter((month_lower in date for date in self.dates_lower), dtype=bool, count=len(self))
+            self._month_matches[month_lower] = matches
+        return matches
+
+    def id_in_descriptions(self, rest_id: str) -> np.ndarray:
+        """
+        Rows whose description contains the Rest ID as text (cached per ID)
+        """
+        matches = self._id_in_description.get(rest_id)
+        if matches is None:
+            matches = np.fromiter((rest_id in description for description in self.descriptions), dtype=bool, count=len(self))
+            self._id_in_description[rest_id] = matches
+        return matches
+
+
+def score_candidates(left: PreparedDocument, left_idx: int, right: PreparedDocument) -> np.ndarray:
+    """
+    Confidence of left record left_idx against every right record
+    """
+    left_cents = left.amount_cents[left_idx]
+    right_cents = right.amount_cents
+    left_id = left.ids[left_idx]
+    count = len(right)
+
+    both_positive = (right_cents > 0) & (left_cents > 0)
+    diff = np.abs(right_cents - left_cents)
+    ratio = np.divide(diff, np.maximum(right_cents, left_cents), out=np.full(count, np.inf), where=both_positive)
+    amount_exact = both_positive & (diff == 0)
+
+    if left_id:
+        rest_exact = right.has_id & (right.ids == left_id)
+        has_store = right.store_numbers != ""
+        # Rest ID in the description: a "#1234" store number must match, otherwise plain containment
+        rest_in_description = ~right.has_id & (right.descriptions != "") & np.where(
+            has_store, right.store_numbers == left_id, right.id_in_descriptions(left_id)
+        )
+    else:
+        rest_exact = np.zeros(count, dtype=bool)
+        rest_in_description = rest_exact
+
+    perfect = amount_exact & rest_exact
+    high = rest_exact & both_positive & ~perfect
+    good = amount_exact & ~rest_exact
+
+    amount_score = np.where(ratio <= 0.05, 30.0, np.where(ratio <= 0.15, 15.0, 0.0))
+    description_id_score = np.where(
+        both_positive,
+        np.where(ratio <= 0.15, 50.0, np.where(ratio <= 0.50, 35.0, 25.0)),
+        25.0
+    ) * rest_in_description
+    confidence = np.select(
+        [perfect, high, good],
+        [100.0, np.where(ratio <= 0.05, 90.0, 75.0), 70.0],
+        amount_score + description_id_score
+    )
+
+    left_month = left.months[left_idx]
+    if left_month:
+        confidence = confidence + right.month_matches(left_month) * 20.0
+
+    return confidence + right.static_bonus
+
+
+def describe_pair(left: PreparedDocument, left_idx: int, right: PreparedDocument, right_idx: int) -> Tuple[List[str], List[str]]:
+    """
+    Explain the score of one pair - returns (matching factors, discrepancies)
+    """
+    left_cents = int(left.amount_cents[left_idx])
+    right_cents = int(right.amount_cents[right_idx])
+    left_amount = _money(left_cents)
+    right_amount = _money(right_cents)
+    left_rest_id = left.ids[left_idx]
+    right_rest_id = right.ids[right_idx]
+    right_description = right.descriptions[right_idx]
+    store_number = right.store_numbers[right_idx]
+
+    rest_id_exact_match = bool(left_rest_id and right_rest_id and left_rest_id == right_rest_id)
+    if left_rest_id and right_rest_id:
+        rest_id_in_description = rest_id_exact_match
+    elif left_rest_id and right_description:
+        rest_id_in_description = left_rest_id == store_number if store_number else left_rest_id in right_description
+    else:
+        rest_id_in_description = False
+
+    both_positive = left_cents > 0 and right_cents > 0
+    amount_exact_match = both_positive and left_cents == right_cents
+    amount_diff = abs(left_amount - right_amount)
+    amount_ratio = amount_diff / max(left_amount, right_amount) if both_positive else 0.0
+
+    match_factors = []
+    discrepancies = []
+
+    if amount_exact_match and rest_id_exact_match:
+        match_factors.append(f"PERFECT MATCH: Exact amount ${left_amount} + Rest ID {left_rest_id} = {right_rest_id}")
+    elif rest_id_exact_match and both_positive:
+        if amount_ratio <= 0.05:
+            match_factors.append(f"HIGH CONFIDENCE: Rest ID {left_rest_id} = {right_rest_id} + close amount ${left_amount} ≈ ${right_amount}")
+        else:
+            match_factors.append(f"GOOD MATCH: Rest ID {left_rest_id} = {right_rest_id} + different amount ${left_amount} vs ${right_amount}")
+            discrepancies.append(f"Amount difference: ${amount_diff:.2f} ({amount_ratio:.1%})")
+    elif amount_exact_match:
+        match_factors.append(f"GOOD MATCH: Exact amount ${left_amount}")
+    else:
+        if both_positive:
+            if amount_ratio <= 0.05:
+                match_factors.append(f"Close amount match: ${left_amount} ≈ ${right_amount}")
+            elif amount_ratio <= 0.15:
+                match_factors.append(f"Similar amounts: ${left_amount} vs ${right_amount}")
+                discrepancies.append(f"Amount difference: ${amount_diff:.2f}")
+            else:
+                discrepancies.append(f"Significant amount difference: ${amount_diff:.2f}")
+
+        if rest_id_in_description and not rest_id_exact_match:
+            if both_positive and amount_ratio <= 0.15:
+                if store_number:
+                    match_factors.append(f"🎯 STRONG MATCH: Rest ID {left_rest_id} = Store #{store_number} + similar amount")
+                else:
+                    match_factors.append(f"🎯 STRONG MATCH: Rest ID {left_rest_id} found + similar amount")
+            elif both_positive and amount_ratio <= 0.50:
+                if store_number:
+                    match_factors.append(f"🎯 Rest ID {left_rest_id} matches Store #{store_number} (unique identifier)")
+                    discrepancies.append(f"Amount difference: ${amount_diff:.2f} ({amount_ratio:.1%})")
+                else:
+                    match_factors.append(f"🎯 Rest ID {left_rest_id} found (unique identifier)")
+                    discrepancies.append(f"Amount difference: ${amount_diff:.2f}")
+            elif both_positive and store_number:
+                match_factors.append(f"Rest ID {left_rest_id} matches Store #{store_number}")
+                discrepancies.append(f"Large amount difference: ${amount_diff:.2f} ({amount_ratio:.1%})")
+            else:
+                match_factors.append(f"Rest ID {left_rest_id} found in payment description")
+
+    left_month = left.months[left_idx]
+    right_date = right.dates[right_idx]
+    if left_month and right_date:
+        if left_month.lower() in right_date.lower():
+            match_factors.append(f"Month match: {left_month} found in {right_date}")
+        else:
+            discrepancies.append(f"Date mismatch: {left_month} vs {right_date}")
+
+    if right.delivery[right_idx]:
+        match_factors.append("Delivery transaction identified")
+    if right.restaurant[right_idx]:
+        match_factors.append("Restaurant transaction identified")
+    if right.third_party[right_idx]:
+        match_factors.append("3rd party delivery type match")
+
+    return match_factors, discrepancies
+
+
+def best_match(left: PreparedDocument, left_idx: int, right: PreparedDocument) -> Tuple[int, float]:
+    """
+    Highest-scoring right record for a left record - (-1, 0.0) when nothing scores
+    """
+    if len(right) == 0:
+        return -1, 0.0
+    confidence = score_candidates(left, left_idx, right)
+    right_idx = int(np.argmax(confidence))
+    best_confidence = float(confidence[right_idx])
+    if best_confidence <= 0:
+        return -1, 0.0
+    return right_idx, best_confidence
+
+
+def top_candidates(left: PreparedDocument, left_idx: int, right: PreparedDocument, k: int) -> List[Tuple[int, float]]:
+    """
+    The k highest-scoring right records for a left record, best first (scores above zero only)
+    """
+    if len(right) == 0 or k <= 0:
+        return []
+    confidence = score_candidates(left, left_idx, right)
+    k = min(k, len(right))
+    indices = np.argpartition(-confidence, k - 1)[:k]
+    # Stable order on ties - the lower right index wins, as in best_match
+    indices = indices[np.lexsort((indices, -confidence[indices]))]
+    return [(int(i), float(confidence[i])) for i in indices if confidence[i] > 0]
+
+
+def match_reasoning(left_idx: int, right_idx: int, confidence: float, factors: List[str], discrepancies: List[str]) -> str:
+    if confidence >= 100.0:
+        return f"🎯 PERFECT MATCH (100%): Sales record {left_idx+1} PERFECTLY matched with payment record {right_idx+1}. EXACT amount match + Rest ID found in payment description: {', '.join(factors)}. This is a confirmed transaction pair with absolute certainty."
+    if confidence >= 70.0:
+        return f"🟢 HIGH CONFIDENCE MATCH ({confidence:.0f}%): Sales record {left_idx+1} successfully matched with payment record {right_idx+1}. Strong correlation found: {', '.join(factors)}. This appears to be a confirmed transaction pair with reliable matching indicators."
+    if confidence >= 50.0:
+        return f"🟡 MODERATE CONFIDENCE MATCH ({confidence:.0f}%): Sales record {left_idx+1} shows potential match with payment record {right_idx+1}. Matching factors: {', '.join(factors)}. Some discrepancies noted: {', '.join(discrepancies)}. Recommend manual verification."
+    return f"🔴 LOW CONFIDENCE MATCH ({confidence:.0f}%): Sales record {left_idx+1} has weak correlation with payment record {right_idx+1}. Limited matching factors: {', '.join(factors)}. Significant issues: {', '.join(discrepancies)}. Manual investigation required."
+
+
+def match_left_record(
+    left: PreparedDocument,
+    left_idx: int,
+    right: PreparedDocument,
+    match: Optional[Tuple[int, float]] = None
+) -> Dict[str, Any]:
+    """
+    Build the reconciliation result row for one left record (match is a precomputed best_match)
+    """
+    left_record = left.records[left_idx]
+    left_number = left.offset + left_idx
+    left_transaction = {"id": f"left-{left_number}", **left_record}
+    right_idx, confidence = match if match is not None else best_match(left, left_idx, right)
+
+    if right_idx >= 0 and confidence >= MATCH_THRESHOLD:
+        factors, discrepancies = describe_pair(left, left_idx, right, right_idx)
+        return {
+            "leftTransaction": left_transaction,
+            "rightTransaction": {"id": f"right-{right_idx}", **right.records[right_idx]},
+            "isReconciled": confidence >= RECONCILED_THRESHOLD,
+            "matchedFields": factors,
+            "confidence": confidence,
+            "aiReasoning": match_reasoning(left_number, right_idx, confidence, factors, discrepancies),
+            "discrepancies": discrepancies
+        }
+
+    left_amount = _money(left.amount_cents[left_idx]) if left.amount_cents[left_idx] else 0
+    left_month = left.months[left_idx]
+    return {
+        "leftTransaction": left_transaction,
+        "rightTransaction": None,
+        "isReconciled": False,
+        "matchedFields": [],
+        "confidence": 0.0,
+        "aiReasoning": f"🔴 NO MATCH FOUND (0%): Sales record {left_number+1} (${left_amount}, {left_month}) could not be matched with any payment records. This transaction may be missing from the bank statement, processed in a different period, or require manual investigation to locate the corresponding payment.",
+        "discrepancies": ["No matching payment record found"]
+    }
+
+
+def unmatched_right_record(right: PreparedDocument, right_idx: int) -> Dict[str, Any]:
+    """
+    Build the reconciliation result row for a right record listed on its own
+    """
+    right_record = right.records[right_idx]
+    right_amount = right_record.get(right.columns["amount"], 0) if right.columns["amount"] else 0
+    right_description = right.descriptions[right_idx]
+    return {
+        "leftTransaction": None,
+        "rightTransaction": {"id": f"right-{right_idx}", **right_record},
+        "isReconciled": False,
+        "matchedFields": [],
+        "confidence": 0.0,
+        "aiReasoning": f"🔴 UNMATCHED PAYMENT (0%): Payment record {right_idx+1} (${right_amount}) could not be matched with any sales records. Description: '{right_description}'. This payment may correspond to sales from a different period, different restaurant, or require manual investigation to locate the corresponding sales transaction.",
+        "discrepancies": ["No matching sales record found"]
+    }
+
+
+def score_all(left: PreparedDocument, right: PreparedDocument) -> List[Tuple[int, float]]:
+    """
+    best_match for every left record
+    """
+    with stage_span("reconcile.score", left_rows=len(left), right_rows=len(right), candidates=len(left) * len(right)):
+        return [best_match(left, left_idx, right) for left_idx in range(len(left))]
+
+
+def reconcile_prepared(left: PreparedDocument, right: PreparedDocument) -> List[Dict[str, Any]]:
+    """
+    Match every left record to its best right record, then list the right records.
+
+    Right records may be matched by several left records (many-to-many), so every
+    right record is also listed on its own, as the side-by-side view expects.
+    """
+    matches = score_all(left, right)
+    with stage_span("reconcile.assign", rows=len(left) + len(right)) as span:
+        reconciliation_results = [match_left_record(left, left_idx, right, match) for left_idx, match in enumerate(matches)]
+        reconciliation_results.extend(unmatched_right_record(right, right_idx) for right_idx in range(len(right)))
+        span.set(matched=sum(1 for row in reconciliation_results if row["rightTransaction"] and row["leftTransaction"]))
+    return reconciliation_results
+
+
+def reconcile_records(
+    left_document: List[Dict[str, Any]],
+    right_document: List[Dict[str, Any]],
+    left_columns: Optional[Dict[str, Optional[str]]] = None,
+    right_columns: Optional[Dict[str, Optional[str]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Normalize both documents and reconcile them
+    """
+    left = PreparedDocument(left_document, left_columns)
+    right = PreparedDocument(right_document, right_columns)
+    logger.info(f"🔍 Scoring {len(left)} x {len(right)} candidate pairs")
+    return reconcile_prepared(left, right)
+
+
+def match_left_batch(
+    left_records: List[Dict[str, Any]],
+    right: PreparedDocument,
+    left_columns: Optional[Dict[str, Optional[str]]] = None,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Match a slice of the left document (starting at offset) against the whole right document, prepared once per job
+    """
+    left = PreparedDocument(left_records, left_columns, offset)
+    matches = score_all(left, right)
+    with stage_span("reconcile.assign", rows=len(left), offset=offset):
+        return [match_left_record(left, left_idx, right, match) for left_idx, match in enumerate(matches)]
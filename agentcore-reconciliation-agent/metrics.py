@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Prometheus text-format metrics for the local agent and the AgentCore app.
+
+Request counts and latency histograms are kept per operation, together with
+records processed, candidate pairs scored and records per second. Cache hit
+ratios, work queue depth and process memory are read when /metrics is
+scraped, from callbacks the apps register. Only the standard library is used,
+so exposing metrics costs nothing at import time. The output follows the
+Prometheus text exposition format (version 0.0.4).
+"""
+
+import contextlib
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    A named family of samples, one per label set
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Labels, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels) -> int:
+        counts, _ = self._values.get(_labels(labels), ([0], 0.0))
+        return counts[-1]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in values:
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+REQUESTS = Counter("clofast_requests_total", "Requests handled, by operation and HTTP status")
+REQUEST_SECONDS = Histogram("clofast_request_duration_seconds", "Request latency in seconds, by operation")
+RECORDS = Counter("clofast_records_total", "Records extracted or reconciled, by operation")
+RECORDS_PER_SECOND = Gauge("clofast_records_per_second", "Records per second of the most recent request, by operation")
+PAIRS_SCORED = Counter("clofast_pairs_scored_total", "Candidate record pairs scored, by operation")
+
+_collectors: Dict[str, Callable[[], List[str]]] = {}
+_caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+
+def register_collector(name: str, collect: Callable[[], List[str]]) -> None:
+    """
+    Add exposition lines produced at scrape time (replaces a collector of the same name)
+    """
+    _collectors[name] = collect
+
+
+def register_cache(cache: str, counts: Callable[[], Tuple[int, int]]) -> None:
+    """
+    Report a cache's (hits, misses) as clofast_cache_* samples labelled cache=<name>
+    """
+    _caches[cache] = counts
+
+
+def record_work(operation: str, records: int, seconds: float, pairs: int = 0) -> None:
+    """
+    Count the records (and candidate pairs) one request processed
+    """
+    RECORDS.inc(records, operation=operation)
+    if pairs:
+        PAIRS_SCORED.inc(pairs, operation=operation)
+    if seconds > 0:
+        RECORDS_PER_SECOND.set(round(records / seconds, 3), operation=operation)
+
+
+class RequestTracker:
+    """
+    Outcome of one tracked request - set status when it is not a plain success
+    """
+
+    def __init__(self):
+        self.status = 200
+
+
+@contextlib.contextmanager
+def track_request(operation: str) -> Iterator[RequestTracker]:
+    """
+    Count a request and observe its latency; an exception counts as status 500
+    """
+    tracker = RequestTracker()
+    started = time.perf_counter()
+    try:
+        yield tracker
+    except Exception:
+        tracker.status = 500
+        raise
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation)
+        REQUESTS.inc(operation=operation, status=tracker.status)
+
+
+def response_status(response: Any) -> int:
+    """
+    HTTP status of a handler's return value (Starlette/Flask response objects, (body, status) tuples or plain bodies)
+    """
+    if isinstance(response, tuple) and len(response) > 1 and isinstance(response[1], int):
+        return response[1]
+    for attribute in ("status_code", "status"):
+        status = getattr(response, attribute, None)
+        if isinstance(status, int):
+            return status
+    return 200
+
+
+def resident_memory_bytes() -> int:
+    """
+    Current RSS from /proc, falling back to the peak RSS where /proc is missing
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _cache_lines() -> List[str]:
+    samples = []
+    for cache, counts in sorted(_caches.items()):
+        try:
+            hits, misses = counts()
+        except Exception as e:
+            logger.warning(f"⚠️ Cache metrics for {cache} failed: {str(e)}")
+            continue
+        lookups = hits + misses
+        samples.append((cache, hits, misses, hits / lookups if lookups else 0.0))
+    if not samples:
+        return []
+    lines = ["# HELP clofast_cache_hits_total Cache hits, by cache", "# TYPE clofast_cache_hits_total counter"]
+    lines += [f'clofast_cache_hits_total{{cache="{cache}"}} {hits}' for cache, hits, _, _ in samples]
+    lines += ["# HELP clofast_cache_misses_total Cache misses, by cache", "# TYPE clofast_cache_misses_total counter"]
+    lines += [f'clofast_cache_misses_total{{cache="{cache}"}} {misses}' for cache, _, misses, _ in samples]
+    lines += ["# HELP clofast_cache_hit_ratio Hits over lookups since start, by cache", "# TYPE clofast_cache_hit_ratio gauge"]
+    lines += [f'clofast_cache_hit_ratio{{cache="{cache}"}} {_format_value(round(ratio, 4))}' for cache, _, _, ratio in samples]
+    return lines
+
+
+def _process_lines() -> List[str]:
+    return [
+        "# HELP process_resident_memory_bytes Resident memory size in bytes",
+        "# TYPE process_resident_memory_bytes gauge",
+        f"process_resident_memory_bytes {resident_memory_bytes()}",
+        "# HELP process_cpu_seconds_total Total user and system CPU time in seconds",
+        "# TYPE process_cpu_seconds_total counter",
+        f"process_cpu_seconds_total {_format_value(round(time.process_time(), 3))}"
+    ]
+
+
+def render() -> str:
+    """
+    Every metric in the Prometheus text format
+    """
+    lines = []
+    for metric in (REQUESTS, REQUEST_SECONDS, RECORDS, RECORDS_PER_SECOND, PAIRS_SCORED):
+        lines.extend(metric.render())
+    lines.extend(_cache_lines())
+    for name, collect in list(_collectors.items()):
+        try:
+            lines.extend(collect())
+        except Exception as e:
+            logger.warning(f"⚠️ Metrics collector {name} failed: {str(e)}")
+    lines.extend(_process_lines())
+    return "\n".join(lines) + "\n"
+
+
+def work_queue_lines(stats: Dict[str, Any]) -> List[str]:
+    """
+    Exposition lines for WorkQueue.stats()
+    """
+    gauges = [
+        ("clofast_work_queue_active", "Reconciliation jobs running or waiting for a worker", stats["active"]),
+        ("clofast_work_queue_queued", "Reconciliation jobs waiting for a worker", stats["queued"]),
+        ("clofast_work_queue_workers", "Reconciliation workers", stats["maxWorkers"]),
+        ("clofast_work_queue_inflight_bytes", "Estimated payload bytes of the jobs in flight", stats["inflightBytes"]),
+        ("clofast_work_queue_average_job_seconds", "Moving average of job time in seconds", stats["averageJobSeconds"])
+    ]
+    counters = [
+        ("clofast_work_queue_completed_total", "Reconciliation jobs completed", stats["completed"]),
+        ("clofast_work_queue_failed_total", "Reconciliation jobs failed", stats["failed"]),
+        ("clofast_work_queue_rejected_total", "Reconciliation jobs rejected by admission control", stats["rejected"])
+    ]
+    lines = []
+    for kind, samples in (("gauge", gauges), ("counter", counters)):
+        for name, documentation, value in samples:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"]
+    return lines
+
+
+def install_metrics_route(app) -> None:
+    """
+    Serve render() at GET /metrics on a Starlette (AgentCore) app
+    """
+    from starlette.responses import Response
+
+    async def metrics_endpoint(request):
+        return Response(render(), media_type=CONTENT_TYPE)
+
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"])
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Vectorized value normalization stage.
+
+Whole columns are converted at once with pandas/NumPy string operations:
+amounts to integer cents, dates to proleptic ordinals and identifiers to
+canonical strings. Extractors and the reconciler consume these typed columns
+instead of parsing values pair by pair.
+"""
+
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# date(1970, 1, 1).toordinal() - offset from datetime64[D] to Python ordinals
+EPOCH_ORDINAL = 719163
+# Excel's day zero (with the 1900 leap-year bug folded in)
+EXCEL_EPOCH_ORDINAL = date(1899, 12, 30).toordinal()
+# Serial numbers in this range are treated as Excel dates (1954 - 2119)
+EXCEL_SERIAL_RANGE = (20000, 80000)
+
+DATE_FORMATS = ('ISO8601', '%m/%d/%Y', '%m/%d/%y', '%m-%d-%Y', '%d.%m.%Y', '%b %d, %Y', '%d %b %Y')
+
+
+def _as_series(values: Iterable[Any]) -> pd.Series:
+    if isinstance(values, pd.Series):
+        return values.astype(object).reset_index(drop=True)
+    return pd.Series(list(values), dtype=object)
+
+
+def _string_values(series: pd.Series) -> pd.Series:
+    return series.astype('string').str.strip()
+
+
+def normalize_amounts(values: Iterable[Any]) -> pd.Series:
+    """
+    Convert a column of amounts to integer cents (nullable Int64).
+
+    Handles currency symbols, thousands separators, accounting negatives
+    "(45.00)", trailing minus signs and decimal commas "1.234,56".
+    """
+    if isinstance(values, pd.Series) and pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        # Typed numeric columns (e.g. from Arrow) skip the text parsing entirely
+        return (values.reset_index(drop=True).astype('float64') * 100).round().astype('Int64')
+
+    series = _as_series(values)
+    result = pd.to_numeric(series.where(series.map(type) != bool), errors='coerce')
+
+    text_mask = result.isna() & series.notna()
+    if text_mask.any():
+        text = _string_values(series[text_mask])
+        negative = text.str.match(r'^\(.*\)$') | text.str.contains('-', regex=False)
+        cleaned = text.str.replace(r'[^\d,.]', '', regex=True)
+
+        # A trailing ",dd" means the comma is the decimal separator
+        decimal_comma = cleaned.str.contains(r',\d{1,2}$', regex=True)
+        cleaned = cleaned.where(
+            ~decimal_comma,
+            cleaned.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        )
+        cleaned = cleaned.where(decimal_comma, cleaned.str.replace(',', '', regex=False))
+
+        parsed = pd.to_numeric(cleaned.replace('', pd.NA), errors='coerce')
+        parsed = parsed.where(~negative.fillna(False), -parsed)
+        result[text_mask] = parsed.astype('Float64').to_numpy(dtype='float64', na_value=np.nan)
+
+    return (result.astype('float64') * 100).round().astype('Int64')
+
+
+def normalize_dates(values: Iterable[Any]) -> pd.Series:
+    """
+    Convert a column of dates to proleptic Gregorian ordinals (nullable Int64).
+
+    Accepts ISO strings, common US/European layouts and Excel serial numbers.
+    """
+    if isinstance(values, pd.Series) and pd.api.types.is_datetime64_any_dtype(values):
+        if values.dt.tz is not None:
+            values = values.dt.tz_localize(None)
+        days = values.to_numpy(dtype='datetime64[D]')
+        ordinals = pd.Series(days.astype('int64') + EPOCH_ORDINAL, dtype='Int64')
+        return ordinals.mask(pd.isna(days))
+
+    series = _as_series(values)
+    ordinals = pd.Series(pd.NA, index=series.index, dtype='Int64')
+
+    numeric = pd.to_numeric(series.where(series.map(type) != bool), errors='coerce')
+    serial_mask = numeric.between(*EXCEL_SERIAL_RANGE)
+    if serial_mask.any():
+        ordinals[serial_mask] = (numeric[serial_mask].astype('int64') + EXCEL_EPOCH_ORDINAL).values
+
+    pending = ordinals.isna() & series.notna() & numeric.isna()
+    text = _string_values(series[pending])
+    for date_format in DATE_FORMATS:
+        if text.empty:
+            break
+        parsed = pd.to_datetime(text, errors='coerce', format=date_format)
+        parsed_mask = parsed.notna()
+        if parsed_mask.any():
+            days = parsed[parsed_mask].values.astype('datetime64[D]').astype('int64')
+            ordinals[text.index[parsed_mask.values]] = days + EPOCH_ORDINAL
+            text = text[~parsed_mask.values]
+
+    return ordinals
+
+
+def normalize_ids(values: Iterable[Any]) -> pd.Series:
+    """
+    Convert a column of identifiers to canonical strings ("" when missing).
+
+    Float-formatted IDs such as 1023.0 or "1023.0" become "1023".
+    """
+    series = _as_series(values)
+    text = _string_values(series)
+    text = text.str.replace(r'^(-?\d+)\.0+$', r'\1', regex=True)
+    return text.fillna('').astype(object)
+
+
+def normalize_text(values: Iterable[Any]) -> pd.Series:
+    """
+    Convert a column to stripped strings ("" when missing)
+    """
+    return _string_values(_as_series(values)).fillna('').astype(object)
+
+
+def column_values(records: List[Dict[str, Any]], column: Optional[str]) -> pd.Series:
+    """
+    Pull one column out of a list of records (None when the column is absent)
+    """
+    if hasattr(records, "column_series"):
+        # Columnar documents hand over the column without building records
+        return records.column_series(column)
+    if not column:
+        return pd.Series([None] * len(records), dtype=object)
+    return pd.Series([record.get(column) for record in records], dtype=object)
+
+
+def cents_to_amount(cents: Any) -> float:
+    return float(cents) / 100.0
+
+
+def amounts_from_strings(amount_strings: List[str]) -> np.ndarray:
+    """
+    Convert matched amount strings to float amounts in one vectorized pass (NaN when unparseable)
+    """
+    cents = normalize_amounts(amount_strings)
+    return cents.astype('float64').to_numpy(na_value=np.nan) / 100.0
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Cheap PDF page pre-classifier - decides from digit density, currency and
+date token counts whether a page is worth the full transaction scan. Cover
+pages, legal terms and marketing pages are skipped.
+"""
+
+import re
+from typing import NamedTuple
+
+# One token per amount - "$12.00" counts once, with or without its currency symbol
+CURRENCY_TOKEN = re.compile(r'[$€£]\s*\d[\d,]*(?:\.\d{2})?|\b\d{1,3}(?:,\d{3})*\.\d{2}\b')
+DATE_TOKEN = re.compile(r'\b\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}\b|\b\d{4}[/\-]\d{1,2}[/\-]\d{1,2}\b')
+
+# A page with several money tokens needs at least this share of digits to count as tabular
+MIN_DIGIT_DENSITY = 0.03
+MIN_CURRENCY_TOKENS = 2
+
+
+class PageClassification(NamedTuple):
+    transactional: bool
+    digit_density: float
+    currency_tokens: int
+    date_tokens: int
+
+
+def classify_page(page_text: str) -> PageClassification:
+    """
+    Classify a page of extracted PDF text
+    """
+    characters = sum(1 for ch in page_text if not ch.isspace())
+    digits = sum(1 for ch in page_text if ch.isdigit())
+    digit_density = digits / characters if characters else 0.0
+    currency_tokens = len(CURRENCY_TOKEN.findall(page_text))
+    date_tokens = len(DATE_TOKEN.findall(page_text))
+
+    if currency_tokens == 0:
+        transactional = False
+    elif date_tokens > 0:
+        # A dated amount may be a transaction line
+        transactional = True
+    else:
+        # Undated pages may still hold summary totals if they are number-heavy
+        transactional = currency_tokens >= MIN_CURRENCY_TOKENS and digit_density >= MIN_DIGIT_DENSITY
+
+    return PageClassification(transactional, round(digit_density, 4), currency_tokens, date_tokens)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+PDF text extraction and financial pattern recognition shared by the local
+Flask agent and the AgentCore runtime
+"""
+
+import io
+import logging
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from normalization import amounts_from_strings
+from page_classifier import classify_page
+from projection import compile_projection
+from statement_templates import StatementTemplate, detect_template
+from tracing import stage_span
+
+logger = logging.getLogger(__name__)
+
+# Generic summary patterns for statements without a known vendor template
+GENERIC_SUMMARY_PATTERNS = [
+    (re.compile(r'Total payments.*?\$\s*(\d{1,3}(?:,\d{3})*\.\d{2})', re.IGNORECASE), "Total Payments"),
+    (re.compile(r'Restaurant sales.*?\$\s*(\d{1,3}(?:,\d{3})*\.\d{2})', re.IGNORECASE), "Restaurant Sales"),
+    (re.compile(r'(\d+)\s*Marketplace orders\s+(\d{1,3}(?:,\d{3})*\.\d{2})', re.IGNORECASE), "Marketplace Orders"),
+    (re.compile(r'(\d+)\s*Partner orders\s+(\d{1,3}(?:,\d{3})*\.\d{2})', re.IGNORECASE), "Partner Orders"),
+    (re.compile(r'Balance.*?\$\s*(\d{1,3}(?:,\d{3})*\.\d{2})', re.IGNORECASE), "Balance"),
+    (re.compile(r'(\d+)\s*orders.*?\$\s*(\d{1,3}(?:,\d{3})*\.\d{2})', re.IGNORECASE), "Order Summary"),
+    (re.compile(r'Paid directly.*?(\d{1,3}(?:,\d{3})*\.\d{2})', re.IGNORECASE), "Direct Payment"),
+    (re.compile(r'taxes.*?(\d{1,3}(?:,\d{3})*\.\d{2})', re.IGNORECASE), "Tax Amount"),
+]
+
+
+def select_scan_text(page_texts: List[str], full_scan: bool = False) -> Tuple[str, List[int]]:
+    """
+    Build the text for the transaction scan, blanking pages the classifier rejects.
+
+    Skipped pages keep their line count so LineNumber stays relative to the full
+    text. Returns the scan text and the 1-based numbers of skipped pages; if every
+    page would be skipped the whole document is scanned.
+    """
+    if full_scan:
+        return "".join(page_text + "\n" for page_text in page_texts), []
+
+    scan_parts = []
+    skipped_pages = []
+    for page_num, page_text in enumerate(page_texts):
+        classification = classify_page(page_text)
+        if classification.transactional:
+            scan_parts.append(page_text + "\n")
+        else:
+            skipped_pages.append(page_num + 1)
+            scan_parts.append("\n" * (page_text.count("\n") + 1))
+            logger.info(f"⏭️ Skipping page {page_num + 1}: {classification}")
+
+    if page_texts and len(skipped_pages) == len(page_texts):
+        logger.info("📄 No page classified as transactional - scanning the full document")
+        return "".join(page_text + "\n" for page_text in page_texts), []
+
+    return "".join(scan_parts), skipped_pages
+
+
+def extract_from_pdf_text(
+    pdf_content: bytes,
+    document_url: str,
+    document_name: str,
+    extraction_rules: List[Dict],
+    profile_context: Dict,
+    full_scan: bool = False
+):
+    """
+    Extract financial data from PDF using REAL text extraction - NO SIMULATION
+
+    Pages are pre-classified and non-transactional ones are left out of the
+    pattern scan unless full_scan is set.
+    """
+    logger.info("📄 Extracting text from PDF document...")
+    
+    try:
+        # Try to extract text from PDF using PyPDF2
+        logger.info("🔍 Attempting PDF text extraction...")
+        
+        try:
+            import PyPDF2
+            
+            # Create a PDF reader from the content
+            pdf_file = io.BytesIO(pdf_content)
+            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            
+            logger.info(f"📄 PDF has {len(pdf_reader.pages)} pages")
+            
+            # Extract text from all pages
+            page_texts = []
+            for page_num, page in enumerate(pdf_reader.pages):
+                with stage_span("extract.pdf_page", page=page_num + 1) as span:
+                    try:
+                        page_text = page.extract_text()
+                        page_texts.append(page_text)
+                        span.set(characters=len(page_text))
+                        logger.info(f"📄 Extracted text from page {page_num + 1}: {len(page_text)} characters")
+                    except Exception as page_error:
+                        span.set(error=type(page_error).__name__)
+                        logger.warning(f"⚠️ Could not extract text from page {page_num + 1}: {page_error}")
+            
+            full_text = "".join(page_text + "\n" for page_text in page_texts)
+            first_page_text = next((page_text for page_text in page_texts if page_text), "")
+            logger.info(f"📄 Total extracted text: {len(full_text)} characters")
+            logger.info(f"📄 Text sample (first 500 chars): {full_text[:500]}")
+            
+            if len(full_text.strip()) == 0:
+                logger.error("❌ No text could be extracted from PDF")
+                return {
+                    "success": False,
+                    "message": f"No text could be extracted from {document_name}. PDF might be image-based and require OCR.",
+                    "extractedData": [],
+                    "metadata": {
+                        "documentUrl": document_url,
+                        "documentName": document_name,
+                        "extractionMethod": "PDF Text Extraction (No Text Found)",
+                        "extractionConfidence": 0,
+                        "recordsExtracted": 0,
+                        "timestamp": datetime.utcnow().isoformat(),
+                        "profileContext": profile_context,
+                        "rulesApplied": len(extraction_rules),
+                        "error": "No extractable text found - PDF may be image-based"
+                    }
+                }
+            
+            # Now try to find financial patterns in the text
+            logger.info("🔍 Analyzing text for financial patterns...")
+            # Fingerprint the first page once to pick a vendor statement template
+            template = detect_template(first_page_text)
+            scan_text, skipped_pages = select_scan_text(page_texts, full_scan)
+            with stage_span("extract.patterns", pages=len(page_texts), pages_skipped=len(skipped_pages), characters=len(scan_text)) as span:
+                extracted_data = extract_financial_patterns_from_text(scan_text, document_name, template, first_page_text, full_text)
+                span.set(rows=len(extracted_data))
+            
+            # Apply extraction rules if provided
+            if extraction_rules and extracted_data:
+                logger.info(f"📋 Applying {len(extraction_rules)} extraction rules")
+                projection = compile_projection(extraction_rules)
+                
+                if projection:
+                    # Terms are resolved once per record schema, then projected per field
+                    filtered_data = projection.project(extracted_data)
+                    extracted_data = filtered_data if filtered_data else extracted_data
+            
+            extraction_confidence = 75.0 if extracted_data else 0.0
+            
+            logger.info(f"✅ PDF text extraction completed: {len(extracted_data)} records with {extraction_confidence}% confidence")
+            
+            return {
+                "success": True,
+                "message": f"Successfully extracted {len(extracted_data)} records from PDF text analysis",
+                "extractedData": extracted_data,
+                "metadata": {
+                    "documentUrl": document_url,
+                    "documentName": document_name,
+                    "extractionMethod": "PDF Text Extraction + Pattern Recognition",
+                    "extractionConfidence": extraction_confidence,
+                    "recordsExtracted": len(extracted_data),
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "profileContext": profile_context,
+                    "rulesApplied": len(extraction_rules),
+                    "textLength": len(full_text),
+                    "statementTemplate": template.name if template else None,
+                    "pagesProcessed": len(pdf_reader.pages),
+                    "pagesScanned": len(page_texts) - len(skipped_pages),
+                    "pagesSkipped": len(skipped_pages),
+                    "skippedPages": skipped_pages,
+                    "fullScan": full_scan
+                }
+            }
+            
+        except ImportError:
+            logger.error("❌ PyPDF2 not available - cannot extract PDF text")
+            return {
+                "success": False,
+                "message": f"PDF text extraction requires PyPDF2 library. Cannot process {document_name}.",
+                "extractedData": [],
+                "metadata": {
+                    "documentUrl": document_url,
+                    "documentName": document_name,
+                    "extractionMethod": "PDF Text Extraction (Library Missing)",
+                    "extractionConfidence": 0,
+                    "recordsExtracted": 0,
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "profileContext": profile_context,
+                    "rulesApplied": len(extraction_rules),
+                    "error": "PyPDF2 library not installed"
+                }
+            }
+        
+    except Exception as e:
+        logger.error(f"❌ Error in PDF text extraction: {str(e)}")
+        return {
+            "success": False,
+            "message": f"PDF text extraction failed: {str(e)}",
+            "extractedData": [],
+            "metadata": {}
+        }
+
+def _apply_amounts(records: List[Dict]) -> List[Dict]:
+    """
+    Convert the matched amount strings of all records in one vectorized pass,
+    dropping records whose amount cannot be parsed
+    """
+    if not records:
+        return records
+    amounts = amounts_from_strings([record["Amount"] for record in records])
+    parsed = []
+    for record, amount in zip(records, amounts):
+        if amount != amount:
+            logger.warning(f"⚠️ Could not parse amount from line {record['LineNumber']}: {record['Amount']}")
+            continue
+        record["Amount"] = float(amount)
+        parsed.append(record)
+    return parsed
+
+
+def extract_financial_patterns_from_text(
+    text: str,
+    document_name: str,
+    template: Optional[StatementTemplate] = None,
+    first_page_text: str = "",
+    summary_text: Optional[str] = None
+) -> List[Dict]:
+    """
+    Extract financial transaction patterns from PDF text using regex.
+
+    Summary statements of a known vendor layout are parsed by its template;
+    unknown layouts fall back to the generic summary patterns. The summary
+    strategies read summary_text when given - the unfiltered document, so a
+    summary-only page the classifier skipped still contributes its totals.
+    """
+    logger.info("🔍 Searching for financial patterns in extracted text...")
+    
+    extracted_data = []
+    
+    # Enhanced financial patterns for different document types
+    # Date patterns: MM/DD/YYYY, DD/MM/YYYY, YYYY-MM-DD
+    date_patterns = [
+        r'\b(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})\b',
+        r'\b(\d{4}[/\-]\d{1,2}[/\-]\d{1,2})\b'
+    ]
+    
+    # Amount patterns: $123.45, 123.45, (123.45)
+    amount_patterns = [
+        r'\$\s*(\d{1,3}(?:,\d{3})*\.\d{2})',  # $1,234.56
+        r'\$\s*(\d+\.\d{2})',                 # $123.45
+        r'(\d{1,3}(?:,\d{3})*\.\d{2})',      # 1,234.56
+        r'\(\s*\$?\s*(\d{1,3}(?:,\d{3})*\.\d{2})\s*\)'  # ($1,234.56)
+    ]
+    
+    # Split text into lines for line-by-line analysis
+    lines = text.split('\n')
+    
+    # Strategy 1: Look for traditional transaction lines (date + amount)
+    for line_num, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+            
+        # Look for lines that contain both date and amount patterns
+        dates_found = []
+        amounts_found = []
+        
+        # Find dates
+        for date_pattern in date_patterns:
+            dates_found.extend(re.findall(date_pattern, line))
+        
+        # Find amounts
+        for amount_pattern in amount_patterns:
+            amounts_found.extend(re.findall(amount_pattern, line))
+        
+        # If we found both date and amount, this might be a transaction line
+        if dates_found and amounts_found:
+            try:
+                # Take the first date and amount found
+                date_str = dates_found[0]
+                amount_str = amounts_found[0].strip()
+                
+                # Extract description (everything except date and amount)
+                description = line
+                for date in dates_found:
+                    description = description.replace(date, '').strip()
+                for amount in amounts_found:
+                    description = description.replace(f'${amount}', '').replace(amount, '').strip()
+                
+                # Clean up description
+                description = re.sub(r'\s+', ' ', description).strip()
+                if not description:
+                    description = f"Transaction from {document_name}"
+                
+                extracted_data.append({
+                    "Date": date_str,
+                    "Amount": amount_str,
+                    "Description": description,
+                    "LineNumber": line_num + 1,
+                    "SourceLine": line
+                })
+                
+                logger.info(f"📊 Found transaction: {date_str} - ${amount_str} - {description[:50]}...")
+                
+            except (ValueError, IndexError) as e:
+                logger.warning(f"⚠️ Could not parse transaction from line {line_num + 1}: {e}")
+                continue
+    
+    extracted_data = _apply_amounts(extracted_data)
+    
+    # Strategy 2: Look for summary/aggregate data (if no individual transactions found)
+    if len(extracted_data) == 0 and summary_text is not None:
+        lines = summary_text.split('\n')
+    if len(extracted_data) == 0 and template is not None:
+        logger.info(f"🔍 No individual transactions found, parsing {template.name} summary layout...")
+        extracted_data = template.parse(lines, first_page_text)
+    
+    if len(extracted_data) == 0:
+        logger.info("🔍 No individual transactions found, looking for summary data...")
+        
+        # Look for summary patterns like "Total payments", "Restaurant sales", etc.
+        summary_patterns = GENERIC_SUMMARY_PATTERNS
+        
+        for line_num, line in enumerate(lines):
+            line = line.strip()
+            if not line:
+                continue
+                
+            for pattern, description_prefix in summary_patterns:
+                matches = pattern.findall(line)
+                if matches:
+                    try:
+                        if description_prefix in ["Order Summary", "Marketplace Orders", "Partner Orders"] and len(matches[0]) == 2:
+                            # Special case for count + amount patterns
+                            count, amount_str = matches[0]
+                            description = f"{description_prefix}: {count} orders"
+                        else:
+                            amount_str = matches[0] if isinstance(matches[0], str) else matches[0][0]
+                            description = f"{description_prefix}"
+                        
+                        # Use current date as placeholder since summary docs don't have transaction dates
+                        current_date = datetime.now().strftime("%m/%d/%Y")
+                        
+                        extracted_data.append({
+                            "Date": current_date,
+                            "Amount": amount_str,
+                            "Description": description,
+                            "LineNumber": line_num + 1,
+                            "SourceLine": line,
+                            "Type": "Summary"
+                        })
+                        
+                        logger.info(f"📊 Found summary item: {description} - ${amount_str}")
+                        
+                    except (ValueError, IndexError) as e:
+                        logger.warning(f"⚠️ Could not parse summary from line {line_num + 1}: {e}")
+                        continue
+        
+        extracted_data = _apply_amounts(extracted_data)
+    
+    logger.info(f"✅ Pattern extraction completed: {len(extracted_data)} items found")
+    return extracted_data
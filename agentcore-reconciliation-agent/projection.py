@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Extraction-rule projection compiler shared by the PDF and spreadsheet extractors.
+
+Rule terms are resolved to source keys once per distinct record schema (the
+ordered tuple of record keys, or a spreadsheet header) and the resolution is
+cached, so applying the rules to a record is a plain per-field lookup.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Upper bound on cached schemas per projection - records share a handful of shapes
+MAX_CACHED_SCHEMAS = 256
+
+
+def rule_terms_from(extraction_rules: List[Dict]) -> List[str]:
+    """
+    Collect the distinct terms of all extraction rules, keeping rule order
+    """
+    terms = []
+    seen = set()
+    for rule in extraction_rules or []:
+        for term in rule.get('terms', []) or []:
+            if term and term not in seen:
+                seen.add(term)
+                terms.append(term)
+    return terms
+
+
+class RuleProjection:
+    """
+    Compiled projection of records onto a list of rule terms.
+
+    A term matches a source key exactly, otherwise case-insensitively (first
+    key in schema order wins). The output record is keyed by the rule term.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = list(terms)
+        self._plans: Dict[Tuple, List[Tuple[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.terms)
+
+    def _build_plan(self, keys: Sequence[Any]) -> List[Tuple[str, int]]:
+        exact = {}
+        folded = {}
+        for position, key in enumerate(keys):
+            if not isinstance(key, str) or not key:
+                continue
+            exact.setdefault(key, position)
+            folded.setdefault(key.lower(), position)
+
+        plan = []
+        for term in self.terms:
+            if term in exact:
+                plan.append((term, exact[term]))
+            elif term.lower() in folded:
+                plan.append((term, folded[term.lower()]))
+        return plan
+
+    def _cached_plan(self, schema: Tuple, build) -> List[Tuple[str, Any]]:
+        plan = self._plans.get(schema)
+        if plan is None:
+            plan = build()
+            with self._lock:
+                if len(self._plans) >= MAX_CACHED_SCHEMAS:
+                    self._plans.clear()
+                self._plans[schema] = plan
+        return plan
+
+    def resolve_columns(self, header: Sequence[Any]) -> List[Tuple[str, int]]:
+        """
+        Resolve the rule terms against a header row - returns (term, column index) pairs
+        """
+        schema = ('columns',) + tuple(header)
+        return self._cached_plan(schema, lambda: self._build_plan(header))
+
+    def resolve_keys(self, keys: Sequence[Any]) -> List[Tuple[str, Any]]:
+        """
+        Resolve the rule terms against a record schema - returns (term, source key) pairs
+        """
+        schema = ('keys',) + tuple(keys)
+
+        def build():
+            return [(term, keys[position]) for term, position in self._build_plan(keys)]
+
+        return self._cached_plan(schema, build)
+
+    def apply(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Project a single record onto the rule terms
+        """
+        return {term: record[key] for term, key in self.resolve_keys(tuple(record))}
+
+    def project(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Project records, dropping those with none of the rule terms
+        """
+        projected = []
+        for record in records:
+            filtered_record = self.apply(record)
+            if filtered_record:
+                projected.append(filtered_record)
+        return projected
+
+    @property
+    def cached_schemas(self) -> int:
+        return len(self._plans)
+
+
+def compile_projection(extraction_rules: Optional[List[Dict]]) -> RuleProjection:
+    """
+    Compile the extraction rules into a reusable projection
+    """
+    return RuleProjection(rule_terms_from(extraction_rules))
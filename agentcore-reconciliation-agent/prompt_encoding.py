@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compact prompt encodings for record payloads.
+
+Records are written as one header row plus TSV or CSV rows instead of
+repeating every key on every row. Columns that are empty in every row are
+dropped, numbers are rounded to cents and each row starts with the id the
+model refers back to ("left-3"). Pretty JSON and JSON lines stay available so
+token usage can be compared per encoding.
+"""
+
+import csv
+import io
+import json
+import math
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+ENCODINGS = ("json", "jsonl", "tsv", "csv")
+DEFAULT_PROMPT_ENCODING = os.environ.get("LLM_PROMPT_ENCODING", "tsv")
+
+# Rough tokenizer-free estimate, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# encoding_report encodes at most this many evenly spaced rows and scales up
+ENCODING_REPORT_SAMPLE_ROWS = int(os.environ.get("LLM_ENCODING_REPORT_SAMPLE_ROWS", "100"))
+
+# How each encoding is introduced in a prompt
+ENCODING_LABELS = {
+    "json": "JSON Data",
+    "jsonl": "JSON Lines",
+    "tsv": "Tab-separated table, header row first",
+    "csv": "CSV table, header row first"
+}
+
+Row = Tuple[str, Dict[str, Any]]
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value)) or (isinstance(value, str) and not value.strip())
+
+
+def compact_value(value: Any) -> str:
+    """
+    A cell value as short text - whole floats lose ".0", other floats are rounded to cents
+    """
+    if _is_empty(value):
+        return ""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, float):
+        rounded = round(value, 2)
+        return str(int(rounded)) if rounded.is_integer() else f"{rounded:.2f}".rstrip('0')
+    return " ".join(str(value).split())
+
+
+def table_columns(rows: Sequence[Row]) -> List[str]:
+    """
+    Ordered union of the columns holding a value in at least one row
+    """
+    columns: Dict[str, None] = {}
+    for _, record in rows:
+        for key, value in record.items():
+            if key not in columns and not _is_empty(value):
+                columns[key] = None
+    return list(columns)
+
+
+def encode_rows(rows: Sequence[Row], encoding: str = DEFAULT_PROMPT_ENCODING) -> str:
+    """
+    Encode (row id, record) pairs in one of ENCODINGS
+    """
+    if encoding == "json":
+        return json.dumps([{"id": row_id, **record} for row_id, record in rows], indent=2, default=str)
+    if encoding == "jsonl":
+        return "\n".join(json.dumps({"id": row_id, **record}, separators=(',', ':'), default=str) for row_id, record in rows)
+    if encoding not in ("tsv", "csv"):
+        raise ValueError(f"Unknown prompt encoding: {encoding}")
+
+    columns = table_columns(rows)
+    table = [["id", *columns]]
+    table.extend([row_id, *(compact_value(record.get(column)) for column in columns)] for row_id, record in rows)
+
+    if encoding == "tsv":
+        return "\n".join("\t".join(cells) for cells in table)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(table)
+    return buffer.getvalue().rstrip("\n")
+
+
+def row_tokens(row_id: str, record: Dict[str, Any], encoding: str = DEFAULT_PROMPT_ENCODING) -> int:
+    """
+    Estimated tokens one row adds to an encoded table (header excluded)
+    """
+    if encoding in ("tsv", "csv"):
+        cells = [row_id, *(compact_value(value) for value in record.values() if not _is_empty(value))]
+        return estimate_tokens(",".join(cells)) + 1
+    return estimate_tokens(encode_rows([(row_id, record)], encoding)) + 1
+
+
+def encoding_report(rows: Sequence[Row], sample_rows: int = ENCODING_REPORT_SAMPLE_ROWS) -> Dict[str, int]:
+    """
+    Estimated tokens of the same rows in every encoding, from a sample of at most sample_rows rows
+    """
+    if len(rows) <= sample_rows:
+        return {encoding: estimate_tokens(encode_rows(rows, encoding)) for encoding in ENCODINGS}
+    step = len(rows) / sample_rows
+    sample = [rows[int(i * step)] for i in range(sample_rows)]
+    scale = len(rows) / len(sample)
+    return {encoding: int(estimate_tokens(encode_rows(sample, encoding)) * scale) for encoding in ENCODINGS}
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+An HTTP session that only talks to public addresses.
+
+document_refs.check_host vets a host by resolving it, but requests resolves it
+again when it connects - a rebinding DNS server can answer with a public address
+the first time and 169.254.169.254 the second. Here the address of every new
+connection is checked after it is made and before a byte is sent, so the request
+only ever reaches the peer that was validated.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from document_refs import DocumentReferenceError, is_public_address
+
+
+class _PublicPeer:
+    def _new_conn(self):
+        sock = super()._new_conn()
+        address = sock.getpeername()[0]
+        if not is_public_address(address):
+            sock.close()
+            raise DocumentReferenceError(f"Host {self.host} connected to non-public address {address}")
+        return sock
+
+
+class PublicHTTPConnection(_PublicPeer, HTTPConnection):
+    pass
+
+
+class PublicHTTPSConnection(_PublicPeer, HTTPSConnection):
+    pass
+
+
+class PublicHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = PublicHTTPConnection
+
+
+class PublicHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = PublicHTTPSConnection
+
+
+class PublicAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": PublicHTTPConnectionPool, "https": PublicHTTPSConnectionPool}
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def public_session() -> requests.Session:
+    """
+    The shared session - connections are direct, as a proxy would be the peer that gets checked
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.trust_env = False
+            _session.mount("http://", PublicAdapter())
+            _session.mount("https://", PublicAdapter())
+        return _session
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Asynchronous reconciliation jobs.
+
+A submitted reconciliation runs in the background and is identified by a job
+ID. A running job holds a slot on the shared work queue; it prepares the right
+document once and scores the left records against it in batches on its own
+thread, so progress (stage, records scored) can be polled while the job runs. Finished results
+are stored on local disk - the response as JSON and the result rows as JSON
+lines - and read back a page at a time until they expire after a TTL.
+"""
+
+import itertools
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from document_refs import resolve_documents
+from matching_engine import PreparedDocument, match_left_batch, unmatched_right_record
+from schema_inference import infer_columns
+from work_queue import ServerBusy, WorkQueue, estimate_records_bytes, get_work_queue
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_JOB_DIR = os.environ.get("RECONCILE_JOB_DIR", os.path.join(tempfile.gettempdir(), "clofast_reconciliation_jobs"))
+RECONCILE_JOB_TTL_SECONDS = int(os.environ.get("RECONCILE_JOB_TTL_SECONDS", str(24 * 3600)))
+RECONCILE_JOB_MAX_RUNNING = int(os.environ.get("RECONCILE_JOB_MAX_RUNNING", "2"))
+RECONCILE_JOB_MAX_PENDING = int(os.environ.get("RECONCILE_JOB_MAX_PENDING", "16"))
+RECONCILE_JOB_BATCH_RECORDS = int(os.environ.get("RECONCILE_JOB_BATCH_RECORDS", "2000"))
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+MAX_BUSY_WAIT_SECONDS = 5
+PURGE_INTERVAL_SECONDS = 60
+
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# Builds the reconciliation response from (left, right, profile_context, results, left_columns, right_columns)
+ResponseBuilder = Callable[..., Dict[str, Any]]
+
+
+class ReconciliationJob:
+    """
+    State and progress of one background reconciliation
+    """
+
+    def __init__(self, job_id: str, left_records: int, right_records: int):
+        self.job_id = job_id
+        self.status = "queued"
+        self.stage = "queued"
+        self.left_records = left_records
+        self.right_records = right_records
+        self.records_scored = 0
+        self.result_count = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task_id: Optional[int] = None
+
+    def expires_at(self, ttl_seconds: int) -> Optional[float]:
+        return self.finished_at + ttl_seconds if self.finished_at is not None else None
+
+    def as_status(self, ttl_seconds: int) -> Dict[str, Any]:
+        def timestamp(value: Optional[float]) -> Optional[str]:
+            return datetime.utcfromtimestamp(value).isoformat() if value is not None else None
+
+        return {
+            "success": self.status != "failed",
+            "jobId": self.job_id,
+            "status": self.status,
+            "progress": {
+                "stage": self.stage,
+                "recordsScored": self.records_scored,
+                "totalRecords": self.left_records,
+                "percent": round(100.0 * self.records_scored / self.left_records, 1) if self.left_records else 100.0
+            },
+            "resultCount": self.result_count,
+            "error": self.error,
+            "createdAt": timestamp(self.created_at),
+            "startedAt": timestamp(self.started_at),
+            "finishedAt": timestamp(self.finished_at),
+            "expiresAt": timestamp(self.expires_at(ttl_seconds))
+        }
+
+
+class JobStore:
+    """
+    Runs reconciliation jobs in the background and keeps their results on disk until they expire
+    """
+
+    def __init__(
+        self,
+        respond: ResponseBuilder,
+        directory: str = RECONCILE_JOB_DIR,
+        ttl_seconds: int = RECONCILE_JOB_TTL_SECONDS,
+        max_running: int = RECONCILE_JOB_MAX_RUNNING,
+        max_pending: int = RECONCILE_JOB_MAX_PENDING,
+        batch_records: int = RECONCILE_JOB_BATCH_RECORDS,
+        work_queue: Optional[WorkQueue] = None,
+        tasks: Any = None
+    ):
+        """
+        tasks, when given, is told of every unfinished job through add_async_task / complete_async_task
+        (the AgentCore app, so /ping reports HealthyBusy and the session is kept while jobs run)
+        """
+        self.respond = respond
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_running = max(1, max_running)
+        self.max_pending = max_pending
+        self.batch_records = max(1, batch_records)
+        self._work_queue = work_queue
+        self.tasks = tasks
+        self._jobs: Dict[str, ReconciliationJob] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._last_purge = 0.0
+
+    @property
+    def work_queue(self) -> WorkQueue:
+        return self._work_queue or get_work_queue()
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{job_id}{suffix}")
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_running, thread_name_prefix="reconcile-job")
+            return self._executor
+
+    def submit(
+        self,
+        left_document: Any,
+        right_document: Any,
+        profile_context: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a reconciliation and return its job status, or raise ServerBusy when too many jobs are pending.
+
+        Either document may be a reference (see document_refs); it is fetched by the job.
+        """
+        self.purge_expired()
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job.finished_at is None)
+            if pending >= self.max_pending:
+                raise ServerBusy(f"{pending} reconciliation jobs pending (limit {self.max_pending})", self.work_queue.retry_after())
+            job = ReconciliationJob(
+                uuid.uuid4().hex,
+                len(left_document) if isinstance(left_document, list) else 0,
+                len(right_document) if isinstance(right_document, list) else 0
+            )
+            self._jobs[job.job_id] = job
+            if self.tasks is not None:
+                job.task_id = self.tasks.add_async_task("reconciliation_job", {"jobId": job.job_id})
+
+        logger.info(f"🗂️ Job {job.job_id} submitted: {job.left_records} left, {job.right_records} right records")
+        self._pool().submit(self._run, job, left_document, right_document, profile_context or {})
+        return job.as_status(self.ttl_seconds)
+
+    @contextmanager
+    def _slot(self, job: ReconciliationJob, weight: int) -> Iterator[None]:
+        """
+        A work queue slot for the job - background work waits for a worker instead of failing
+        """
+        with ExitStack() as stack:
+            while True:
+                try:
+                    stack.enter_context(self.work_queue.slot(weight))
+                    break
+                except ServerBusy as e:
+                    job.stage = "waiting for a worker"
+                    time.sleep(min(e.retry_after, MAX_BUSY_WAIT_SECONDS))
+            yield
+
+    def _run(self, job: ReconciliationJob, left_document, right_document, profile_context: Dict[str, Any]) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.stage = "fetching documents"
+            left_document, right_document, sources = resolve_documents(left_document, right_document)
+            job.left_records, job.right_records = len(left_document), len(right_document)
+
+            job.stage = "inferring columns"
+            left_columns = infer_columns(left_document)
+            right_columns = infer_columns(right_document)
+
+            # Scored here rather than batch by batch on the workers, so the prepared right side
+            # is built once and never pickled to a worker process again for each batch
+            results: List[Dict[str, Any]] = []
+            with self._slot(job, estimate_records_bytes(left_document) + estimate_records_bytes(right_document)):
+                job.stage = "preparing"
+                right = PreparedDocument(right_document, right_columns)
+
+                job.stage = "scoring"
+                for offset in range(0, len(left_document), self.batch_records):
+                    batch = left_document[offset:offset + self.batch_records]
+                    results.extend(match_left_batch(batch, right, left_columns, offset))
+                    job.records_scored = offset + len(batch)
+
+            job.stage = "storing"
+            results.extend(unmatched_right_record(right, right_idx) for right_idx in range(len(right)))
+            response = self.respond(left_document, right_document, profile_context, results, left_columns, right_columns)
+            response.setdefault("metadata", {})["documentSources"] = sources
+            self._store(job, response)
+            job.result_count = len(results)
+            job.status = job.stage = "completed"
+            logger.info(f"✅ Job {job.job_id} completed: {len(results)} results in {time.time() - job.started_at:.2f}s")
+        except Exception as e:
+            logger.error(f"❌ Job {job.job_id} failed: {str(e)}")
+            job.error = str(e)
+            job.status = job.stage = "failed"
+        finally:
+            job.finished_at = time.time()
+            if self.tasks is not None and job.task_id is not None:
+                self.tasks.complete_async_task(job.task_id)
+
+    def _store(self, job: ReconciliationJob, response: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        rows = response.pop("reconciliationResults", [])
+        # Written under temporary names and renamed, so readers never see a partial file
+        rows_path = self._path(job.job_id, ".results.jsonl")
+        with open(rows_path + ".tmp", "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+        os.replace(rows_path + ".tmp", rows_path)
+
+        header_path = self._path(job.job_id, ".json")
+        header = {"response": response, "resultCount": len(rows), "createdAt": job.created_at, "finishedAt": time.time()}
+        with open(header_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(header, f, default=str)
+        os.replace(header_path + ".tmp", header_path)
+
+    def _load_header(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(job_id, ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _job(self, job_id: str) -> Optional[ReconciliationJob]:
+        """
+        The job by ID - a job finished before a restart is restored from its stored result
+        """
+        if not job_id or not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        self.purge_expired()
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        header = self._load_header(job_id)
+        if header is None or time.time() - header["finishedAt"] > self.ttl_seconds:
+            return None
+        job = ReconciliationJob(job_id, 0, 0)
+        job.status = job.stage = "completed"
+        job.created_at = job.started_at = header["createdAt"]
+        job.finished_at = header["finishedAt"]
+        job.result_count = header["resultCount"]
+        job.left_records = job.records_scored = header["response"].get("summary", {}).get("leftFileRecords", 0)
+        with self._lock:
+            self._jobs[job_id] = job
+        return job
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._job(job_id)
+        return job.as_status(self.ttl_seconds) if job is not None else None
+
+    def result(self, job_id: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+        """
+        One page of a finished job's results (pages start at 1), its status while it runs, None when unknown
+        """
+        job = self._job(job_id)
+        if job is None:
+            return None
+        if job.status != "completed":
+            return {**job.as_status(self.ttl_seconds), "success": False, "message": f"Job is {job.status}"}
+        header = self._load_header(job_id)
+        if header is None:
+            return None
+
+        page = max(1, int(page))
+        page_size = min(max(1, int(page_size)), MAX_PAGE_SIZE)
+        start = (page - 1) * page_size
+        with open(self._path(job_id, ".results.jsonl"), encoding="utf-8") as f:
+            rows = [json.loads(line) for line in itertools.islice(f, start, start + page_size)]
+
+        total = header["resultCount"]
+        response = header["response"]
+        return {
+            **response,
+            "reconciliationResults": rows,
+            "pagination": {
+                "page": page,
+                "pageSize": page_size,
+                "totalResults": total,
+                "totalPages": (total + page_size - 1) // page_size,
+                "hasMore": start + len(rows) < total
+            },
+            "metadata": {**response.get("metadata", {}), "job": job.as_status(self.ttl_seconds)}
+        }
+
+    def purge_expired(self, force: bool = False) -> int:
+        """
+        Forget finished jobs older than the TTL and delete their stored results
+        """
+        now = time.time()
+        if not force and now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return 0
+        self._last_purge = now
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None and now > job.expires_at(self.ttl_seconds)]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+        removed = 0
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                job_id = name.split(".", 1)[0]
+                if job_id in self._jobs:
+                    continue
+                try:
+                    if now - os.path.getmtime(path) > self.ttl_seconds:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    continue
+        if expired or removed:
+            logger.info(f"🧹 Purged {len(expired)} expired jobs, {removed} stored files")
+        return len(expired)
+
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Reconciliation result cache with single-flight coalescing.
+
+Results are keyed by a canonical content hash of both documents, the
+matching rules and the engine version, so re-running an unchanged profile
+returns the stored response. Entries expire after a TTL and the least
+recently used entry is dropped when the cache is full. Identical requests
+that arrive while the first one is still computing wait for its result
+instead of computing it again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "true").lower() not in ("0", "false", "no", "off")
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "32"))
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get("RESULT_CACHE_TTL_SECONDS", "900"))
+
+
+def _update_digest(digest, records: Sequence[Any]) -> None:
+    table = getattr(records, "table", None)
+    if table is not None:
+        # Columnar documents hash their Arrow IPC encoding - no record dicts are built
+        import pyarrow
+        import pyarrow.ipc
+
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        digest.update(b"arrow\x1e")
+        digest.update(sink.getvalue())
+        return
+    digest.update(b"json\x1e")
+    for record in records:
+        digest.update(json.dumps(record, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+        digest.update(b"\x1e")
+
+
+def result_key(left_document: Sequence[Any], right_document: Sequence[Any], matching_rules: Any, engine_version: str) -> str:
+    """
+    Canonical SHA-256 of both documents (record order matters, key order does not), the rules and the engine version
+    """
+    digest = hashlib.sha256(f"engine:{engine_version}\x1d".encode("utf-8"))
+    digest.update(json.dumps(matching_rules or [], sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    for document in (left_document, right_document):
+        digest.update(b"\x1d")
+        _update_digest(digest, document)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    In-process LRU/TTL cache whose misses are computed once per key, however many callers ask
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, ttl_seconds: int = RESULT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: str, now: float) -> Optional[Tuple[float, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+        """
+        The cached value for key, or compute() run once for all concurrent callers; failures are not cached
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._lookup(key, now)
+            if entry is not None:
+                self.hits += 1
+                return entry[1], {"hit": True, "coalesced": False, "ageSeconds": round(now - entry[0], 3)}
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.info(f"🔗 Waiting for identical reconciliation {key[:12]} already in flight")
+            return future.result(), {"hit": False, "coalesced": True, "ageSeconds": 0.0}
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._store(key, value)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value, {"hit": False, "coalesced": False, "ageSeconds": 0.0}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hitRate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0
+        }
+
+
+result_cache = ResultCache()
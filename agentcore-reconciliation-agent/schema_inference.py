@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Automatic column-role inference for extracted documents.
+
+A sample of rows is tested column by column with vectorized value checks
+(parseable amounts, dates, integer-like identifiers, free text, low-cardinality
+labels) and combined with header-name hints to assign the roles the matching
+engine reads. Inferred roles are cached by the document's header signature, so
+repeat uploads of the same export format skip inference.
+"""
+
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from matching_engine import DEFAULT_COLUMNS, reconcile_records
+from normalization import column_values, normalize_amounts, normalize_dates, normalize_text
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_ROWS = 300
+MAX_CACHED_SIGNATURES = 256
+
+# Minimum combined score for a column to take a role
+MIN_ROLE_SCORE = 0.6
+NAME_HINT_WEIGHT = 0.5
+
+# Roles are assigned in this order - each column takes at most one role
+ROLE_ORDER = ("amount", "date", "id", "description", "month", "type")
+
+# A store ID column is only taken on a header hint - reference and check numbers
+# look the same, and a wrong ID column would hide Rest IDs kept in descriptions
+HINT_REQUIRED = {"id"}
+
+NAME_HINTS = {
+    "amount": re.compile(r'amount|amt|total|net|gross|payout|deposit|credit|debit|sales|value|price', re.IGNORECASE),
+    "date": re.compile(r'date|posted|posting|day|time', re.IGNORECASE),
+    "id": re.compile(r'rest(aurant)?\s*id|store|location|outlet|branch|site', re.IGNORECASE),
+    "description": re.compile(r'desc|memo|narrative|detail|payee|particular|reference|name', re.IGNORECASE),
+    "month": re.compile(r'month|period', re.IGNORECASE),
+    "type": re.compile(r'type|category|channel|kind|class', re.IGNORECASE)
+}
+
+MONTH_NAMES = re.compile(
+    r'^(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?(\s+\d{2,4})?$', re.IGNORECASE
+)
+
+_role_cache: Dict[Tuple[str, ...], Dict[str, Optional[str]]] = {}
+_cache_lock = threading.Lock()
+
+
+def header_signature(records: List[Dict[str, Any]]) -> Tuple[str, ...]:
+    """
+    Ordered tuple of the column names seen in the sampled records
+    """
+    seen = {}
+    for record in records[:SAMPLE_ROWS]:
+        for key in record:
+            seen.setdefault(key, None)
+    return tuple(str(key) for key in seen)
+
+
+def _value_scores(values: pd.Series) -> Dict[str, float]:
+    """
+    Share of the non-empty sample values that pass each role's value test
+    """
+    text = normalize_text(values)
+    present = text != ""
+    count = int(present.sum())
+    if count == 0:
+        return {role: 0.0 for role in ROLE_ORDER}
+
+    sample = values[present].reset_index(drop=True)
+    sample_text = text[present].reset_index(drop=True)
+    numeric = pd.to_numeric(sample.where(sample.map(type) != bool), errors='coerce')
+    is_number = numeric.notna()
+
+    # Numbers count as dates only through header hints - any integer would pass as an Excel serial
+    dates = normalize_dates(sample.where(~is_number)).notna()
+    amounts = normalize_amounts(sample).notna() & ~dates
+    decimal_like = sample_text.str.contains(r'[.,]\d{2}$|\$', regex=True) | (is_number & (numeric != numeric.round()))
+    integer_like = sample_text.str.fullmatch(r'#?\d{1,12}(\.0+)?')
+    letters = sample_text.str.count(r'[A-Za-z]')
+    distinct_ratio = sample_text.nunique() / count
+
+    return {
+        "amount": float((amounts & (decimal_like | is_number)).mean()) * (1.0 if decimal_like.any() else 0.7),
+        "date": float(dates.mean()),
+        "id": float(integer_like.mean()) * (0.8 if distinct_ratio < 1.0 or count < 2 else 0.6),
+        "description": float(((letters >= 3) & (sample_text.str.len() >= 8)).mean()) * min(1.0, 0.4 + distinct_ratio),
+        "month": float(sample_text.str.match(MONTH_NAMES).mean()),
+        "type": float((letters >= 2).mean()) * (1.0 if distinct_ratio <= 0.2 else 0.3)
+    }
+
+
+def infer_roles(records: List[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """
+    Assign a source column (or None) to every matcher role for a sample of records
+    """
+    sample = records[:SAMPLE_ROWS]
+    columns = header_signature(sample)
+    roles: Dict[str, Optional[str]] = {role: None for role in DEFAULT_COLUMNS}
+    taken = set()
+
+    # The canonical column names always keep their role
+    for role, default_column in DEFAULT_COLUMNS.items():
+        if default_column in columns:
+            roles[role] = default_column
+            taken.add(default_column)
+
+    scores = {}
+    for column in columns:
+        if column in taken:
+            continue
+        value_scores = _value_scores(column_values(sample, column))
+        scores[column] = {}
+        for role in ROLE_ORDER:
+            if NAME_HINTS[role].search(column):
+                scores[column][role] = value_scores[role] + NAME_HINT_WEIGHT
+            else:
+                scores[column][role] = 0.0 if role in HINT_REQUIRED else value_scores[role]
+
+    for role in ROLE_ORDER:
+        if roles[role] is not None:
+            continue
+        candidates = [(column_scores[role], column) for column, column_scores in scores.items() if column not in taken]
+        if not candidates:
+            continue
+        # Highest score wins, earlier columns win ties
+        best_score, best_column = max(candidates, key=lambda candidate: candidate[0])
+        if best_score >= MIN_ROLE_SCORE:
+            roles[role] = best_column
+            taken.add(best_column)
+
+    return roles
+
+
+def infer_columns(records: List[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """
+    Column roles for a document, cached by its header signature
+    """
+    signature = header_signature(records)
+    roles = _role_cache.get(signature)
+    if roles is None:
+        roles = infer_roles(records)
+        with _cache_lock:
+            if len(_role_cache) >= MAX_CACHED_SIGNATURES:
+                _role_cache.clear()
+            _role_cache[signature] = roles
+        logger.info(f"🧭 Inferred column roles for {len(signature)} columns: {roles}")
+    return dict(roles)
+
+
+def cached_signatures() -> int:
+    return len(_role_cache)
+
+
+def clear_role_cache() -> None:
+    with _cache_lock:
+        _role_cache.clear()
+
+
+def reconcile_documents(
+    left_document: List[Dict[str, Any]],
+    right_document: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], Dict[str, Optional[str]], Dict[str, Optional[str]]]:
+    """
+    Infer both documents' column roles and reconcile them - one picklable unit of work
+    """
+    left_columns = infer_columns(left_document)
+    right_columns = infer_columns(right_document)
+    return reconcile_records(left_document, right_document, left_columns, right_columns), left_columns, right_columns
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Vendor statement template registry.
+
+Each template carries precompiled fingerprint patterns for the first page of a
+statement and a set of layout-specific line parsers. The parsers of a template
+are merged into one alternation so a known statement is parsed in a single
+pass over its lines; unknown layouts fall back to the generic summary scan.
+"""
+
+import logging
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from normalization import amounts_from_strings
+
+logger = logging.getLogger(__name__)
+
+# Signed money amount: 1,234.56 / $1,234.56 / -$12.00 / ($12.00)
+AMOUNT = r'(?P<amount>\(?-?\s*\$?\s*\d{1,3}(?:,\d{3})*\.\d{2}\)?)'
+COUNT = r'(?P<count>\d+)'
+
+
+class StatementTemplate:
+    """
+    A known statement layout - fingerprints decide whether it applies,
+    line parsers turn its summary lines into records
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fingerprints: Sequence[str],
+        line_parsers: Sequence[Tuple[str, str]],
+        min_fingerprints: int = 1,
+        statement_date: Optional[str] = None
+    ):
+        self.name = name
+        self.fingerprints = [re.compile(pattern, re.IGNORECASE) for pattern in fingerprints]
+        self.min_fingerprints = min_fingerprints
+        self.descriptions = [description for description, _ in line_parsers]
+        self.statement_date = re.compile(statement_date, re.IGNORECASE) if statement_date else None
+
+        alternatives = []
+        for idx, (_, pattern) in enumerate(line_parsers):
+            pattern = pattern.replace('(?P<amount>', f'(?P<amount_{idx}>').replace('(?P<count>', f'(?P<count_{idx}>')
+            alternatives.append(f'(?P<rule_{idx}>{pattern})')
+        self.line_pattern = re.compile('|'.join(alternatives), re.IGNORECASE)
+
+    def fingerprint_score(self, first_page_text: str) -> int:
+        return sum(1 for pattern in self.fingerprints if pattern.search(first_page_text))
+
+    def _statement_date(self, text: str) -> str:
+        if self.statement_date:
+            match = self.statement_date.search(text)
+            if match:
+                return match.group('date')
+        # Summary docs don't have transaction dates - use current date as placeholder
+        return datetime.now().strftime("%m/%d/%Y")
+
+    def parse(self, lines: List[str], first_page_text: str = "") -> List[Dict]:
+        """
+        Parse the statement's summary lines in a single pass
+        """
+        statement_date = self._statement_date(first_page_text)
+        extracted_data = []
+
+        for line_num, line in enumerate(lines):
+            line = line.strip()
+            if not line:
+                continue
+
+            match = self.line_pattern.search(line)
+            if not match:
+                continue
+
+            idx = int(match.lastgroup.split('_')[1])
+            description = self.descriptions[idx]
+
+            count = match.groupdict().get(f'count_{idx}')
+            if count:
+                description = f"{description}: {count} orders"
+
+            extracted_data.append({
+                "Date": statement_date,
+                "Amount": match.group(f'amount_{idx}'),
+                "Description": description,
+                "LineNumber": line_num + 1,
+                "SourceLine": line,
+                "Type": "Summary"
+            })
+
+        # Accounting negatives "($12.00)" and "-$12.00" are handled by the normalization stage
+        amounts = amounts_from_strings([record["Amount"] for record in extracted_data])
+        for record, amount in zip(extracted_data, amounts):
+            record["Amount"] = float(amount)
+        extracted_data = [record for record in extracted_data if record["Amount"] == record["Amount"]]
+
+        logger.info(f"📊 {self.name} template parsed {len(extracted_data)} summary items")
+        return extracted_data
+
+
+TEMPLATE_REGISTRY: List[StatementTemplate] = []
+
+
+def register_template(template: StatementTemplate) -> StatementTemplate:
+    """
+    Add a template to the registry - earlier templates win fingerprint ties
+    """
+    TEMPLATE_REGISTRY.append(template)
+    return template
+
+
+def detect_template(first_page_text: str) -> Optional[StatementTemplate]:
+    """
+    Pick the registered template whose fingerprints best match the first page
+    """
+    if not first_page_text:
+        return None
+
+    best_template = None
+    best_score = 0
+    for template in TEMPLATE_REGISTRY:
+        score = template.fingerprint_score(first_page_text)
+        if score >= template.min_fingerprints and score > best_score:
+            best_template = template
+            best_score = score
+
+    if best_template:
+        logger.info(f"🧾 Statement fingerprinted as {best_template.name} ({best_score} markers)")
+    return best_template
+
+
+register_template(StatementTemplate(
+    name="DoorDash",
+    fingerprints=[r'doordash', r'merchant\s+(?:portal|statement)', r'marketplace orders', r'total payout'],
+    min_fingerprints=2,
+    statement_date=r'(?:payout date|statement date)[:\s]+(?P<date>\d{1,2}/\d{1,2}/\d{2,4})',
+    line_parsers=[
+        ("Marketplace Orders", COUNT + r'\s*Marketplace orders\s+' + AMOUNT),
+        ("Partner Orders", COUNT + r'\s*Partner orders\s+' + AMOUNT),
+        ("Subtotal", r'^Subtotal\s+' + AMOUNT),
+        ("Commission", r'^Commission\b.*?' + AMOUNT),
+        ("Marketing Fees", r'^Marketing fees?\b.*?' + AMOUNT),
+        ("Error Charges", r'^Error charges\b.*?' + AMOUNT),
+        ("Adjustments", r'^Adjustments\b.*?' + AMOUNT),
+        ("Tax Amount", r'taxes.*?' + AMOUNT),
+        ("Direct Payment", r'Paid directly.*?' + AMOUNT),
+        ("Total Payout", r'Total (?:payout|payments)\b.*?' + AMOUNT),
+    ]
+))
+
+register_template(StatementTemplate(
+    name="Uber Eats",
+    fingerprints=[r'uber\s*eats', r'uber technologies|uber\.com', r'marketplace fee', r'total payout'],
+    min_fingerprints=2,
+    statement_date=r'(?:payout date|statement period)[:\s]+(?P<date>\d{1,2}/\d{1,2}/\d{2,4})',
+    line_parsers=[
+        ("Sales", r'^Sales \(excl\.? tax\)\s+' + AMOUNT),
+        ("Tax on Sales", r'^Tax on sales\s+' + AMOUNT),
+        ("Marketplace Fee", r'^Marketplace fee\b.*?' + AMOUNT),
+        ("Delivery Network Fee", r'^Delivery network fee\b.*?' + AMOUNT),
+        ("Refunds", r'^(?:Refunds|Customer refunds)\b.*?' + AMOUNT),
+        ("Order Summary", COUNT + r'\s*(?:orders|trips)\b.*?' + AMOUNT),
+        ("Total Payout", r'^Total payout\b.*?' + AMOUNT),
+    ]
+))
+
+register_template(StatementTemplate(
+    name="Grubhub",
+    fingerprints=[r'grubhub', r'seamless', r'net deposit|total deposit', r'processing fee'],
+    min_fingerprints=2,
+    statement_date=r'(?:deposit date|statement date)[:\s]+(?P<date>\d{1,2}/\d{1,2}/\d{2,4})',
+    line_parsers=[
+        ("Food and Beverage", r'^Food (?:&|and) beverage\s+' + AMOUNT),
+        ("Sales Tax", r'^Sales tax\s+' + AMOUNT),
+        ("Commission", r'^(?:Marketing|Delivery)? ?commission\b.*?' + AMOUNT),
+        ("Processing Fee", r'^Processing fee\b.*?' + AMOUNT),
+        ("Order Summary", COUNT + r'\s*orders\b.*?' + AMOUNT),
+        ("Net Deposit", r'^(?:Net|Total) deposit\b.*?' + AMOUNT),
+    ]
+))
+
+register_template(StatementTemplate(
+    name="Bank Statement",
+    fingerprints=[r'beginning balance', r'ending balance', r'account number', r'deposits and (?:other )?(?:additions|credits)'],
+    min_fingerprints=2,
+    statement_date=r'through\s+(?P<date>\d{1,2}/\d{1,2}/\d{2,4})',
+    line_parsers=[
+        ("Beginning Balance", r'^Beginning balance\b.*?' + AMOUNT),
+        ("Deposits and Additions", r'^Deposits and (?:other )?(?:additions|credits)\b.*?' + AMOUNT),
+        ("Checks Paid", r'^Checks paid\b.*?' + AMOUNT),
+        ("Electronic Withdrawals", r'^(?:Electronic|Other) withdrawals\b.*?' + AMOUNT),
+        ("Fees", r'^(?:Service )?fees\b.*?' + AMOUNT),
+        ("Ending Balance", r'^Ending balance\b.*?' + AMOUNT),
+    ]
+))
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Bedrock agent - answers prompts after a simulated
+latency so chunking and concurrency can be exercised without AWS.
+"""
+
+import re
+import threading
+import time
+
+# Row ids in any prompt encoding ("left-3" in a JSON field or a table cell)
+RECORD_ID = re.compile(r'(?<![\w-])((left|right)-\d+)(?!\d)')
+
+
+class StubModel:
+    """
+    Callable model stub. Latency is base_latency plus seconds_per_1k_tokens
+    per thousand prompt tokens (4 characters per token).
+    """
+
+    model_id = "local-stub"
+
+    def __init__(self, base_latency: float = 0.05, seconds_per_1k_tokens: float = 0.0):
+        self.base_latency = base_latency
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str) -> str:
+        tokens = len(prompt) // 4
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += tokens
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(self.base_latency + self.seconds_per_1k_tokens * tokens / 1000.0)
+            sides = [row_id.split('-')[0] for row_id in {match.group(1) for match in RECORD_ID.finditer(prompt)}]
+            return (
+                f"Stub analysis: reviewed {sides.count('left')} left and {sides.count('right')} right records. "
+                "No model was called."
+            )
+        finally:
+            with self._lock:
+                self.in_flight -= 1
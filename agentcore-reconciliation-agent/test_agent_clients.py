@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared, lazily built Bedrock agent clients
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+from agent_clients import AgentClientFactory
+
+
+def test_client_is_built_once_and_shared_by_agents():
+    factory = AgentClientFactory(model_id="test-model", system_prompt="Reconcile.", region_name="us-east-1")
+    assert factory.is_warm is False
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        models = list(executor.map(lambda _: factory.model(), range(16)))
+
+    assert all(model is models[0] for model in models)
+    first, second = factory.create_agent(), factory.create_agent()
+    assert first is not second
+    assert first.model is second.model
+    assert factory.client is first.model.client
+    assert factory.client.meta.config.max_pool_connections == factory.max_pool_connections
+    assert first.system_prompt == "Reconcile."
+
+
+def test_background_prewarm_runs_once():
+    factory = AgentClientFactory(model_id="test-model", region_name="us-east-1")
+
+    factory.prewarm_in_background()
+    thread = factory._prewarm_thread
+    factory.prewarm_in_background()
+    thread.join(timeout=30)
+
+    assert factory._prewarm_thread is thread
+    assert factory.is_warm
+    assert factory.stats()["warmupSeconds"] is not None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
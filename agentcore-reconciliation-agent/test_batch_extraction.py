@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent batch extraction
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+from batch_extraction import MAX_WORKERS_LIMIT, batch_extract, concurrency_setting, iter_batch_extract
+from work_queue import WorkQueue
+
+BANK_STATEMENT_PATH = os.path.join(
+    os.path.dirname(__file__), '..', 'server', 'src', 'assets', 'Bankstatement_pos.xlsx'
+)
+
+CSV_CONTENT = b"Date,Amount,Rest ID\n2024-01-01,10.50,1023\n2024-01-02,20.00,1024\n"
+
+
+def fake_downloader(document_url):
+    if document_url == "memory://bank.xlsx":
+        with open(BANK_STATEMENT_PATH, 'rb') as f:
+            return f.read()
+    if document_url == "memory://pos.csv":
+        return CSV_CONTENT
+    if document_url == "memory://notes.txt":
+        return b"plain text"
+    raise ConnectionError(f"404 for {document_url}")
+
+
+DOCUMENTS = [
+    {"documentUrl": "memory://bank.xlsx", "documentName": "Bankstatement_pos.xlsx",
+     "extractionRules": [{"terms": ["Posting Date", "Amount"]}]},
+    {"document_url": "memory://pos.csv", "document_name": "pos.csv"},
+    {"documentUrl": "memory://missing.pdf", "documentName": "missing.pdf"},
+    {"documentUrl": "memory://notes.txt", "documentName": "notes.txt"},
+    {"documentName": "no_url.xlsx"},
+]
+
+
+def test_batch_results_are_isolated_per_document():
+    result = batch_extract(DOCUMENTS, {"profileName": "Batch"}, max_downloads=2, max_workers=2,
+                           downloader=fake_downloader)
+
+    results = result["results"]
+    assert [item["index"] for item in results] == [0, 1, 2, 3, 4]
+    assert [item["success"] for item in results] == [True, True, False, False, False]
+
+    assert len(results[0]["extractedData"]) == 21
+    assert set(results[0]["extractedData"][0]) == {"Posting Date", "Amount"}
+    assert results[1]["extractedData"][0] == {"Date": "2024-01-01", "Amount": "10.50", "Rest ID": "1023"}
+    assert results[1]["metadata"]["profileContext"] == {"profileName": "Batch"}
+    assert "Download failed" in results[2]["message"]
+    assert "Unsupported file type" in results[3]["message"]
+    assert results[4]["message"] == "No document URL provided"
+
+    assert result["metadata"]["documentsSucceeded"] == 2
+    assert result["metadata"]["documentsFailed"] == 3
+
+
+def test_results_stream_as_documents_complete():
+    items = iter_batch_extract(DOCUMENTS[:3], max_downloads=1, max_workers=1, downloader=fake_downloader)
+
+    first = next(items)
+    remaining = list(items)
+
+    assert first["documentName"] in {"Bankstatement_pos.xlsx", "pos.csv", "missing.pdf"}
+    assert sorted(item["index"] for item in [first] + remaining) == [0, 1, 2]
+
+
+def test_parsing_is_admitted_to_the_shared_work_queue():
+    queue = WorkQueue(max_workers=1, max_queued=0, executor="thread")
+    try:
+        admitted = batch_extract(DOCUMENTS[:2], downloader=fake_downloader, queue=queue)
+        # Every worker taken by other requests and no waiting room
+        queue.active = queue.max_workers
+        busy = batch_extract(DOCUMENTS[:2], downloader=fake_downloader, queue=queue)
+    finally:
+        queue.active = 0
+        queue.shutdown()
+
+    assert admitted["success"] and queue.completed == 2
+    assert queue.rejected == 2
+    assert all("Server busy" in item["message"] for item in busy["results"])
+
+
+def test_urls_are_fetched_with_the_reference_checks():
+    queue = WorkQueue(executor="thread")
+    try:
+        result = batch_extract([
+            {"documentUrl": "http://169.254.169.254/latest/meta-data/report.csv", "documentName": "report.csv"},
+            {"documentUrl": "file:///etc/passwd", "documentName": "passwd.csv"},
+            {"documentUrl": "http://127.0.0.1:8080/report.csv", "documentName": "report.csv"}
+        ], queue=queue)
+    finally:
+        queue.shutdown()
+
+    assert [item["success"] for item in result["results"]] == [False, False, False]
+    assert all(item["message"].startswith("Download failed") for item in result["results"])
+    assert queue.completed == 0
+
+
+def test_concurrency_overrides_are_validated_and_clamped():
+    assert concurrency_setting(None, 4, 16, "max_workers") == 4
+    assert concurrency_setting(2, 4, 16, "max_workers") == 2
+    assert concurrency_setting(10_000, 4, 16, "max_workers") == 16
+    for invalid in (0, -3, "8", 2.5, True):
+        with pytest.raises(ValueError):
+            concurrency_setting(invalid, 4, 16, "max_workers")
+
+
+def test_local_batch_endpoint_rejects_and_clamps_concurrency(monkeypatch):
+    pytest.importorskip("flask")
+    import local_agent
+
+    calls = []
+    monkeypatch.setattr(local_agent, "iter_batch_extract", lambda *args, **kwargs: calls.append(kwargs) or iter([]))
+    client = local_agent.app.test_client()
+
+    rejected = client.post("/extract/batch", json={"documents": DOCUMENTS, "max_workers": "all"})
+    accepted = client.post("/extract/batch", json={"documents": DOCUMENTS, "max_workers": 10_000, "max_downloads": 2})
+    accepted.get_data()
+
+    assert rejected.status_code == 400 and "max_workers" in rejected.get_json()["message"]
+    assert accepted.status_code == 200
+    assert calls == [{"max_downloads": 2, "max_workers": MAX_WORKERS_LIMIT}]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for batch reconciliation across the document pairs of a matching rule
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+import batch_reconciliation
+import document_refs
+from batch_reconciliation import parse_pairs, reconcile_document_pairs
+from document_refs import DocumentReferenceError
+from schema_inference import reconcile_documents
+from work_queue import WorkQueue
+
+OUTLETS = {
+    f"sales-{store}": [{"Rest ID": store, "Amount": 10.5 + i, "Month": "December"} for i in range(10)]
+    for store in (101, 102, 103)
+}
+BANK = [{"Amount": 10.5 + i, "Description": f"UBER EATS #{101 + i % 3}"} for i in range(30)]
+DOCUMENTS = {**OUTLETS, "bank": BANK}
+PAIRS = [[outlet, "bank"] for outlet in OUTLETS]
+
+
+def test_pairs_are_validated():
+    assert parse_pairs(PAIRS, list(DOCUMENTS)) == [(outlet, "bank") for outlet in OUTLETS]
+    for invalid in ([], [["sales-101"]], [["sales-101", "missing"]], "sales-101"):
+        with pytest.raises(DocumentReferenceError):
+            parse_pairs(invalid, list(DOCUMENTS))
+
+
+def test_shared_documents_are_prepared_once(monkeypatch):
+    prepared = []
+
+    class CountingDocument(batch_reconciliation.PreparedDocument):
+        def __init__(self, records, *args, **kwargs):
+            prepared.append(len(records))
+            super().__init__(records, *args, **kwargs)
+
+    monkeypatch.setattr(batch_reconciliation, "PreparedDocument", CountingDocument)
+    queue = WorkQueue(max_workers=2, executor="thread")
+    try:
+        pair_results, stats = reconcile_document_pairs(DOCUMENTS, parse_pairs(PAIRS, list(DOCUMENTS)), queue)
+    finally:
+        queue.shutdown()
+
+    assert len(prepared) == 4
+    assert stats["distinctDocuments"] == 4 and stats["pairs"] == 3
+    for (left_id, right_id), pair in zip(PAIRS, pair_results):
+        assert (pair["leftDocumentId"], pair["rightDocumentId"]) == (left_id, right_id)
+        assert (pair["results"], pair["leftColumns"], pair["rightColumns"]) == reconcile_documents(DOCUMENTS[left_id], BANK)
+
+
+def test_prepared_documents_cross_to_worker_processes():
+    queue = WorkQueue(max_workers=2, executor="process")
+    try:
+        pair_results, _ = reconcile_document_pairs(DOCUMENTS, parse_pairs(PAIRS[:2], list(DOCUMENTS)), queue)
+    finally:
+        queue.shutdown()
+
+    assert pair_results[1]["results"] == reconcile_documents(DOCUMENTS["sales-102"], BANK)[0]
+
+
+def test_entrypoint_loads_each_reference_once(tmp_path, monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent
+    import work_queue
+
+    monkeypatch.setattr(work_queue, "_work_queue", WorkQueue(executor="thread"))
+    monkeypatch.setattr(document_refs, "DOCUMENT_FILE_ROOT", str(tmp_path))
+    loads = []
+    load_document = document_refs.load_document
+    monkeypatch.setattr(document_refs, "load_document", lambda document, *args: loads.append(document) or load_document(document, None))
+    (tmp_path / "bank.json").write_text(json.dumps(BANK))
+    client = TestClient(agent.app)
+
+    response = client.post("/invocations", json={
+        "operation": "reconcile_batch",
+        "documents": {**OUTLETS, "bank": f"file://{tmp_path / 'bank.json'}", "unused": "file:///nonexistent.json"},
+        "documentPairs": PAIRS
+    }).json()
+    unknown = client.post("/invocations", json={"operation": "reconcile_batch", "documents": OUTLETS, "documentPairs": PAIRS})
+
+    assert [pair["leftDocumentId"] for pair in response["pairs"]] == list(OUTLETS)
+    assert response["pairs"][0]["reconciliationResults"] == reconcile_documents(OUTLETS["sales-101"], BANK)[0]
+    assert response["summary"]["pairs"] == 3
+    assert response["metadata"]["documentSources"]["bank"]["format"] == "json"
+    assert loads.count(f"file://{tmp_path / 'bank.json'}") == 1
+    assert unknown.status_code == 400
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for N-way (POS -> gateway -> bank) reconciliation
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+from chain_reconciliation import parse_sources, reconcile_chain
+from document_refs import DocumentReferenceError
+from work_queue import WorkQueue
+
+POS = [{"Rest ID": 101 + i % 3, "Amount": 20.0 + i * 10, "Month": "December"} for i in range(5)] + \
+    [{"Rest ID": 999, "Amount": 500.0, "Month": "December"}]
+# The gateway never saw POS sale 5, and the bank never received gateway payment 4
+GATEWAY = [{"Amount": 20.0 + i * 10, "Description": f"UBER EATS #{101 + i % 3}"} for i in range(5)]
+BANK = [{"Amount": 20.0 + i * 10, "Description": f"DEPOSIT UBER EATS #{101 + i % 3}"} for i in range(4)] + \
+    [{"Amount": 999.0, "Description": "WIRE TRANSFER"}]
+
+
+@pytest.fixture
+def work_queue():
+    queue = WorkQueue(max_workers=2, executor="thread")
+    yield queue
+    queue.shutdown()
+
+
+def test_chains_and_hop_breaks(work_queue):
+    result = reconcile_chain({"pos": POS, "gateway": GATEWAY, "bank": BANK}, work_queue)
+    chains = {chain["transactions"][0]["transaction"]["id"]: chain for chain in result["chains"]}
+
+    complete = chains["pos-0"]
+    assert complete["isComplete"] and complete["brokenAt"] is None
+    assert [link["transaction"]["id"] for link in complete["transactions"]] == ["pos-0", "gateway-0", "bank-0"]
+    assert [hop["hop"] for hop in complete["hops"]] == ["pos->gateway", "gateway->bank"]
+
+    assert chains["pos-4"]["brokenAt"] == "gateway->bank"
+    assert [link["source"] for link in chains["pos-4"]["transactions"]] == ["pos", "gateway"]
+    assert chains["pos-5"]["brokenAt"] == "pos->gateway" and len(chains["pos-5"]["transactions"]) == 1
+    # A bank record nothing upstream matched starts its own chain
+    assert chains["bank-4"]["startsAt"] == "bank" and chains["bank-4"]["brokenAt"] == "gateway->bank"
+
+    pos_hop, bank_hop = result["hops"]
+    assert pos_hop["unmatchedUpstream"] == ["pos-5"] and pos_hop["unmatchedDownstream"] == []
+    assert bank_hop["unmatchedUpstream"] == ["gateway-4"] and bank_hop["unmatchedDownstream"] == ["bank-4"]
+    assert result["summary"]["completeChains"] == 4 and result["summary"]["totalChains"] == 7
+
+
+def test_sources_are_validated():
+    assert parse_sources([{"document": POS}, {"name": "bank", "document": BANK}]) == [("source1", POS), ("bank", BANK)]
+    for invalid in (None, [{"document": POS}], [{"name": "a", "document": POS}, {"name": "a", "document": BANK}], [{"name": "a"}, {}]):
+        with pytest.raises(DocumentReferenceError):
+            parse_sources(invalid)
+
+
+def test_entrypoint_reconcile_chain(monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent
+    import work_queue
+
+    monkeypatch.setattr(work_queue, "_work_queue", WorkQueue(executor="thread"))
+    client = TestClient(agent.app)
+
+    response = client.post("/invocations", json={
+        "operation": "reconcile_chain",
+        "sources": [{"name": "pos", "document": POS}, {"name": "gateway", "document": GATEWAY}, {"name": "bank", "document": BANK}]
+    })
+
+    assert response.status_code == 200
+    assert response.json()["summary"]["sources"] == ["pos", "gateway", "bank"]
+    assert response.json()["metadata"]["columnRoles"]["pos"]["id"] == "Rest ID"
+    assert client.post("/invocations", json={"operation": "reconcile_chain", "sources": []}).status_code == 400
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for token-budgeted chunk planning and bounded-concurrency LLM calls
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+from chunked_prompting import MAX_CONCURRENCY_LIMIT, MIN_TOKEN_BUDGET, analyze_in_chunks, blocking_keys, build_chunk_prompt, plan_chunks
+from prompt_encoding import encode_rows, estimate_tokens
+from stub_model import StubModel
+
+SALES = [{"Rest ID": 100 + i % 20, "Amount": 50.0 + i, "Month": "December"} for i in range(200)]
+PAYMENTS = [{"Amount": 50.0 + i, "Description": f"ACH CREDIT UBER EATS #{100 + i % 20}", "Date": "12/05/2024"} for i in range(200)]
+
+
+def test_blocking_keys_use_ids_then_store_numbers_then_month():
+    assert blocking_keys([{"Rest ID": 1023.0}, {"Rest ID": "", "Month": "December"}]) == ["id:1023", "month:december"]
+    assert blocking_keys([{"Description": "UBER EATS #77"}, {"Description": "WIRE"}]) == ["id:77", ""]
+
+
+def test_chunks_fit_budget_and_keep_stores_together():
+    chunks = plan_chunks(SALES, PAYMENTS, token_budget=2000)
+
+    assert len(chunks) > 1
+    assert all(chunk.estimated_tokens <= 2000 for chunk in chunks)
+    assert sorted(i for chunk in chunks for i in chunk.left_indices) == list(range(len(SALES)))
+    assert sorted(i for chunk in chunks for i in chunk.right_indices) == list(range(len(PAYMENTS)))
+
+    # Each store lands in a single chunk, with both its sales and its payments
+    for chunk in chunks:
+        stores = {SALES[i]["Rest ID"] for i in chunk.left_indices}
+        assert stores == {int(PAYMENTS[i]["Description"].split("#")[1]) for i in chunk.right_indices}
+    assert sum(len(chunk.keys) for chunk in chunks) == 20
+
+
+def test_prompt_is_a_compact_table():
+    chunk = plan_chunks(SALES[:2], PAYMENTS[:2])[0]
+    prompt = build_chunk_prompt(chunk, 1, 1, SALES[:2], PAYMENTS[:2])
+
+    assert "id\tRest ID\tAmount\tMonth\nleft-0\t100\t50\tDecember\nleft-1\t101\t51\tDecember" in prompt
+    assert "right-1\t51\tACH CREDIT UBER EATS #101\t12/05/2024" in prompt
+    assert estimate_tokens(prompt) < 250
+
+
+def test_encodings_are_reported_and_tsv_is_smallest():
+    _, stats = analyze_in_chunks(SALES, PAYMENTS, lambda: StubModel(base_latency=0))
+    tokens = stats["tokensByEncoding"]
+
+    assert stats["promptEncoding"] == "tsv"
+    assert tokens["tsv"] < tokens["jsonl"] < tokens["json"]
+    assert tokens["tsv"] * 2 < tokens["json"]
+
+
+def test_encoding_report_is_estimated_from_a_sample(monkeypatch):
+    import prompt_encoding
+
+    rows = [(f"left-{i}", {"Rest ID": 100 + i % 7, "Amount": 10.25 + i, "Month": "December"}) for i in range(2000)]
+    exact = prompt_encoding.encoding_report(rows, sample_rows=len(rows))
+    encoded = []
+    encode_rows = prompt_encoding.encode_rows
+    monkeypatch.setattr(prompt_encoding, "encode_rows", lambda sample, encoding: encoded.append(len(sample)) or encode_rows(sample, encoding))
+
+    estimate = prompt_encoding.encoding_report(rows, sample_rows=50)
+
+    assert encoded == [50] * len(prompt_encoding.ENCODINGS)
+    assert all(abs(estimate[encoding] - exact[encoding]) < exact[encoding] * 0.1 for encoding in exact)
+
+
+def test_compact_values_drop_empty_columns():
+    table = encode_rows([("left-0", {"Amount": 12.499999, "Note": "", "Tax": None}), ("left-1", {"Amount": 3.0, "Note": "a\tb"})])
+
+    assert table == "id\tAmount\tNote\nleft-0\t12.5\t\nleft-1\t3\ta b"
+    assert encode_rows([("left-0", {"Memo": "a, b"})], "csv") == 'id,Memo\nleft-0,"a, b"'
+
+
+def test_chunks_run_concurrently_with_a_bound():
+    model = StubModel(base_latency=0.05)
+
+    analysis, stats = analyze_in_chunks(SALES, PAYMENTS, lambda: model, token_budget=600, max_concurrency=3)
+
+    assert model.calls == stats["chunks"] > 3
+    assert model.peak_in_flight == 3
+    assert analysis.count("## Chunk ") == stats["chunks"]
+    assert "reviewed 20 left and 20 right records" in analysis
+
+
+def test_profile_overrides_are_clamped_and_invalid_ones_rejected():
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent_no_fallbacks
+
+    settings = agent_no_fallbacks.llm_settings({"maxConcurrency": 10_000, "chunkTokenBudget": 1, "promptEncoding": "csv"})
+    client = TestClient(agent_no_fallbacks.app)
+    rejected = [
+        client.post("/invocations", json={"leftDocument": SALES[:2], "rightDocument": [], "profileContext": profile})
+        for profile in ({"maxConcurrency": "lots"}, {"topK": 0}, {"chunkTokenBudget": 2.5}, {"promptEncoding": "yaml"})
+    ]
+
+    assert settings["max_concurrency"] == MAX_CONCURRENCY_LIMIT
+    assert settings["token_budget"] == MIN_TOKEN_BUDGET
+    assert settings["encoding"] == "csv"
+    assert [response.status_code for response in rejected] == [400] * 4
+    assert "maxConcurrency" in rejected[0].json()["message"] and "promptEncoding" in rejected[3].json()["message"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for Arrow IPC / Parquet reconciliation documents
+"""
+
+import base64
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+pa = pytest.importorskip("pyarrow")
+
+from columnar import RecordTable, decode_columnar, write_table
+from document_refs import load_document
+from matching_engine import PreparedDocument, reconcile_records
+from schema_inference import infer_columns, reconcile_documents
+from work_queue import WorkQueue
+
+SALES = [{"Rest ID": 100 + i % 5, "Amount": 10.5 + i, "Month": "December", "Date": f"2024-12-{1 + i % 28:02d}"} for i in range(40)]
+PAYMENTS = [{"Amount": 10.5 + i, "Description": f"UBER EATS #{100 + i % 5}"} for i in range(40)]
+
+
+@pytest.mark.parametrize("file_format", ["arrow", "parquet"])
+def test_columnar_documents_reconcile_like_json(file_format):
+    sales = decode_columnar(write_table(SALES, file_format), file_format)
+    payments = decode_columnar(write_table(PAYMENTS, file_format), file_format)
+
+    assert len(sales) == 40 and sales[3] == SALES[3] and sales[-1] == SALES[-1]
+    assert infer_columns(sales) == infer_columns(SALES)
+    assert reconcile_records(sales, payments, infer_columns(sales), infer_columns(payments)) == \
+        reconcile_records(SALES, PAYMENTS, infer_columns(SALES), infer_columns(PAYMENTS))
+
+
+def test_columns_are_read_without_building_records():
+    table = pa.table({
+        "Rest ID": pa.array([101, 102], pa.int64()),
+        "Amount": pa.array([12.5, 7.0]),
+        "Date": pa.array([date(2024, 12, 1), None], pa.date32())
+    })
+    records = RecordTable(table)
+
+    prepared = PreparedDocument(records, {"amount": "Amount", "date": "Date", "id": "Rest ID"})
+
+    assert records._rows is None
+    assert prepared.amount_cents.tolist() == [1250, 700]
+    assert prepared.date_ordinals.tolist() == [date(2024, 12, 1).toordinal(), 0]
+    assert prepared.ids.tolist() == ["101", "102"]
+    assert np.shares_memory(records.column_series("Amount").to_numpy(), table.column("Amount").chunk(0).to_numpy())
+    # Rows hold JSON-friendly values
+    assert records[0]["Date"] == "2024-12-01"
+
+
+def test_inline_base64_document():
+    data = base64.b64encode(write_table(SALES, "parquet")).decode("ascii")
+
+    records, info = load_document({"data": data, "format": "parquet"}, cache=None)
+
+    assert isinstance(records, RecordTable)
+    assert records.to_records() == SALES
+    assert info["source"] == "inline:base64" and info["format"] == "parquet"
+
+
+def test_tables_cross_to_worker_processes():
+    sales = decode_columnar(write_table(SALES, "arrow"), "arrow")
+    queue = WorkQueue(max_workers=1, executor="process")
+    try:
+        results, _, _ = queue.run(reconcile_documents, sales[:20], PAYMENTS)
+    finally:
+        queue.shutdown()
+
+    assert results == reconcile_documents(SALES[:20], PAYMENTS)[0]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for gzip/zstd request and response compression
+"""
+
+import gzip
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+import compression
+from compression import choose_encoding, compress, decode_request_body, supported_encodings
+
+SALES = [{"Rest ID": 100 + i % 5, "Amount": 10.5 + i, "Month": "December"} for i in range(60)]
+PAYMENTS = [{"Amount": 10.5 + i, "Description": f"UBER EATS #{100 + i % 5}"} for i in range(60)]
+PAYLOAD = json.dumps({"leftDocument": SALES, "rightDocument": PAYMENTS}).encode("utf-8")
+
+
+def test_accept_encoding_negotiation(monkeypatch):
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("") is None
+    monkeypatch.setattr(compression, "_zstd", lambda: None)
+    assert supported_encodings() == ["gzip"]
+    assert choose_encoding("zstd, gzip") == "gzip"
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_request_bodies_are_detected_by_header_or_magic_bytes(encoding):
+    if encoding not in supported_encodings():
+        pytest.skip("zstandard is not installed")
+    body = compress(PAYLOAD, encoding)
+
+    by_header, stats = decode_request_body(body, encoding)
+    by_magic, _ = decode_request_body(body, None)
+
+    assert by_header == by_magic == PAYLOAD
+    assert stats["encoding"] == encoding and stats["ratio"] > 5
+    assert decode_request_body(PAYLOAD, None) == (PAYLOAD, None)
+
+
+def test_entrypoint_decodes_requests_and_compresses_responses(monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent
+    import work_queue
+
+    monkeypatch.setattr(work_queue, "_work_queue", work_queue.WorkQueue(executor="thread"))
+    client = TestClient(agent.app)
+
+    plain = client.post("/invocations", content=PAYLOAD, headers={"Content-Type": "application/json", "Accept-Encoding": "identity"})
+    compressed = client.post(
+        "/invocations",
+        content=gzip.compress(PAYLOAD),
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip", "Accept-Encoding": "gzip"}
+    )
+
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert float(compressed.headers["x-compression-ratio"]) > 5
+    assert int(compressed.headers["x-uncompressed-length"]) == len(compressed.content)
+    assert compressed.json()["reconciliationResults"] == plain.json()["reconciliationResults"]
+    request_stats = compressed.json()["metadata"]["compression"]["request"]
+    assert request_stats["encoding"] == "gzip" and request_stats["bytes"] == len(PAYLOAD)
+    assert plain.json()["metadata"]["compression"]["request"] is None
+
+    corrupt = client.post("/invocations", content=b"\x1f\x8bnot gzip", headers={"Content-Type": "application/json"})
+    assert corrupt.status_code == 415
+
+    # Streams are never buffered for compression
+    streamed = client.post("/invocations", json={"operation": "batch_extract", "documents": []}, headers={"Accept-Encoding": "gzip"})
+    assert streamed.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in streamed.headers
+
+
+def test_flask_agent_decodes_requests_and_compresses_responses(monkeypatch):
+    pytest.importorskip("flask")
+    import local_agent
+
+    monkeypatch.setattr(compression, "COMPRESSION_MIN_BYTES", 0)
+    client = local_agent.app.test_client()
+
+    response = client.post(
+        "/extract",
+        data=gzip.compress(json.dumps({"document_name": "statement.pdf"}).encode("utf-8")),
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip", "Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 400
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data))["message"] == "No document URL provided"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Tests for reconciliation documents passed by reference
+"""
+
+import functools
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+import document_refs
+from document_refs import DocumentCache, DocumentReferenceError, load_document, resolve_documents
+
+SALES = [{"Rest ID": 100 + i % 5, "Amount": 10.5 + i, "Month": "December"} for i in range(20)]
+PAYMENTS = [{"Amount": 10.5 + i, "Description": f"UBER EATS #{100 + i % 5}"} for i in range(20)]
+
+
+@pytest.fixture
+def documents(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_refs, "DOCUMENT_FILE_ROOT", str(tmp_path))
+    (tmp_path / "sales.json").write_text(json.dumps(SALES))
+    (tmp_path / "payments.jsonl").write_text("\n".join(json.dumps(record) for record in PAYMENTS))
+    (tmp_path / "payments.csv").write_text("Amount,Description\n" + "\n".join(f"{r['Amount']},{r['Description']}" for r in PAYMENTS))
+    return tmp_path
+
+
+def test_file_references_decode_by_format(documents):
+    sales, sales_info = load_document(f"file://{documents / 'sales.json'}")
+    payments, _ = load_document({"uri": f"file://{documents / 'payments.jsonl'}"})
+    from_csv, csv_info = load_document({"uri": f"file://{documents / 'payments.csv'}"}, cache=None)
+
+    assert sales == SALES and payments == PAYMENTS
+    assert [record["Description"] for record in from_csv] == [record["Description"] for record in PAYMENTS]
+    assert sales_info["format"] == "json" and csv_info["format"] == "csv"
+    assert load_document(SALES) == (SALES, {"source": "inline", "records": 20})
+
+
+def test_extraction_is_cached_by_content(documents, monkeypatch):
+    calls = []
+    extract_document = document_refs.extract_document
+    monkeypatch.setattr(document_refs, "extract_document", lambda *args: calls.append(args) or extract_document(*args))
+    cache = DocumentCache(max_entries=4)
+    reference = {"uri": f"file://{documents / 'payments.csv'}"}
+
+    first, first_info = load_document(reference, cache)
+    second, second_info = load_document(reference, cache)
+    load_document({**reference, "extractionRules": [{"terms": ["Amount"]}]}, cache)
+
+    assert second == first
+    assert (first_info["cached"], second_info["cached"]) == (False, True)
+    assert len(calls) == 2
+
+
+def test_both_references_are_fetched_concurrently(documents, monkeypatch):
+    fetch_bytes = document_refs.fetch_bytes
+
+    def slow_fetch(reference, *args):
+        time.sleep(0.3)
+        return fetch_bytes(reference, *args)
+
+    monkeypatch.setattr(document_refs, "fetch_bytes", slow_fetch)
+    started = time.perf_counter()
+    left, right, sources = resolve_documents(f"file://{documents / 'sales.json'}", f"file://{documents / 'payments.jsonl'}")
+
+    assert time.perf_counter() - started < 0.55
+    assert (len(left), len(right)) == (20, 20)
+    assert sources["left"]["records"] == sources["right"]["records"] == 20
+
+
+def test_presigned_http_reference_is_redacted(documents, monkeypatch):
+    monkeypatch.setattr(document_refs, "DOCUMENT_ALLOWED_HOSTS", frozenset({"127.0.0.1"}))
+    (documents / "exports").mkdir()
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(documents))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        records, info = load_document(f"{base}/sales.json?X-Amz-Signature=secret", cache=None)
+        with pytest.raises(DocumentReferenceError) as missing:
+            load_document(f"{base}/missing.json?X-Amz-Signature=secret")
+        with pytest.raises(DocumentReferenceError) as redirected:
+            load_document(f"{base}/exports")
+    finally:
+        server.shutdown()
+
+    assert records == SALES
+    assert info["source"] == f"{base}/sales.json"
+    assert missing.value.status_code == 502 and "secret" not in str(missing.value)
+    assert redirected.value.status_code == 502 and "redirect not followed" in str(redirected.value)
+
+
+def test_host_files_and_internal_addresses_are_refused(documents, monkeypatch):
+    (documents / "escape.json").symlink_to("/etc/passwd")
+    refused = [
+        "file:///etc/passwd",
+        f"file://{documents}/../outside.json",
+        f"file://{documents / 'escape.json'}",
+        "http://169.254.169.254/latest/meta-data/iam/security-credentials/",
+        "http://127.0.0.1:8080/sales.json",
+        "http://localhost/sales.json",
+        "https://[::1]/sales.json",
+        "http://10.0.0.5/sales.json"
+    ]
+    for uri in refused:
+        with pytest.raises(DocumentReferenceError) as error:
+            load_document(uri, cache=None)
+        assert error.value.status_code == 400, uri
+
+    monkeypatch.setattr(document_refs, "DOCUMENT_ALLOWED_HOSTS", frozenset({"exports.example.com"}))
+    with pytest.raises(DocumentReferenceError) as off_list:
+        load_document("https://attacker.example.net/sales.json")
+    monkeypatch.setattr(document_refs, "DOCUMENT_FILE_ROOT", "")
+    with pytest.raises(DocumentReferenceError) as disabled:
+        load_document(f"file://{documents / 'sales.json'}")
+
+    assert off_list.value.status_code == 400
+    assert disabled.value.status_code == 400 and "DOCUMENT_FILE_ROOT" in str(disabled.value)
+
+
+def test_s3_reference(monkeypatch):
+    boto3 = pytest.importorskip("boto3")
+    from botocore.response import StreamingBody
+    from botocore.stub import Stubber
+
+    body = json.dumps(SALES).encode("utf-8")
+    client = boto3.client("s3", region_name="us-east-1", aws_access_key_id="x", aws_secret_access_key="x")
+    stubber = Stubber(client)
+    stubber.add_response(
+        "get_object",
+        {"Body": StreamingBody(io.BytesIO(body), len(body))},
+        {"Bucket": "clofast-uploads", "Key": "profiles/p1/sales export.json"}
+    )
+    monkeypatch.setattr(document_refs, "_s3", client)
+
+    with stubber:
+        records, info = load_document("s3://clofast-uploads/profiles/p1/sales%20export.json", cache=None)
+
+    assert records == SALES
+    assert info["bytes"] == len(body)
+
+
+def test_invalid_references(documents):
+    with pytest.raises(DocumentReferenceError) as unsupported:
+        load_document("ftp://example.com/sales.json")
+    with pytest.raises(DocumentReferenceError) as missing:
+        load_document(f"file://{documents / 'nonexistent.json'}")
+
+    assert unsupported.value.status_code == 400
+    assert missing.value.status_code == 502
+
+
+def test_entrypoint_reconciles_references_like_inline(documents, monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent
+    import work_queue
+
+    monkeypatch.setattr(work_queue, "_work_queue", work_queue.WorkQueue(executor="thread"))
+    client = TestClient(agent.app)
+
+    inline = client.post("/invocations", json={"leftDocument": SALES, "rightDocument": PAYMENTS}).json()
+    referenced = client.post("/invocations", json={
+        "leftDocument": f"file://{documents / 'sales.json'}",
+        "rightDocument": {"uri": f"file://{documents / 'payments.jsonl'}"}
+    }).json()
+    failed = client.post("/invocations", json={"leftDocument": f"file://{documents / 'nonexistent.json'}", "rightDocument": []})
+    host_file = client.post("/invocations", json={"leftDocument": "file:///etc/passwd", "rightDocument": []})
+    metadata = client.post("/invocations", json={"leftDocument": "http://169.254.169.254/latest/meta-data/", "rightDocument": []})
+
+    assert referenced["reconciliationResults"] == inline["reconciliationResults"]
+    assert referenced["metadata"]["documentSources"]["right"]["format"] == "jsonl"
+    assert failed.status_code == 502
+    assert host_file.status_code == metadata.status_code == 400
+
+
+def test_extract_and_reconcile_in_one_invocation(documents, monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent
+    import work_queue
+
+    monkeypatch.setattr(work_queue, "_work_queue", work_queue.WorkQueue(executor="thread"))
+    client = TestClient(agent.app)
+    (documents / "sales.csv").write_text("Rest ID,Amount,Month\n" + "\n".join(f"{r['Rest ID']},{r['Amount']},{r['Month']}" for r in SALES))
+
+    response = client.post("/invocations", json={
+        "operation": "extract_and_reconcile",
+        "leftDocument": {"documentUrl": f"file://{documents / 'sales.csv'}", "documentName": "sales.csv"},
+        "rightDocument": {"document_url": f"file://{documents / 'payments.csv'}", "extraction_rules": []},
+        "includeExtractedData": True
+    }).json()
+    inline = client.post("/invocations", json={
+        "leftDocument": response["extractedData"]["left"], "rightDocument": response["extractedData"]["right"],
+        "profileContext": {"resultCache": False}
+    }).json()
+    rejected = client.post("/invocations", json={"operation": "extract_and_reconcile", "leftDocument": SALES, "rightDocument": PAYMENTS})
+
+    assert response["summary"]["totalTransactions"] > 0
+    assert response["reconciliationResults"] == inline["reconciliationResults"]
+    assert response["metadata"]["pipeline"]["leftRecords"] == len(SALES)
+    assert response["metadata"]["documentSources"]["left"]["format"] == "csv"
+    assert rejected.status_code == 400
+
+
+def test_rebinding_dns_cannot_reach_an_internal_address(documents, monkeypatch):
+    pytest.importorskip("requests")
+    import socket
+
+    requested = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self):
+            requested.append(self.path)
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(documents)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    getaddrinfo = socket.getaddrinfo
+    lookups = []
+
+    def rebinding(host, port, *args, **kwargs):
+        if host != "exports.example.com":
+            return getaddrinfo(host, port, *args, **kwargs)
+        # Public for the check, loopback for the connection
+        lookups.append(host)
+        address = "93.184.216.34" if len(lookups) == 1 else "127.0.0.1"
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, port))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", rebinding)
+    try:
+        with pytest.raises(DocumentReferenceError) as error:
+            load_document(f"http://exports.example.com:{server.server_port}/sales.json", cache=None)
+    finally:
+        server.shutdown()
+
+    assert error.value.status_code == 400 and "127.0.0.1" in str(error.value)
+    assert len(lookups) == 2 and requested == []
+
+
+def test_llm_entrypoint_reports_reference_errors_with_their_status(documents):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent_no_fallbacks
+
+    client = TestClient(agent_no_fallbacks.app)
+    refused = client.post("/invocations", json={"leftDocument": "file:///etc/passwd", "rightDocument": []})
+    missing = client.post("/invocations", json={"leftDocument": f"file://{documents / 'nonexistent.json'}", "rightDocument": []})
+
+    assert refused.status_code == 400 and refused.json()["success"] is False
+    assert missing.status_code == 502
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -1,19 +1,42 @@
 #!/usr/bin/env python3
 """
-Test script for Excel processing functionality
-Tests the enhanced Excel extraction before AWS deployment
+Tests for Excel/CSV processing functionality
+Runs the streaming extraction engine against generated workbooks and the sample bank export
 """
 
-import pandas as pd
 import io
-import json
-from datetime import datetime
-import sys
 import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+from excel_extraction import SpreadsheetRecords, extract_from_excel, extract_spreadsheet, iter_spreadsheet_records
+from projection import compile_projection, rule_terms_from
+
+BANK_STATEMENT_PATH = os.path.join(
+    os.path.dirname(__file__), '..', 'server', 'src', 'assets', 'Bankstatement_pos.xlsx'
+)
+
+EXTRACTION_RULES = [
+    {
+        "extractionRuleName": "Financial Data",
+        "terms": ["Date", "Amount", "Description", "Reference ID"]
+    }
+]
+
+PROFILE_CONTEXT = {
+    "profileName": "Test Profile",
+    "profileDescription": "Testing Excel extraction"
+}
+
 
 def create_test_excel():
     """Create a test Excel file for processing"""
-    
+
     # Sample financial data
     data = {
         'Date': ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05'],
@@ -23,14 +46,14 @@ def create_test_excel():
         'Category': ['Income', 'Expense', 'Expense', 'Income', 'Expense'],
         'Status': ['Completed', 'Completed', 'Pending', 'Completed', 'Completed']
     }
-    
+
     df = pd.DataFrame(data)
-    
+
     # Create Excel file in memory
     excel_buffer = io.BytesIO()
     with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
         df.to_excel(writer, sheet_name='Transactions', index=False)
-        
+
         # Add a second sheet with summary data
         summary_data = {
             'Metric': ['Total Income', 'Total Expenses', 'Net Amount', 'Transaction Count'],
@@ -38,169 +61,204 @@ def create_test_excel():
         }
         summary_df = pd.DataFrame(summary_data)
         summary_df.to_excel(writer, sheet_name='Summary', index=False)
-    
+
     excel_buffer.seek(0)
     return excel_buffer.getvalue()
 
-def test_excel_extraction():
-    """Test the Excel extraction functionality"""
-    
-    print("🧪 Testing Excel Processing Functionality")
-    print("=" * 50)
-    
-    try:
-        # Import the extraction function
-        sys.path.append(os.path.dirname(__file__))
-        from agent import extract_from_excel
-        
-        # Create test Excel data
-        print("📊 Creating test Excel file...")
-        excel_content = create_test_excel()
-        print(f"✅ Test Excel file created: {len(excel_content)} bytes")
-        
-        # Test extraction rules
-        extraction_rules = [
-            {
-                "extractionRuleName": "Financial Data",
-                "terms": ["Date", "Amount", "Description", "Reference ID"]
-            }
-        ]
-        
-        profile_context = {
-            "profileName": "Test Profile",
-            "profileDescription": "Testing Excel extraction"
-        }
-        
-        # Test the extraction
-        print("\n🔍 Testing Excel extraction...")
-        result = extract_from_excel(
-            file_content=excel_content,
-            document_name="test_financial_data.xlsx",
-            extraction_rules=extraction_rules,
-            profile_context=profile_context
-        )
-        
-        # Display results
-        print(f"\n📋 Extraction Results:")
-        print(f"   Success: {result.get('success', False)}")
-        print(f"   Message: {result.get('message', 'No message')}")
-        print(f"   Records Extracted: {len(result.get('extractedData', []))}")
-        
-        if result.get('metadata'):
-            metadata = result['metadata']
-            print(f"   Confidence: {metadata.get('extractionConfidence', 0)}%")
-            print(f"   Method: {metadata.get('extractionMethod', 'Unknown')}")
-            print(f"   Original Rows: {metadata.get('originalRows', 0)}")
-            print(f"   Processed Rows: {metadata.get('processedRows', 0)}")
-            print(f"   Active Sheet: {metadata.get('activeSheet', 'Unknown')}")
-        
-        # Show sample data
-        if result.get('extractedData'):
-            print(f"\n📊 Sample Extracted Records:")
-            for i, record in enumerate(result['extractedData'][:3]):
-                print(f"   Record {i+1}: {record}")
-        
-        # Test without extraction rules
-        print(f"\n🔍 Testing without extraction rules...")
-        result_no_rules = extract_from_excel(
-            file_content=excel_content,
-            document_name="test_financial_data.xlsx",
-            extraction_rules=[],
-            profile_context=profile_context
-        )
-        
-        print(f"   Records without rules: {len(result_no_rules.get('extractedData', []))}")
-        
-        if result_no_rules.get('extractedData'):
-            print(f"   Sample record: {result_no_rules['extractedData'][0]}")
-        
-        print(f"\n✅ Excel processing test completed successfully!")
-        return True
-        
-    except ImportError as e:
-        print(f"❌ Import error: {e}")
-        print("💡 Make sure you have installed the required dependencies:")
-        print("   pip install pandas openpyxl xlrd numpy")
-        return False
-        
-    except Exception as e:
-        print(f"❌ Test failed: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+
+def test_excel_extraction_with_rules():
+    """Rule terms project every record down to the matching columns"""
+    result = extract_from_excel(
+        file_content=create_test_excel(),
+        document_name="test_financial_data.xlsx",
+        extraction_rules=EXTRACTION_RULES,
+        profile_context=PROFILE_CONTEXT
+    )
+
+    assert result['success'] is True
+    assert len(result['extractedData']) == 5
+    assert result['extractedData'][0] == {
+        "Date": "2024-01-01",
+        "Amount": 100.5,
+        "Description": "Payment from Client A",
+        "Reference ID": "REF001"
+    }
+
+    metadata = result['metadata']
+    assert metadata['columnProjection'] is True
+    assert metadata['activeSheet'] == 'Transactions'
+    assert metadata['processedRows'] == 5
+    # The summary sheet has none of the rule terms and is skipped
+    assert [s['sheet'] for s in metadata['sheets'] if s['skipped']] == ['Summary']
+
+
+def test_excel_extraction_without_rules_reads_all_sheets():
+    """Without rules every column of every sheet is returned"""
+    result = extract_from_excel(
+        file_content=create_test_excel(),
+        document_name="test_financial_data.xlsx",
+        extraction_rules=[],
+        profile_context=PROFILE_CONTEXT
+    )
+
+    assert result['success'] is True
+    assert len(result['extractedData']) == 9
+    assert set(result['extractedData'][0]) == {'Date', 'Amount', 'Description', 'Reference ID', 'Category', 'Status'}
+    assert result['extractedData'][-1] == {'Metric': 'Transaction Count', 'Value': 5}
+
+
+def test_rules_without_matching_columns_fall_back_to_all_columns():
+    result = extract_from_excel(
+        file_content=create_test_excel(),
+        document_name="test_financial_data.xlsx",
+        extraction_rules=[{"extractionRuleName": "Nothing", "terms": ["Not A Column"]}]
+    )
+
+    assert result['success'] is True
+    assert len(result['extractedData']) == 9
+    assert result['metadata']['columnProjection'] is False
+
+
+def test_records_are_yielded_in_bounded_chunks():
+    projection = compile_projection([{"terms": ["amount", "Date"]}])
+    chunks = list(iter_spreadsheet_records(create_test_excel(), "test.xlsx", projection, chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    # Case-insensitive projection keeps the rule term as the record key
+    assert chunks[0][0] == {"amount": 100.5, "Date": "2024-01-01"}
+
 
 def test_data_types():
     """Test various Excel data types"""
-    
-    print(f"\n🧪 Testing Excel Data Type Handling")
-    print("-" * 40)
-    
-    try:
-        # Create Excel with various data types
-        data = {
-            'Text': ['Sample Text', 'Another String', 'Special Chars: @#$%'],
-            'Integer': [100, 200, 300],
-            'Float': [100.50, 200.75, 300.99],
-            'Date': [datetime(2024, 1, 1), datetime(2024, 1, 2), datetime(2024, 1, 3)],
-            'Boolean': [True, False, True],
-            'Mixed': ['Text', 123, 45.67]
-        }
-        
-        df = pd.DataFrame(data)
-        excel_buffer = io.BytesIO()
-        df.to_excel(excel_buffer, index=False, engine='openpyxl')
-        excel_buffer.seek(0)
-        
-        from agent import extract_from_excel
-        
-        result = extract_from_excel(
-            file_content=excel_buffer.getvalue(),
-            document_name="data_types_test.xlsx",
-            extraction_rules=[],
-            profile_context={"profileName": "Data Types Test"}
-        )
-        
-        print(f"✅ Data types test successful!")
-        print(f"   Records: {len(result.get('extractedData', []))}")
-        
-        if result.get('extractedData'):
-            sample = result['extractedData'][0]
-            print(f"   Sample record types:")
-            for key, value in sample.items():
-                print(f"     {key}: {type(value).__name__} = {value}")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ Data types test failed: {e}")
-        return False
-
-def main():
-    """Main test function"""
-    
-    print("🚀 CloFast Excel Processing Test Suite")
-    print("=" * 60)
-    
-    # Test 1: Basic Excel extraction
-    test1_success = test_excel_extraction()
-    
-    # Test 2: Data type handling
-    test2_success = test_data_types()
-    
-    # Summary
-    print(f"\n📋 Test Summary:")
-    print(f"   Basic Extraction: {'✅ PASS' if test1_success else '❌ FAIL'}")
-    print(f"   Data Type Handling: {'✅ PASS' if test2_success else '❌ FAIL'}")
-    
-    if test1_success and test2_success:
-        print(f"\n🎉 All tests passed! Excel processing is ready for AWS deployment.")
-        print(f"💡 Next steps:")
-        print(f"   1. Run: python complete_deploy.py <your-account-id>")
-        print(f"   2. Update your CloFast .env file with the agent ARN")
-        print(f"   3. Test with real Excel files through the CloFast interface")
-    else:
-        print(f"\n❌ Some tests failed. Please fix the issues before deployment.")
-        sys.exit(1)
+    data = {
+        'Text': ['Sample Text', 'Another String', 'Special Chars: @#$%'],
+        'Integer': [100, 200, 300],
+        'Float': [100.50, 200.75, 300.99],
+        'Date': [datetime(2024, 1, 1), datetime(2024, 1, 2), datetime(2024, 1, 3, 14, 30)],
+        'Boolean': [True, False, True],
+        'Mixed': ['Text', 123, 45.67]
+    }
+
+    excel_buffer = io.BytesIO()
+    pd.DataFrame(data).to_excel(excel_buffer, index=False, engine='openpyxl')
+
+    result = extract_from_excel(
+        file_content=excel_buffer.getvalue(),
+        document_name="data_types_test.xlsx",
+        extraction_rules=[],
+        profile_context={"profileName": "Data Types Test"}
+    )
+
+    records = result['extractedData']
+    assert len(records) == 3
+    assert records[0] == {
+        'Text': 'Sample Text', 'Integer': 100, 'Float': 100.5,
+        'Date': '2024-01-01', 'Boolean': True, 'Mixed': 'Text'
+    }
+    assert records[2]['Date'] == '2024-01-03T14:30:00'
+    assert records[1]['Mixed'] == 123
+
+
+def test_original_rows_are_counted_before_projection():
+    content = b"Date,Amount,Memo\n2024-01-01,10.50,Coffee\n,,Carried forward\n2024-01-02,20.00,Lunch\n"
+
+    projected = extract_from_excel(content, "statement.csv", [{"terms": ["Date", "Amount"]}])['metadata']
+    unprojected = extract_from_excel(content, "statement.csv", [])['metadata']
+
+    assert (projected['originalRows'], projected['processedRows']) == (3, 2)
+    assert (unprojected['originalRows'], unprojected['processedRows']) == (3, 3)
+
+
+def test_csv_extraction():
+    content = "Date;Amount;Memo\n2024-01-01;10.50;Coffee\n\n2024-01-02;;Refund\n".encode('utf-8-sig')
+
+    result = extract_from_excel(content, "statement.csv", [{"terms": ["memo", "Amount"]}])
+
+    assert result['success'] is True
+    assert result['metadata']['extractionMethod'] == "Streaming CSV Extraction"
+    assert result['extractedData'] == [
+        {"memo": "Coffee", "Amount": "10.50"},
+        {"memo": "Refund", "Amount": ""}
+    ]
+
+
+def test_bank_statement_export():
+    with open(BANK_STATEMENT_PATH, 'rb') as f:
+        content = f.read()
+
+    result = extract_from_excel(
+        content,
+        "Bankstatement_pos.xlsx",
+        [{"terms": ["Posting Date", "Amount", "Description"]}]
+    )
+
+    assert result['success'] is True
+    assert len(result['extractedData']) == 21
+    first = result['extractedData'][0]
+    assert list(first) == ["Posting Date", "Amount", "Description"]
+    assert first["Amount"] == 91.11
+    assert first["Description"].startswith("ORIG CO NAME:AMERICAN EXPRESS")
+
+
+def test_header_below_title_rows_is_found_by_rule_columns():
+    content = (
+        "ACME Bank - Account Statement\n"
+        "Period,December 2024\n"
+        "\n"
+        "Posting Date,Amount,Description,Balance\n"
+        "2024-12-01,10.50,Coffee,100\n"
+        "2024-12-02,20.00,Lunch,80\n"
+    ).encode()
+
+    result = extract_from_excel(content, "statement.csv", [{"terms": ["Posting Date", "Amount"]}])
+
+    assert result['metadata']['columnProjection'] is True
+    assert result['extractedData'] == [
+        {"Posting Date": "2024-12-01", "Amount": "10.50"},
+        {"Posting Date": "2024-12-02", "Amount": "20.00"}
+    ]
+
+
+def test_compact_records_for_references_and_batches():
+    result = extract_spreadsheet(create_test_excel(), "test.xlsx", [])
+    records = result['extractedData']
+
+    assert isinstance(records, SpreadsheetRecords)
+    assert records == extract_from_excel(create_test_excel(), "test.xlsx", [])['extractedData']
+    assert records[-1] == {'Metric': 'Transaction Count', 'Value': 5} and records[4]['Reference ID'] == 'REF005'
+    # Columns missing from a sheet read as None, as they do for record dicts
+    assert records.column_series('Amount').tolist() == [100.5, 250.75, 89.99, 1500.0, 45.25, None, None, None, None]
+
+
+def test_unsupported_spreadsheet_type():
+    result = extract_from_excel(b"", "notes.txt", [])
+
+    assert result['success'] is False
+    assert "Unsupported spreadsheet type" in result['message']
+
+
+def test_rule_terms_are_deduplicated_in_order():
+    rules = [{"terms": ["Amount", "Date"]}, {"terms": ["Date", "Rest ID"]}, {}]
+
+    assert rule_terms_from(rules) == ["Amount", "Date", "Rest ID"]
+
+
+def test_projection_resolves_each_schema_once():
+    projection = compile_projection([{"terms": ["amount", "Description", "Missing"]}])
+    records = [
+        {"Date": "01/02/2024", "Amount": 10.0, "Description": "a"},
+        {"Date": "01/03/2024", "Amount": 12.5, "Description": "b"},
+        {"AMOUNT": 3.0, "Type": "Summary"},
+        {"Type": "Summary"},
+    ]
+
+    assert projection.project(records) == [
+        {"amount": 10.0, "Description": "a"},
+        {"amount": 12.5, "Description": "b"},
+        {"amount": 3.0},
+    ]
+    assert projection.cached_schemas == 3
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(pytest.main([__file__, "-v"]))
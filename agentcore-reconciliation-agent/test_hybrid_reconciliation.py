@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for hybrid reconciliation - deterministic matching with LLM adjudication of the residue
+"""
+
+import json
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+from hybrid_reconciliation import hybrid_reconcile, parse_decisions
+from prompt_encoding import encoding_report
+
+SALES = [{"Rest ID": 1000 + i, "Amount": 20.0 + i, "Month": "December"} for i in range(95)]
+PAYMENTS = [{"Amount": 20.0 + i, "Description": f"ACH CREDIT UBER EATS #{1000 + i}", "Date": "12/05/2024"} for i in range(95)]
+
+# Two identical candidate payments and one sale with nothing close
+SALES += [{"Rest ID": 2001, "Amount": 500.0, "Month": "December"}, {"Rest ID": 2002, "Amount": 9999.0}]
+PAYMENTS += [{"Amount": 500.0, "Description": "WIRE TRANSFER"}, {"Amount": 500.0, "Description": "WIRE TRANSFER"}]
+
+
+class AdjudicatingModel:
+    """
+    Picks the runner-up candidate of every sales record in the prompt (null when there is none)
+    """
+
+    def __init__(self):
+        self.prompts = []
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        decisions = []
+        for left, candidates in re.findall(r'^(left-\d+): (.*)$', prompt, re.MULTILINE):
+            candidates = re.findall(r'right-\d+', candidates)
+            decisions.append({
+                "left": left,
+                "right": candidates[1] if len(candidates) > 1 else None,
+                "confidence": 80,
+                "reason": "Same amount, later wire"
+            })
+        return "Here are my decisions:\n" + json.dumps(decisions)
+
+
+def test_only_residue_reaches_the_llm():
+    model = AdjudicatingModel()
+
+    results, stats = hybrid_reconcile(SALES, PAYMENTS, lambda: model, max_concurrency=2)
+
+    assert stats["resolvedByMatcher"] == 95
+    assert stats["residue"] == 2
+    assert stats["adjudicatedByLlm"] == 2
+    assert stats["llmCalls"] == len(model.prompts) == 1
+    assert len(results) == len(SALES) + len(PAYMENTS)
+
+    ambiguous = results[95]
+    assert ambiguous["resolvedBy"] == "llm"
+    assert ambiguous["rightTransaction"]["id"] == "right-96"
+    assert ambiguous["isReconciled"] is True
+    assert ambiguous["aiReasoning"].startswith("🤖 LLM ADJUDICATED MATCH (80%)")
+
+    assert results[0]["resolvedBy"] == "matcher"
+    assert results[0]["rightTransaction"]["id"] == "right-0"
+
+    # Far fewer tokens than sending every record as pretty JSON
+    all_rows = [(f"left-{i}", record) for i, record in enumerate(SALES)] + [(f"right-{i}", record) for i, record in enumerate(PAYMENTS)]
+    assert stats["estimatedPromptTokens"] * 10 < encoding_report(all_rows)["json"]
+    assert stats["tokensByEncoding"]["tsv"] < stats["tokensByEncoding"]["json"]
+
+
+def test_no_llm_call_when_everything_matches():
+    model = AdjudicatingModel()
+
+    _, stats = hybrid_reconcile(SALES[:95], PAYMENTS[:95], lambda: model)
+
+    assert stats["residue"] == 0
+    assert model.prompts == []
+
+
+def test_undecided_residue_keeps_matcher_result():
+    results, stats = hybrid_reconcile(SALES, PAYMENTS, lambda: (lambda prompt: "I cannot decide."))
+
+    assert stats["undecided"] == 2
+    assert results[95]["resolvedBy"] == "matcher"
+    assert results[95]["rightTransaction"]["id"] == "right-95"
+
+
+def test_parse_decisions_ignores_malformed_entries():
+    decisions = parse_decisions('```json\n[{"left": "left-3", "right": null, "confidence": "high"}, {"left": "x"}, 7]\n```')
+
+    assert list(decisions) == [3]
+    assert decisions[3].right_idx is None
+    assert decisions[3].confidence == 0.0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent LLM response cache
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+from chunked_prompting import analyze_in_chunks
+from llm_cache import ResponseCache, cache_key
+from stub_model import StubModel
+
+SALES = [{"Rest ID": 100 + i % 5, "Amount": 10.0 + i, "Month": "December"} for i in range(40)]
+PAYMENTS = [{"Amount": 10.0 + i, "Description": f"UBER EATS #{100 + i % 5}"} for i in range(40)]
+
+
+def test_key_ignores_insignificant_whitespace_only():
+    key = cache_key("model-a", "system", "Records:\n  left-0\t12.5\n")
+
+    assert key == cache_key("model-a", "system", "\nRecords:\nleft-0 12.5")
+    assert key != cache_key("model-b", "system", "Records:\nleft-0\t12.5")
+    assert key != cache_key("model-a", "other system", "Records:\nleft-0\t12.5")
+    assert key != cache_key("model-a", "system", "Records:\nleft-0\t12.6")
+
+
+def test_rerun_is_served_from_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm.sqlite3"))
+    model = StubModel(base_latency=0.05)
+
+    first_session = cache.session(StubModel.model_id)
+    first, first_stats = analyze_in_chunks(SALES, PAYMENTS, lambda: model, token_budget=200, cache=first_session)
+    calls = model.calls
+
+    # A fresh cache object on the same file - the cache survives restarts
+    second_session = ResponseCache(str(tmp_path / "llm.sqlite3")).session(StubModel.model_id)
+    second, second_stats = analyze_in_chunks(SALES, PAYMENTS, lambda: model, token_budget=200, cache=second_session)
+
+    assert second == first
+    assert model.calls == calls
+    assert first_session.stats()["misses"] == first_stats["chunks"] > 1
+    assert second_session.stats()["hits"] == first_stats["chunks"]
+    assert second_session.stats()["hitRate"] == 1.0
+    assert second_stats["elapsedSeconds"] < first_stats["elapsedSeconds"]
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=-1)
+    cache.put("key", "response")
+
+    assert cache.get("key") is None
+    assert cache.entries() == 0
+
+
+def test_least_recently_used_entries_are_evicted_by_size(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm.sqlite3"), max_bytes=300)
+    for name in ("a", "b", "c"):
+        cache.put(name, name * 100)
+    cache.get("a")
+    cache.put("d", "d" * 100)
+
+    assert cache.get("a") == "a" * 100
+    assert cache.get("b") is None
+    assert cache.get("c") == "c" * 100
+    assert cache.entries() == 3
+    assert cache.evictions == 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
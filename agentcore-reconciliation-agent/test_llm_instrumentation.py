@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-call LLM instrumentation
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from botocore.hooks import HierarchicalEmitter
+
+sys.path.append(os.path.dirname(__file__))
+
+from chunked_prompting import analyze_in_chunks
+from llm_instrumentation import LlmMetrics, instrument_client
+from stub_model import StubModel
+
+SALES = [{"Rest ID": 100 + i % 5, "Amount": 10.0 + i, "Month": "December"} for i in range(40)]
+PAYMENTS = [{"Amount": 10.0 + i, "Description": f"UBER EATS #{100 + i % 5}"} for i in range(40)]
+
+
+def test_every_chunk_call_is_measured():
+    metrics = LlmMetrics(StubModel.model_id)
+    model = StubModel(base_latency=0.01)
+
+    _, stats = analyze_in_chunks(SALES, PAYMENTS, lambda: model, token_budget=200, max_concurrency=4, metrics=metrics)
+    summary = metrics.summary()
+
+    assert summary["calls"] == summary["modelCalls"] == stats["chunks"] > 1
+    assert sum(call["chunkRows"] for call in summary["perCall"]) == len(SALES) + len(PAYMENTS)
+    assert summary["inputTokens"] == model.prompt_tokens
+    assert summary["outputTokens"] > 0
+    assert all(call["tokensEstimated"] and call["wallSeconds"] >= 0.01 for call in summary["perCall"])
+    assert summary["retries"] == summary["throttles"] == summary["errors"] == 0
+
+
+def test_reported_token_usage_is_preferred_to_estimates():
+    metrics = LlmMetrics("model-a")
+    response = SimpleNamespace(metrics=SimpleNamespace(accumulated_usage={"inputTokens": 1234, "outputTokens": 56}))
+
+    with metrics.call("prompt", rows=3) as call:
+        call.record_usage(response, "text")
+
+    assert metrics.summary()["inputTokens"] == 1234
+    assert metrics.summary()["perCall"][0] == {
+        "wallSeconds": pytest.approx(0, abs=0.01), "inputTokens": 1234, "outputTokens": 56, "tokensEstimated": False,
+        "retries": 0, "throttles": 0, "chunkRows": 3, "chunkChars": 6, "cached": False
+    }
+
+
+def test_client_events_count_retries_and_throttles():
+    client = SimpleNamespace(meta=SimpleNamespace(events=HierarchicalEmitter()))
+    instrument_client(client)
+    instrument_client(client)
+    events = client.meta.events
+    throttled = (SimpleNamespace(status_code=400), {"Error": {"Code": "ThrottlingException"}})
+
+    metrics = LlmMetrics("model-a")
+    with metrics.call("prompt") as call:
+        events.emit("before-call.bedrock-runtime.Converse")
+        for _ in range(3):
+            events.emit("before-send.bedrock-runtime.Converse")
+        events.emit("needs-retry.bedrock-runtime.Converse", response=throttled)
+        events.emit("needs-retry.bedrock-runtime.Converse", response=(SimpleNamespace(status_code=429), {}))
+    # Events outside a measured call are ignored
+    events.emit("before-send.bedrock-runtime.Converse")
+
+    assert (call.attempts, call.retries, call.throttles) == (3, 2, 2)
+
+
+def test_calls_become_spans_with_attributes(monkeypatch):
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    import tracing
+
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_tracer", lambda: provider.get_tracer(tracing.TRACER_NAME))
+    with trace.use_span(provider.get_tracer(__name__).start_span("request"), end_on_exit=True):
+        analyze_in_chunks(SALES, PAYMENTS, lambda: StubModel(base_latency=0), token_budget=200,
+                          max_concurrency=4, metrics=LlmMetrics("local-stub"))
+
+    spans = exporter.get_finished_spans()
+    request = next(span for span in spans if span.name == "request")
+    calls = [span for span in spans if span.name == "llm.call"]
+    assert len(calls) > 1
+    assert all(span.parent.span_id == request.context.span_id for span in calls)
+    assert all(span.attributes["gen_ai.usage.input_tokens"] > 0 for span in calls)
+    assert sum(span.attributes["llm.chunk.rows"] for span in calls) == len(SALES) + len(PAYMENTS)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus text-format /metrics endpoints
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+import metrics
+from metrics import Counter, Histogram, record_work, render, track_request
+
+SALES = [{"Rest ID": 100 + i % 5, "Amount": 10.5 + i, "Month": "December"} for i in range(20)]
+PAYMENTS = [{"Amount": 10.5 + i, "Description": f"UBER EATS #{100 + i % 5}"} for i in range(20)]
+
+
+def sample(text: str, name: str, **labels) -> float:
+    """
+    Value of one sample in exposition text
+    """
+    label_text = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    pattern = "^" + re.escape(name + (f"{{{label_text}}}" if labels else "")) + r" (\S+)$"
+    match = re.search(pattern, text, re.MULTILINE)
+    assert match, f"{name} {labels} not found"
+    return float(match.group(1).replace("+Inf", "inf"))
+
+
+def test_exposition_format():
+    counter = Counter("test_total", "A test counter")
+    counter.inc(operation='say "hi"')
+    histogram = Histogram("test_seconds", "A test histogram", buckets=(0.1, 1.0))
+    histogram.observe(0.05, operation="a")
+    histogram.observe(0.5, operation="a")
+
+    assert counter.render() == ["# HELP test_total A test counter", "# TYPE test_total counter", 'test_total{operation="say \\"hi\\""} 1']
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{operation="a",le="0.1"} 1',
+        'test_seconds_bucket{operation="a",le="1"} 2',
+        'test_seconds_bucket{operation="a",le="+Inf"} 2',
+        'test_seconds_sum{operation="a"} 0.55',
+        'test_seconds_count{operation="a"} 2'
+    ]
+
+
+def test_requests_work_caches_and_process_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "_caches", {})
+    metrics.register_cache("test", lambda: (3, 1))
+    before = metrics.REQUESTS.value(operation="test_op", status=500)
+
+    with pytest.raises(ValueError):
+        with track_request("test_op"):
+            raise ValueError("boom")
+    record_work("test_op", 100, 0.5, pairs=2500)
+    text = render()
+
+    assert sample(text, "clofast_requests_total", operation="test_op", status=500) == before + 1
+    assert sample(text, "clofast_request_duration_seconds_count", operation="test_op") >= 1
+    assert sample(text, "clofast_records_per_second", operation="test_op") == 200
+    assert sample(text, "clofast_pairs_scored_total", operation="test_op") >= 2500
+    assert sample(text, "clofast_cache_hit_ratio", cache="test") == 0.75
+    assert sample(text, "process_resident_memory_bytes") > 0
+
+
+def test_agentcore_metrics_endpoint(monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent
+    import work_queue
+
+    monkeypatch.setattr(work_queue, "_work_queue", work_queue.WorkQueue(executor="thread"))
+    client = TestClient(agent.app)
+    client.post("/invocations", json={"leftDocument": SALES, "rightDocument": PAYMENTS, "profileContext": {"resultCache": False}})
+    client.post("/invocations", json={"operation": "status", "jobId": "0" * 32})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert sample(response.text, "clofast_requests_total", operation="reconcile", status=200) >= 1
+    assert sample(response.text, "clofast_requests_total", operation="status", status=404) >= 1
+    assert sample(response.text, "clofast_pairs_scored_total", operation="reconcile") >= 400
+    assert sample(response.text, "clofast_work_queue_completed_total") >= 1
+    assert 'clofast_cache_hit_ratio{cache="result"}' in response.text
+
+
+def test_streamed_batch_extract_is_measured_over_the_whole_stream(monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    import agent
+
+    def fake_batch(documents, profile_context):
+        for index in range(2):
+            yield {"index": index, "success": True, "extractedData": [{"Amount": 1}] * 3}
+
+    monkeypatch.setattr(agent, "iter_batch_extract", fake_batch)
+    before = metrics.REQUEST_SECONDS.count(operation="batch_extract")
+    records = metrics.RECORDS.value(operation="batch_extract")
+
+    stream = agent.clofast_reconciliation_agent({"operation": "batch_extract", "documents": [{}, {}]})
+    assert metrics.REQUEST_SECONDS.count(operation="batch_extract") == before
+    assert len(list(stream)) == 2
+
+    assert metrics.REQUEST_SECONDS.count(operation="batch_extract") == before + 1
+    assert metrics.RECORDS.value(operation="batch_extract") == records + 6
+
+
+def test_flask_metrics_endpoint():
+    pytest.importorskip("flask")
+    import local_agent
+
+    client = local_agent.app.test_client()
+    client.post("/extract", json={"document_name": "statement.pdf"})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert sample(response.get_data(as_text=True), "clofast_requests_total", operation="extract", status=400) >= 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
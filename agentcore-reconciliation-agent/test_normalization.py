@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized normalization stage, column-role inference and the matching engine
+"""
+
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+from matching_engine import reconcile_records
+from normalization import amounts_from_strings, normalize_amounts, normalize_dates, normalize_ids
+from schema_inference import cached_signatures, clear_role_cache, infer_columns
+
+
+def test_amounts_become_integer_cents():
+    cents = normalize_amounts(["$1,234.56", "(45.00)", "1.234,56", "12.5-", 7, None, "n/a", True])
+
+    assert cents.tolist()[:5] == [123456, -4500, 123456, -1250, 700]
+    assert cents[5:].isna().all()
+
+
+def test_dates_become_ordinals():
+    ordinals = normalize_dates(["2024-12-02", "12/02/2024", 45628, "Dec 02, 2024", "not a date"])
+    expected = date(2024, 12, 2).toordinal()
+
+    assert ordinals.tolist()[:4] == [expected] * 4
+    assert ordinals.isna().tolist()[4]
+
+
+def test_ids_are_canonical_strings():
+    assert normalize_ids([1023.0, "1023.0", " 77 ", None]).tolist() == ["1023", "1023", "77", ""]
+
+
+def test_amount_strings_parse_in_one_pass():
+    amounts = amounts_from_strings(["1,234.56", "-$12.00", "bad"])
+
+    assert amounts[:2].tolist() == [1234.56, -12.00]
+    assert amounts[2] != amounts[2]
+
+
+def test_reconcile_matches_normalized_amounts():
+    sales = [
+        {"Rest ID": 1023.0, "Amount": "$91.11", "Month": "December", "Date": "12/02/2024"},
+        {"Rest ID": 2048, "Amount": 500, "Month": "December", "Date": "12/09/2024"},
+    ]
+    payments = [
+        {"Amount": 91.11, "Description": "ACH CREDIT UBER EATS 1023", "Date": "2024-12-02"},
+    ]
+
+    results = reconcile_records(sales, payments)
+
+    assert results[0]["rightTransaction"]["id"] == "right-0"
+    assert results[0]["isReconciled"] is True
+    assert results[0]["matchedFields"][0] == "GOOD MATCH: Exact amount $91.11"
+    assert results[1]["rightTransaction"] is None
+    assert len(results) == len(sales) + len(payments)
+
+
+def test_exact_amount_means_equal_cents():
+    sales = [{"Amount": "$100.00", "Month": "December"}]
+
+    exact = reconcile_records(sales, [{"Amount": 100.00, "Description": "DEPOSIT"}])
+    off_by_a_cent = reconcile_records(sales, [{"Amount": 100.01, "Description": "DEPOSIT"}])
+
+    assert exact[0]["matchedFields"][0] == "GOOD MATCH: Exact amount $100.0"
+    assert not any("Exact amount" in factor for factor in off_by_a_cent[0]["matchedFields"])
+    assert off_by_a_cent[0]["confidence"] < exact[0]["confidence"]
+
+
+BANK_EXPORT = [
+    {"Posting Date": f"12/0{day}/2024", "Details": f"ACH CREDIT UBER EATS #10{day}", "Txn Amount": f"${day * 10}.11",
+     "Category": "Credit", "Ref No": str(5000 + day)}
+    for day in range(1, 9)
+]
+
+
+def test_roles_are_inferred_and_cached_per_header_signature():
+    clear_role_cache()
+
+    roles = infer_columns(BANK_EXPORT)
+    infer_columns(list(reversed(BANK_EXPORT)))
+
+    assert roles["amount"] == "Txn Amount"
+    assert roles["date"] == "Posting Date"
+    assert roles["description"] == "Details"
+    assert roles["type"] == "Category"
+    # A reference number is not a store ID
+    assert roles["id"] is None
+    assert cached_signatures() == 1
+
+
+def test_canonical_columns_keep_their_roles():
+    roles = infer_columns([{"Rest ID": 1023, "Amount": 91.11, "Month": "December", "Notes": "Lunch service at the bar"}])
+
+    assert (roles["id"], roles["amount"], roles["month"]) == ("Rest ID", "Amount", "Month")
+    assert roles["description"] == "Notes"
+
+
+def test_reconcile_with_inferred_bank_layout():
+    sales = [{"Rest ID": 103, "Amount": 30.11, "Month": "December"}]
+
+    results = reconcile_records(sales, BANK_EXPORT, infer_columns(sales), infer_columns(BANK_EXPORT))
+
+    assert results[0]["rightTransaction"]["Details"] == "ACH CREDIT UBER EATS #103"
+    assert results[0]["isReconciled"] is True
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for PDF text pattern extraction and vendor statement templates
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+from page_classifier import classify_page
+from pdf_extraction import extract_financial_patterns_from_text, select_scan_text
+from statement_templates import detect_template
+
+DOORDASH_STATEMENT = """DoorDash Merchant Statement
+Payout date: 03/15/2024
+Store: NYC 123 Foods
+42 Marketplace orders 1,234.56
+3 Partner orders 98.10
+Commission (15%) ($185.18)
+Error charges -$12.00
+Total payout $1,135.48
+"""
+
+GRUBHUB_STATEMENT = """Grubhub for Restaurants
+Deposit date: 04/01/2024
+Food & beverage 2,500.00
+Sales tax 212.50
+Processing fee ($75.00)
+Net deposit $2,637.50
+"""
+
+UNKNOWN_STATEMENT = """Quarterly partner report
+Total payments received $4,210.00
+"""
+
+
+def test_doordash_template_parses_summary_lines():
+    template = detect_template(DOORDASH_STATEMENT)
+    assert template.name == "DoorDash"
+
+    records = extract_financial_patterns_from_text(DOORDASH_STATEMENT, "dd.pdf", template, DOORDASH_STATEMENT)
+
+    assert [(r["Description"], r["Amount"]) for r in records] == [
+        ("Marketplace Orders: 42 orders", 1234.56),
+        ("Partner Orders: 3 orders", 98.10),
+        ("Commission", -185.18),
+        ("Error Charges", -12.00),
+        ("Total Payout", 1135.48),
+    ]
+    assert {r["Date"] for r in records} == {"03/15/2024"}
+    assert all(r["Type"] == "Summary" for r in records)
+
+
+def test_grubhub_template_is_fingerprinted():
+    template = detect_template(GRUBHUB_STATEMENT)
+    assert template.name == "Grubhub"
+
+    records = extract_financial_patterns_from_text(GRUBHUB_STATEMENT, "gh.pdf", template, GRUBHUB_STATEMENT)
+
+    assert records[-1]["Description"] == "Net Deposit"
+    assert records[-1]["Amount"] == 2637.50
+    assert records[2]["Amount"] == -75.00
+
+
+def test_unknown_layout_falls_back_to_generic_scan():
+    assert detect_template(UNKNOWN_STATEMENT) is None
+
+    records = extract_financial_patterns_from_text(UNKNOWN_STATEMENT, "report.pdf")
+
+    assert [(r["Description"], r["Amount"]) for r in records] == [("Total Payments", 4210.00)]
+
+
+COVER_PAGE = """Chase Business Complete Checking
+Your statement for the period is enclosed
+Customer service: call anytime"""
+
+TERMS_PAGE = """IN CASE OF ERRORS OR QUESTIONS ABOUT YOUR ELECTRONIC FUNDS TRANSFERS
+Call us or write us as soon as you can if you think your statement or receipt is
+incorrect or if you need more information about a transfer listed on the statement.
+A returned item fee of $34.00 may apply. We must hear from you no later than sixty
+days after we sent you the first statement on which the problem or error appeared."""
+
+SUMMARY_PAGE = """Account summary
+Ending balance $12.00
+Thank you for banking with us"""
+
+TRANSACTION_PAGE = """12/02/2024 ACH CREDIT AMERICAN EXPRESS $91.11
+12/10/2024 ACH CREDIT AMERICAN EXPRESS $125.38"""
+
+
+def test_page_classifier_separates_transaction_pages():
+    assert classify_page(TRANSACTION_PAGE).transactional is True
+    assert classify_page(COVER_PAGE).transactional is False
+    assert classify_page(TERMS_PAGE).transactional is False
+    assert classify_page(DOORDASH_STATEMENT).transactional is True
+
+
+def test_single_amount_is_one_currency_token():
+    summary = classify_page(SUMMARY_PAGE)
+
+    assert summary.currency_tokens == 1
+    assert summary.transactional is False
+    assert classify_page(TRANSACTION_PAGE).currency_tokens == 2
+
+
+def test_skipped_pages_keep_line_numbers():
+    pages = [COVER_PAGE, TRANSACTION_PAGE, TERMS_PAGE]
+
+    scan_text, skipped_pages = select_scan_text(pages)
+    records = extract_financial_patterns_from_text(scan_text, "statement.pdf")
+
+    assert skipped_pages == [1, 3]
+    assert [r["LineNumber"] for r in records] == [4, 5]
+    assert scan_text.count("\n") == "".join(page + "\n" for page in pages).count("\n")
+
+
+def test_skipped_summary_page_still_feeds_the_summary_scan():
+    totals_page = "Gross sales 1,234.56\nRefunds 98.10\nFees 45.00\nNet sales 1,091.46"
+    pages = [totals_page, SUMMARY_PAGE]
+    full_text = "".join(page + "\n" for page in pages)
+
+    scan_text, skipped_pages = select_scan_text(pages)
+    filtered = extract_financial_patterns_from_text(scan_text, "statement.pdf")
+    records = extract_financial_patterns_from_text(scan_text, "statement.pdf", summary_text=full_text)
+
+    assert skipped_pages == [2]
+    assert filtered == []
+    assert [(r["Description"], r["Amount"], r["LineNumber"]) for r in records] == [("Balance", 12.00, 6)]
+
+
+def test_full_scan_override_and_all_skipped_fallback():
+    assert select_scan_text([COVER_PAGE, TRANSACTION_PAGE], full_scan=True)[1] == []
+
+    scan_text, skipped_pages = select_scan_text([COVER_PAGE, TERMS_PAGE])
+    assert skipped_pages == []
+    assert "returned item fee" in scan_text
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
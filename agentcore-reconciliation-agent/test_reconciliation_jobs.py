@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Tests for asynchronous reconciliation jobs
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+import reconciliation_jobs
+from reconciliation_jobs import JobStore
+from schema_inference import reconcile_documents
+from work_queue import WorkQueue
+
+SALES = [{"Rest ID": 100 + i % 5, "Amount": 10.0 + i, "Month": "December"} for i in range(30)]
+PAYMENTS = [{"Amount": 10.0 + i, "Description": f"UBER EATS #{100 + i % 5}"} for i in range(25)]
+
+
+def respond(left_document, right_document, profile_context, results, left_columns, right_columns):
+    return {"reconciliationResults": results, "summary": {"leftFileRecords": len(left_document)}, "metadata": {"profileContext": profile_context}}
+
+
+def store(tmp_path, **kwargs) -> JobStore:
+    return JobStore(respond, directory=str(tmp_path / "jobs"), work_queue=WorkQueue(max_workers=2, executor="thread"), **kwargs)
+
+
+def wait_for(jobs: JobStore, job_id: str, status: str = "completed") -> dict:
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        current = jobs.status(job_id)
+        if current["status"] == status:
+            return current
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {status}: {current}")
+
+
+def test_batched_job_pages_match_synchronous_results(tmp_path):
+    jobs = store(tmp_path, batch_records=7)
+    submitted = jobs.submit(SALES, PAYMENTS, {"profile": "p1"})
+    status = wait_for(jobs, submitted["jobId"])
+
+    expected, _, _ = reconcile_documents(SALES, PAYMENTS)
+    assert status["progress"] == {"stage": "completed", "recordsScored": 30, "totalRecords": 30, "percent": 100.0}
+    assert status["resultCount"] == len(expected) == 55
+
+    pages = [jobs.result(submitted["jobId"], page, page_size=20) for page in (1, 2, 3)]
+    assert [row for page in pages for row in page["reconciliationResults"]] == expected
+    assert pages[0]["pagination"] == {"page": 1, "pageSize": 20, "totalResults": 55, "totalPages": 3, "hasMore": True}
+    assert pages[2]["pagination"]["hasMore"] is False
+    assert pages[0]["metadata"]["profileContext"] == {"profile": "p1"}
+
+
+def test_right_side_is_prepared_once_per_job(tmp_path, monkeypatch):
+    prepared = []
+    prepared_document = reconciliation_jobs.PreparedDocument
+    monkeypatch.setattr(reconciliation_jobs, "PreparedDocument", lambda *args: prepared.append(args[0]) or prepared_document(*args))
+    jobs = store(tmp_path, batch_records=7)
+
+    wait_for(jobs, jobs.submit(SALES, PAYMENTS)["jobId"])
+
+    assert prepared == [PAYMENTS]
+
+
+def test_progress_is_reported_while_scoring(tmp_path, monkeypatch):
+    release = threading.Event()
+    match_left_batch = reconciliation_jobs.match_left_batch
+
+    def gated_batch(batch, *args):
+        if args[-1] > 0:
+            release.wait(timeout=30)
+        return match_left_batch(batch, *args)
+
+    monkeypatch.setattr(reconciliation_jobs, "match_left_batch", gated_batch)
+    jobs = store(tmp_path, batch_records=10)
+    job_id = jobs.submit(SALES, PAYMENTS)["jobId"]
+
+    deadline = time.time() + 30
+    while jobs.status(job_id)["progress"]["recordsScored"] < 10 and time.time() < deadline:
+        time.sleep(0.01)
+    running = jobs.status(job_id)
+    result = jobs.result(job_id)
+    release.set()
+
+    assert running["status"] == "running"
+    assert running["progress"]["stage"] == "scoring"
+    assert running["progress"]["percent"] == pytest.approx(33.3)
+    assert result["success"] is False and result["message"] == "Job is running"
+    assert wait_for(jobs, job_id)["resultCount"] == 55
+
+
+def test_ping_is_busy_until_every_job_finishes(tmp_path, monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent
+
+    release = threading.Event()
+    match_left_batch = reconciliation_jobs.match_left_batch
+    monkeypatch.setattr(reconciliation_jobs, "match_left_batch", lambda *args: release.wait(timeout=30) and match_left_batch(*args))
+    jobs = store(tmp_path, tasks=agent.app)
+    client = TestClient(agent.app)
+
+    job_id = jobs.submit(SALES, PAYMENTS)["jobId"]
+    busy = client.get("/ping").json()["status"]
+    release.set()
+    wait_for(jobs, job_id)
+    failed_id = jobs.submit("file:///nonexistent.json", PAYMENTS)["jobId"]
+    wait_for(jobs, failed_id, "failed")
+
+    assert busy == "HealthyBusy"
+    assert client.get("/ping").json()["status"] == "Healthy"
+    assert agent.app.get_async_task_info()["active_count"] == 0
+
+
+def test_results_survive_restart_and_expire(tmp_path):
+    first = store(tmp_path)
+    job_id = first.submit(SALES, PAYMENTS)["jobId"]
+    wait_for(first, job_id)
+
+    restarted = store(tmp_path)
+    assert restarted.status(job_id)["status"] == "completed"
+    assert len(restarted.result(job_id, page_size=50)["reconciliationResults"]) == 50
+
+    expiring = store(tmp_path, ttl_seconds=0)
+    time.sleep(0.01)
+    expiring.purge_expired(force=True)
+    assert expiring.status(job_id) is None
+    assert os.listdir(tmp_path / "jobs") == []
+    assert store(tmp_path).status("../../etc/passwd") is None
+
+
+def test_entrypoint_job_operations(tmp_path, monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent
+
+    jobs = JobStore(agent.reconciliation_response, directory=str(tmp_path / "jobs"), work_queue=WorkQueue(executor="thread"))
+    monkeypatch.setattr(agent, "jobs", jobs)
+    client = TestClient(agent.app)
+
+    submitted = client.post("/invocations", json={"operation": "submit", "leftDocument": SALES, "rightDocument": PAYMENTS}).json()
+    assert submitted["status"] in ("queued", "running", "completed")
+
+    deadline = time.time() + 30
+    status = {}
+    while status.get("status") != "completed" and time.time() < deadline:
+        status = client.post("/invocations", json={"operation": "status", "jobId": submitted["jobId"]}).json()
+    result = client.post("/invocations", json={"operation": "result", "jobId": submitted["jobId"], "page": 2, "pageSize": 50}).json()
+
+    assert len(result["reconciliationResults"]) == 5
+    assert result["summary"]["totalTransactions"] == 55
+    assert result["metadata"]["job"]["status"] == "completed"
+    missing = client.post("/invocations", json={"operation": "result", "jobId": "0" * 32})
+    assert missing.status_code == 404
+    bad_page = client.post("/invocations", json={"operation": "result", "jobId": submitted["jobId"], "page": "two"})
+    assert bad_page.status_code == 400
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
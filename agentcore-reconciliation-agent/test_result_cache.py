@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the reconciliation result cache
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+import result_cache
+from result_cache import ResultCache, result_key
+
+SALES = [{"Rest ID": 100 + i % 5, "Amount": 10.5 + i, "Month": "December"} for i in range(30)]
+PAYMENTS = [{"Amount": 10.5 + i, "Description": f"UBER EATS #{100 + i % 5}"} for i in range(30)]
+RULES = [{"term1": "Rest ID", "term2": "Description"}]
+
+
+def test_key_covers_documents_rules_and_engine_version():
+    key = result_key(SALES, PAYMENTS, RULES, "2")
+
+    # Key order inside records is not significant
+    assert result_key([dict(reversed(list(r.items()))) for r in SALES], PAYMENTS, RULES, "2") == key
+    assert result_key(SALES[:-1], PAYMENTS, RULES, "2") != key
+    assert result_key(PAYMENTS, SALES, RULES, "2") != key
+    assert result_key(SALES, PAYMENTS, [{"term1": "Amount", "term2": "Amount"}], "2") != key
+    assert result_key(SALES, PAYMENTS, RULES, "3") != key
+
+
+def test_columnar_documents_are_hashed_from_arrow_buffers():
+    pytest.importorskip("pyarrow")
+    from columnar import decode_columnar, write_table
+
+    sales = decode_columnar(write_table(SALES, "arrow"), "arrow")
+
+    assert result_key(sales, PAYMENTS, RULES, "2") == result_key(decode_columnar(write_table(SALES, "parquet"), "parquet"), PAYMENTS, RULES, "2")
+    assert sales._rows is None
+
+
+def test_concurrent_identical_requests_compute_once():
+    cache = ResultCache(max_entries=4, ttl_seconds=60)
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"answer": 42}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert [value for value, _ in results] == [{"answer": 42}] * 5
+    assert sum(info["coalesced"] for _, info in results) == 4
+    assert cache.get_or_compute("k", compute)[1]["hit"] is True
+
+
+def test_failures_are_not_cached():
+    cache = ResultCache(max_entries=4, ttl_seconds=60)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", fail)
+
+    assert cache.get_or_compute("k", lambda: "ok") == ("ok", {"hit": False, "coalesced": False, "ageSeconds": 0.0})
+
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: clock[0])
+    cache = ResultCache(max_entries=2, ttl_seconds=10)
+
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    cache.get_or_compute("a", lambda: 0)
+    cache.get_or_compute("c", lambda: 3)
+
+    # "b" was least recently used
+    assert cache.get_or_compute("b", lambda: 20)[0] == 20
+    clock[0] += 11
+    assert cache.get_or_compute("c", lambda: 30) == (30, {"hit": False, "coalesced": False, "ageSeconds": 0.0})
+    assert cache.stats()["evictions"] == 3
+
+
+def test_entrypoint_reuses_results(monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent
+    import work_queue
+
+    monkeypatch.setattr(work_queue, "_work_queue", work_queue.WorkQueue(executor="thread"))
+    monkeypatch.setattr(agent, "result_cache", ResultCache(max_entries=4, ttl_seconds=60))
+    client = TestClient(agent.app)
+    payload = {"leftDocument": SALES, "rightDocument": PAYMENTS, "matchingRules": RULES}
+
+    first = client.post("/invocations", json=payload).json()
+    second = client.post("/invocations", json={**payload, "profileContext": {"profileName": "December"}}).json()
+    changed = client.post("/invocations", json={**payload, "matchingRules": []}).json()
+
+    assert first["metadata"]["resultCache"]["hit"] is False
+    assert second["metadata"]["resultCache"]["hit"] is True
+    assert second["metadata"]["profileContext"] == {"profileName": "December"}
+    assert second["reconciliationResults"] == first["reconciliationResults"]
+    assert changed["metadata"]["resultCache"]["hit"] is False
+    assert "resultCache" not in agent.result_cache.get_or_compute(first["metadata"]["resultCache"]["key"], dict)[0]["metadata"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Cold start budget - import time and time to the first /ping, in fresh interpreters
+"""
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Headroom over the ~0.45s import / ~0.55s first ping measured after the lazy imports, but below
+# the ~1.1s / ~1.3s agent.py took when strands and pandas loaded at startup
+IMPORT_BUDGET_SECONDS = float(os.environ.get("STARTUP_IMPORT_BUDGET_SECONDS", "0.8"))
+PING_BUDGET_SECONDS = float(os.environ.get("STARTUP_PING_BUDGET_SECONDS", "1.0"))
+
+# Loaded by the operations that need them, never at startup
+HEAVY_MODULES = ("strands", "numpy", "pandas", "pyarrow", "PyPDF2", "openpyxl", "matching_engine", "schema_inference")
+
+
+def run_python(*args: str, **kwargs) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=HERE, capture_output=True, text=True, timeout=60, **kwargs)
+
+
+def import_seconds(module: str) -> float:
+    """
+    Cumulative import time of module, as reported by python -X importtime
+    """
+    result = run_python("-X", "importtime", "-c", f"import {module}")
+    assert result.returncode == 0, result.stderr
+    match = re.search(rf"^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$", result.stderr, re.MULTILINE)
+    assert match, f"{module} missing from importtime output"
+    return int(match.group(1)) / 1e6
+
+
+def loaded_heavy_modules(module: str) -> list:
+    result = run_python("-c", f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split()
+
+
+@pytest.mark.parametrize("module", ["agent", "agent_no_fallbacks", "local_agent"])
+def test_heavy_modules_load_lazily(module):
+    pytest.importorskip("flask" if module == "local_agent" else "bedrock_agentcore")
+
+    assert loaded_heavy_modules(module) == []
+
+
+@pytest.mark.parametrize("module", ["agent", "local_agent"])
+def test_import_time_budget(module):
+    pytest.importorskip("bedrock_agentcore" if module == "agent" else "flask")
+    # Best of three - the first run may also be compiling bytecode
+    seconds = min(import_seconds(module) for _ in range(3))
+
+    assert seconds < IMPORT_BUDGET_SECONDS, f"import {module} took {seconds:.3f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+
+
+def test_time_to_first_ping():
+    pytest.importorskip("bedrock_agentcore")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-c", f"import agent; agent.app.run(port={port}, host='127.0.0.1')"],
+        cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        status = None
+        while time.perf_counter() - started < 30 and server.poll() is None:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/ping", timeout=1) as response:
+                    status = response.status
+                break
+            except OSError:
+                time.sleep(0.01)
+        seconds = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    assert status == 200
+    assert seconds < PING_BUDGET_SECONDS, f"first /ping after {seconds:.3f}s (budget {PING_BUDGET_SECONDS}s)"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-stage OpenTelemetry spans
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+import tracing
+from matching_engine import reconcile_records
+from work_queue import WorkQueue
+
+SALES = [{"Rest ID": 100 + i % 5, "Amount": 10.5 + i, "Month": "December"} for i in range(20)]
+PAYMENTS = [{"Amount": 10.5 + i, "Description": f"UBER EATS #{100 + i % 5}"} for i in range(20)]
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    provider = sdk_trace.TracerProvider()
+    monkeypatch.setattr(tracing, "_tracer", lambda: provider.get_tracer(tracing.TRACER_NAME))
+    return provider
+
+
+def in_memory(provider):
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return exporter
+
+
+def test_reconcile_stages_on_the_work_queue_join_the_request_trace(provider):
+    exporter = in_memory(provider)
+    queue = WorkQueue(max_workers=1, executor="thread")
+    try:
+        with tracing.stage_span("request"):
+            results = queue.run(reconcile_records, SALES, PAYMENTS)
+    finally:
+        queue.shutdown()
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    request, job = spans["request"], spans["work_queue.job"]
+    assert job.parent.span_id == request.context.span_id
+    assert job.attributes["clofast.job"] == "reconcile_records"
+    for stage in ("reconcile.normalize", "reconcile.index", "reconcile.score", "reconcile.assign"):
+        assert spans[stage].context.trace_id == request.context.trace_id
+    assert spans["reconcile.score"].parent.span_id == job.context.span_id
+    assert spans["reconcile.score"].attributes["clofast.candidates"] == len(SALES) * len(PAYMENTS)
+    assert spans["reconcile.assign"].attributes["clofast.rows"] == len(SALES) + len(PAYMENTS)
+    assert spans["reconcile.assign"].attributes["clofast.matched"] == sum(
+        1 for row in results if row["leftTransaction"] and row["rightTransaction"])
+
+
+def test_context_crosses_a_process_boundary_as_headers(provider):
+    exporter = in_memory(provider)
+    with tracing.stage_span("request"):
+        carrier = tracing.inject_context()
+
+    # What a worker process does with the carrier it was handed
+    def job():
+        with tracing.stage_span("child", rows=3):
+            return "done"
+
+    assert tracing.run_in_context(carrier, job) == "done"
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert "traceparent" in carrier
+    assert spans["child"].parent.span_id == spans["request"].context.span_id
+    assert tracing.run_in_context({}, lambda: "untraced") == "untraced"
+
+
+def test_json_lines_exporter(provider, tmp_path):
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+    path = tmp_path / "spans.jsonl"
+    provider.add_span_processor(SimpleSpanProcessor(tracing.JsonLinesSpanExporter(str(path))))
+    with tracing.stage_span("outer", rows=2):
+        with tracing.stage_span("inner", bytes=None) as span:
+            span.set(candidates=4)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["inner", "outer"]
+    assert lines[0]["attributes"] == {"clofast.candidates": 4}
+    assert lines[1]["attributes"] == {"clofast.rows": 2}
+    assert tracing.configure_local_exporter("zipkin") is False
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded work queue and its admission control
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+import work_queue
+from schema_inference import reconcile_documents
+from work_queue import ServerBusy, WorkQueue, estimate_records_bytes
+
+SALES = [{"Rest ID": 100 + i % 5, "Amount": 10.0 + i, "Month": "December"} for i in range(30)]
+PAYMENTS = [{"Amount": 10.0 + i, "Description": f"UBER EATS #{100 + i % 5}"} for i in range(30)]
+
+
+def occupy(queue: WorkQueue, count: int, weight: int = 0):
+    """
+    Start count jobs that block until the returned event is set
+    """
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def job():
+        started.release()
+        release.wait(timeout=30)
+
+    threads = [threading.Thread(target=queue.run, args=(job,), kwargs={"weight": weight}) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for _ in range(min(count, queue.max_workers)):
+        started.acquire(timeout=30)
+    return release, threads
+
+
+def test_full_queue_rejects_immediately_with_retry_after():
+    queue = WorkQueue(max_workers=2, max_queued=1, executor="thread")
+    release, threads = occupy(queue, 3)
+    try:
+        assert queue.is_saturated and queue.queued == 1
+        with pytest.raises(ServerBusy) as busy:
+            queue.run(lambda: "never runs")
+        assert busy.value.retry_after >= 1
+        assert queue.stats()["rejected"] == 1
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+    assert queue.run(lambda: "ran") == "ran"
+    assert queue.stats()["completed"] == 4 and queue.active == 0
+
+
+def test_payload_budget_limits_concurrent_bytes():
+    queue = WorkQueue(max_workers=4, max_queued=4, max_inflight_bytes=1000, executor="thread")
+    release, threads = occupy(queue, 1, weight=600)
+    try:
+        with pytest.raises(ServerBusy):
+            queue.run(lambda: None, weight=600)
+        assert queue.run(lambda: "small", weight=300) == "small"
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+    # Alone, a payload over the whole budget still runs
+    assert queue.run(lambda: "large", weight=5000) == "large"
+    assert queue.inflight_bytes == 0
+
+
+def test_process_workers_reconcile_like_in_process():
+    queue = WorkQueue(max_workers=2, executor="process")
+    try:
+        results, left_columns, right_columns = queue.run(reconcile_documents, SALES, PAYMENTS, weight=1)
+    finally:
+        queue.shutdown()
+
+    assert (results, left_columns, right_columns) == reconcile_documents(SALES, PAYMENTS)
+
+
+def test_estimated_bytes_track_the_record_count():
+    estimate = estimate_records_bytes(SALES * 100)
+
+    assert estimate == pytest.approx(estimate_records_bytes(SALES) * 100, rel=0.05)
+    assert estimate_records_bytes([]) == 0
+
+
+def test_entrypoint_answers_busy_with_retry_after(monkeypatch):
+    pytest.importorskip("bedrock_agentcore")
+    from starlette.testclient import TestClient
+
+    import agent
+
+    queue = WorkQueue(max_workers=1, max_queued=0, executor="thread")
+    monkeypatch.setattr(work_queue, "_work_queue", queue)
+    client = TestClient(agent.app)
+    release, threads = occupy(queue, 1)
+    try:
+        assert client.get("/ping").json()["status"] == "HealthyBusy"
+        response = client.post("/invocations", json={"leftDocument": SALES, "rightDocument": PAYMENTS})
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) == response.json()["retryAfterSeconds"] >= 1
+    assert response.json()["status"] == "busy"
+
+    response = client.post("/invocations", json={"leftDocument": SALES, "rightDocument": PAYMENTS})
+    assert response.status_code == 200
+    assert response.json()["metadata"]["workQueue"]["completed"] == 2
+    assert client.get("/ping").json()["status"] == "Healthy"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
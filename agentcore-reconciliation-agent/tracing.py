@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+OpenTelemetry spans for each reconciliation and extraction stage.
+
+Stages (download, PDF page extraction, normalization, indexing, scoring,
+assignment, serialization) open a span through stage_span() and attach
+their row, candidate and byte counts. Work queue jobs carry the caller's
+trace context into the worker, so spans opened in worker processes join the
+request's trace. Everything is a no-op when OpenTelemetry is not installed.
+
+In the container, opentelemetry-instrument configures the exporter. For
+offline runs, set OTEL_LOCAL_EXPORTER=console to print finished spans, or
+OTEL_LOCAL_EXPORTER=file to append them as JSON lines to
+OTEL_LOCAL_EXPORTER_PATH.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+OTEL_LOCAL_EXPORTER = os.environ.get("OTEL_LOCAL_EXPORTER", "").lower()  # "console" or "file"
+OTEL_LOCAL_EXPORTER_PATH = os.environ.get("OTEL_LOCAL_EXPORTER_PATH", os.path.join(tempfile.gettempdir(), "clofast_spans.jsonl"))
+
+TRACER_NAME = "clofast.reconciliation"
+
+
+def _trace():
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    return trace
+
+
+class StageSpan:
+    """
+    The current stage's span - attributes are dropped when tracing is off
+    """
+
+    def __init__(self, span=None):
+        self.span = span
+
+    def set(self, **attributes) -> None:
+        if self.span is not None:
+            self.span.set_attributes({f"clofast.{key}": value for key, value in attributes.items() if value is not None})
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        """
+        Attributes under their own names, e.g. the gen_ai.* semantic conventions
+        """
+        if self.span is not None:
+            self.span.set_attributes({key: value for key, value in attributes.items() if value is not None})
+
+
+def _tracer():
+    trace = _trace()
+    return trace.get_tracer(TRACER_NAME) if trace is not None else None
+
+
+@contextmanager
+def stage_span(name: str, **attributes) -> Iterator[StageSpan]:
+    """
+    A span for one stage, with clofast.* attributes
+    """
+    tracer = _tracer()
+    if tracer is None:
+        yield StageSpan()
+        return
+    with tracer.start_as_current_span(name) as span:
+        stage = StageSpan(span)
+        stage.set(**attributes)
+        yield stage
+
+
+def inject_context() -> Dict[str, str]:
+    """
+    The current trace context as W3C headers, to hand to another thread or process
+    """
+    carrier: Dict[str, str] = {}
+    if _trace() is not None:
+        from opentelemetry import propagate
+
+        propagate.inject(carrier)
+    return carrier
+
+
+def run_in_context(carrier: Dict[str, str], fn: Callable, *args) -> Any:
+    """
+    Call fn(*args) inside the trace context in carrier - a picklable work queue job wrapper
+    """
+    if not carrier or _trace() is None:
+        return fn(*args)
+    from opentelemetry import context, propagate
+
+    token = context.attach(propagate.extract(carrier))
+    try:
+        return fn(*args)
+    finally:
+        context.detach(token)
+
+
+class JsonLinesSpanExporter:
+    """
+    Appends each finished span as one JSON line - opened per batch so forked workers can share the file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> Any:
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_local_exporter(exporter: Optional[str] = None, path: Optional[str] = None) -> bool:
+    """
+    Export spans to the console or a JSON lines file; True when an exporter was installed.
+
+    The span processor is added to the running SDK provider (e.g. one set up by opentelemetry-instrument),
+    or to a new provider when none is set.
+    """
+    global _configured
+    exporter = (exporter or OTEL_LOCAL_EXPORTER).lower()
+    if exporter not in ("console", "file"):
+        return False
+    trace = _trace()
+    if trace is None:
+        logger.warning("⚠️ OTEL_LOCAL_EXPORTER is set but OpenTelemetry is not installed")
+        return False
+    try:
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
+    except ImportError:
+        logger.warning("⚠️ OTEL_LOCAL_EXPORTER needs the opentelemetry-sdk package")
+        return False
+
+    with _configure_lock:
+        if _configured:
+            return True
+        provider = trace.get_tracer_provider()
+        if not isinstance(provider, TracerProvider):
+            provider = TracerProvider()
+            trace.set_tracer_provider(provider)
+        span_exporter = ConsoleSpanExporter() if exporter == "console" else JsonLinesSpanExporter(path or OTEL_LOCAL_EXPORTER_PATH)
+        provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+        _configured = True
+    logger.info(f"🔭 Exporting spans to {exporter if exporter == 'console' else path or OTEL_LOCAL_EXPORTER_PATH}")
+    return True
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Request execution layer with backpressure.
+
+CPU-heavy work (reconciliation scoring) runs on a bounded pool of worker
+processes instead of the request thread, so concurrent profiles no longer
+contend for the GIL. Admission control keeps the number of queued jobs and
+the estimated payload bytes in flight under fixed limits; a request over
+either limit is rejected at once with a retry-after hint instead of slowing
+down everything already running.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+from tracing import inject_context, run_in_context, stage_span
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_MAX_WORKERS = int(os.environ.get("RECONCILE_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+RECONCILE_MAX_QUEUED = int(os.environ.get("RECONCILE_MAX_QUEUED", "8"))
+RECONCILE_MAX_INFLIGHT_BYTES = int(os.environ.get("RECONCILE_MAX_INFLIGHT_BYTES", str(256 * 1024 * 1024)))
+RECONCILE_EXECUTOR = os.environ.get("RECONCILE_EXECUTOR", "process").lower()
+
+SIZE_SAMPLE_RECORDS = 50
+DEFAULT_JOB_SECONDS = 1.0
+
+
+class ServerBusy(Exception):
+    """
+    Raised when a job is not admitted - the caller should retry after retry_after seconds
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server busy: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def estimate_records_bytes(records: Iterable[Any]) -> int:
+    """
+    Approximate JSON size of a record list, from a sample of its records
+    """
+    # Sequences (record tables, spreadsheet rows) are sampled by index rather than copied
+    records = records if isinstance(records, Sequence) else list(records)
+    if not records:
+        return 0
+    step = max(1, len(records) // SIZE_SAMPLE_RECORDS)
+    sample = [records[i] for i in range(0, len(records), step)][:SIZE_SAMPLE_RECORDS]
+    sample_bytes = sum(len(json.dumps(record, default=str)) for record in sample)
+    return int(sample_bytes / len(sample) * len(records))
+
+
+class WorkQueue:
+    """
+    Bounded worker pool with admission control by queue depth and payload size
+    """
+
+    def __init__(
+        self,
+        max_workers: int = RECONCILE_MAX_WORKERS,
+        max_queued: int = RECONCILE_MAX_QUEUED,
+        max_inflight_bytes: int = RECONCILE_MAX_INFLIGHT_BYTES,
+        executor: str = RECONCILE_EXECUTOR
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max(0, max_queued)
+        self.max_inflight_bytes = max_inflight_bytes
+        self.executor_kind = executor
+        self.active = 0
+        self.inflight_bytes = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.average_job_seconds = DEFAULT_JOB_SECONDS
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self):
+        # Started on first use so importing the module never forks
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_kind == "thread":
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="reconcile")
+                    else:
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    logger.info(f"🏭 Started {self.max_workers} {self.executor_kind} workers")
+        return self._executor
+
+    @property
+    def queued(self) -> int:
+        return max(self.active - self.max_workers, 0)
+
+    @property
+    def is_saturated(self) -> bool:
+        return self.active >= self.max_workers
+
+    def retry_after(self) -> int:
+        """
+        Seconds until a slot is likely free, from the average job time and the queue depth
+        """
+        waves = self.queued // self.max_workers + 1
+        return max(1, math.ceil(self.average_job_seconds * waves))
+
+    def _admit(self, weight: int) -> None:
+        with self._lock:
+            if self.active >= self.max_workers + self.max_queued:
+                reason = f"{self.active} jobs in flight (limit {self.max_workers + self.max_queued})"
+            elif self.active and self.inflight_bytes + weight > self.max_inflight_bytes:
+                # A job larger than the whole budget is still admitted when it would run alone
+                reason = f"{self.inflight_bytes + weight} payload bytes in flight (limit {self.max_inflight_bytes})"
+            else:
+                self.active += 1
+                self.inflight_bytes += weight
+                return
+            self.rejected += 1
+            retry_after = self.retry_after()
+        logger.warning(f"🚦 Rejected job: {reason}, retry after {retry_after}s")
+        raise ServerBusy(reason, retry_after)
+
+    def _release(self, weight: int, seconds: float, failed: bool) -> None:
+        with self._lock:
+            self.active -= 1
+            self.inflight_bytes -= weight
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+                # Exponential moving average keeps the retry-after hint current
+                self.average_job_seconds = 0.8 * self.average_job_seconds + 0.2 * seconds
+
+    @contextmanager
+    def slot(self, weight: int = 0) -> Iterator[None]:
+        """
+        Hold one worker slot while the caller works on its own thread - admitted and counted like run()
+        """
+        self._admit(weight)
+        started = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self._release(weight, time.perf_counter() - started, failed)
+
+    def run(self, fn: Callable, *args, weight: int = 0) -> Any:
+        """
+        Run fn(*args) on a worker and wait for the result, or raise ServerBusy straight away
+        """
+        with self.slot(weight):
+            with stage_span("work_queue.job", job=getattr(fn, "__name__", str(fn)), bytes=weight, executor=self.executor_kind):
+                # Spans opened by the job join this trace, even in a worker process
+                return self._pool().submit(run_in_context, inject_context(), fn, *args).result()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executor": self.executor_kind,
+            "maxWorkers": self.max_workers,
+            "maxQueued": self.max_queued,
+            "active": self.active,
+            "queued": self.queued,
+            "inflightBytes": self.inflight_bytes,
+            "maxInflightBytes": self.max_inflight_bytes,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "averageJobSeconds": round(self.average_job_seconds, 3)
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_work_queue: Optional[WorkQueue] = None
+_work_queue_lock = threading.Lock()
+
+
+def get_work_queue() -> WorkQueue:
+    """
+    The process-wide work queue
+    """
+    global _work_queue
+    with _work_queue_lock:
+        if _work_queue is None:
+            _work_queue = WorkQueue()
+        return _work_queue